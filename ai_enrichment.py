@@ -0,0 +1,277 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from telemetry import TELEMETRY
+
+try:
+    # IA opcional para enriquecimento automático de descrições de medidas
+    from google import genai
+except ImportError:
+    genai = None
+
+# ==============================================================================
+# ENRIQUECIMENTO DE DESCRIÇÕES POR IA (use_ai_enrichment)
+# ==============================================================================
+# Medidas em lotes (um prompt, resposta JSON), lotes em paralelo (ai_concurrency),
+# retry com espera exponencial e itens faltantes repetidos um a um. ai_model =
+# "stub" roda tudo localmente, sem chave de API.
+
+DEFAULT_AI_BATCH_SIZE = 20
+DEFAULT_AI_CONCURRENCY = 4
+DEFAULT_AI_MAX_ATTEMPTS = 3
+MAX_BATCH_CHARS = 30_000   # DAX somado por lote (uma medida gigante vai sozinha)
+STUB_MODEL = "stub"
+AI_PHASE = "IA: descrições"
+PROMPT_VERSION = "2"       # mude ao alterar PROMPT_HEADER (fica registrado no cache de descrições)
+
+ITEMS_MARKER = "MEDIDAS (JSON):"
+
+PROMPT_HEADER = """
+Você é um consultor sênior de BI ajudando a documentar um modelo de dados em Power BI.
+
+Para CADA medida da lista abaixo, escreva uma descrição curta (1 a 2 frases, em português do Brasil), simples e objetiva, que qualquer pessoa de negócio consiga entender, explicando o que a medida faz.
+
+Não invente contexto de negócio. Use apenas o nome da medida, o nome da tabela e a definição DAX de cada uma.
+
+Se o domínio (por exemplo, RH, Finanças, Marketing, Operações etc.) não ficar claro a partir desses elementos, use uma linguagem neutra, sem citar áreas de negócio. Se ele ficar evidente (porque aparece no nome do projeto, da tabela ou da medida), você pode mencioná-lo de forma natural.
+
+Em cada descrição:
+- Explique o que a medida retorna (contagem, soma, média, taxa, variação etc.).
+- Se possível, comente o escopo básico (período, filtros, se considera apenas registros ativos etc.), mas somente se isso estiver evidente no DAX ou nos nomes.
+- Não inclua o código DAX, bullet points, numeração, markdown ou emojis.
+
+Contexto do projeto (apenas como referência, não invente nada além do que estiver claro): {project_name}
+
+FORMATO DA RESPOSTA: apenas um objeto JSON, sem texto antes ou depois, com o "id" de cada medida como chave e a descrição como valor. Exemplo: {{"M001": "Soma o valor ...", "M002": "Conta ..."}}
+""".strip()
+
+
+def build_prompt(project_name, items):
+    """items: [(id, nome, tabela, dax), ...] -> prompt único do lote."""
+    payload = [{"id": i, "nome": name, "tabela": table, "dax": dax} for i, name, table, dax in items]
+    return (PROMPT_HEADER.format(project_name=project_name) + "\n\n" + ITEMS_MARKER + "\n"
+            + json.dumps(payload, ensure_ascii=False, indent=1))
+
+
+def parse_response(text, ids):
+    """Extrai {id: descrição} da resposta JSON do modelo (ignora ids desconhecidos e valores vazios)."""
+    text = (text or "").strip()
+    if text.startswith("```"):
+        # Cerca de código (```json ... ```) mesmo pedindo JSON puro
+        text = text.strip("`")
+        text = text[text.find("\n") + 1:] if "\n" in text else text
+    try:
+        data = json.loads(text)
+    except ValueError:
+        start, end = text.find("{"), text.rfind("}")
+        if start < 0 or end <= start:
+            return {}
+        try:
+            data = json.loads(text[start:end + 1])
+        except ValueError:
+            return {}
+    if isinstance(data, list):
+        # Alguns modelos devolvem [{"id": ..., "descricao": ...}]
+        data = {str(d.get("id")): d.get("descricao") or d.get("description") for d in data if isinstance(d, dict)}
+    if not isinstance(data, dict):
+        return {}
+    out = {}
+    for i in ids:
+        desc = data.get(i)
+        if isinstance(desc, str) and desc.strip():
+            out[i] = " ".join(desc.split())
+    return out
+
+
+def pack_batches(items, batch_size=DEFAULT_AI_BATCH_SIZE, max_chars=MAX_BATCH_CHARS):
+    """Lotes de até batch_size medidas e ~max_chars de DAX, na ordem."""
+    batches, batch, chars = [], [], 0
+    for item in items:
+        size = len(item[3] or "")
+        if batch and (len(batch) >= batch_size or chars + size > max_chars):
+            batches.append(batch)
+            batch, chars = [], 0
+        batch.append(item)
+        chars += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+# ==============================================================================
+# MODELOS
+# ==============================================================================
+
+class GeminiModel:
+    """Gemini via google-genai, pedindo resposta em JSON."""
+
+    def __init__(self, client, model_name):
+        self.client = client
+        self.model_name = model_name
+
+    def generate(self, prompt):
+        response = self.client.models.generate_content(
+            model=self.model_name,
+            contents=prompt,
+            config={"response_mime_type": "application/json"},
+        )
+        return response.text or ""
+
+
+class StubModel:
+    """
+    Modelo local para testes: lê as medidas do prompt e devolve uma descrição
+    fixa para cada uma. drop_every=N omite 1 a cada N medidas (exercita o retry).
+    """
+
+    model_name = STUB_MODEL
+
+    def __init__(self, drop_every=0, latency=0.0):
+        self.drop_every = drop_every
+        self.latency = latency
+        self.calls = 0
+        self._seen = 0
+
+    def generate(self, prompt):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        items = json.loads(prompt.split(ITEMS_MARKER, 1)[1])
+        out = {}
+        for item in items:
+            self._seen += 1
+            if self.drop_every and self._seen % self.drop_every == 0:
+                continue
+            out[item["id"]] = f"Medida {item['nome']} da tabela {item['tabela']} (descrição de teste gerada localmente)."
+        return json.dumps(out, ensure_ascii=False)
+
+
+def make_model(model_name):
+    """ai_model do pbi_config.json -> modelo (None se a IA não estiver disponível)."""
+    if model_name == STUB_MODEL:
+        return StubModel()
+    if genai is None:
+        print("[AVISO] google-genai não instalado. Enriquecimento por IA será ignorado.")
+        return None
+    try:
+        # Chave em GEMINI_API_KEY ou GOOGLE_API_KEY
+        return GeminiModel(genai.Client(), model_name)
+    except Exception as e:
+        print(f"[AVISO] Falha ao criar cliente Gemini: {e}")
+        return None
+
+
+# ==============================================================================
+# MOTOR
+# ==============================================================================
+
+class EnrichmentEngine:
+    """
+    Descreve medidas em lotes concorrentes.
+    on_result({id: descrição}) é chamado (na thread de quem chamou enrich) a cada
+    lote ou item concluído.
+    """
+
+    def __init__(self, model, project_name, batch_size=DEFAULT_AI_BATCH_SIZE,
+                 concurrency=DEFAULT_AI_CONCURRENCY, max_attempts=DEFAULT_AI_MAX_ATTEMPTS, on_result=None,
+                 telemetry=None):
+        self.model = model
+        self.project_name = project_name
+        self.batch_size = max(1, int(batch_size or 1))
+        self.concurrency = max(1, int(concurrency or 1))
+        self.max_attempts = max(1, int(max_attempts or 1))
+        self.on_result = on_result
+        self.telemetry = telemetry or TELEMETRY
+        self.stats = {"calls": 0, "failed_calls": 0, "retried_items": 0}
+        self._lock = threading.Lock()  # stats são atualizadas pelas threads do pool
+
+    @classmethod
+    def from_config(cls, model, config, on_result=None):
+        return cls(
+            model,
+            config.get("project_name", ""),
+            batch_size=config.get("ai_batch_size", DEFAULT_AI_BATCH_SIZE),
+            concurrency=config.get("ai_concurrency", DEFAULT_AI_CONCURRENCY),
+            max_attempts=config.get("ai_max_attempts", DEFAULT_AI_MAX_ATTEMPTS),
+            on_result=on_result,
+        )
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def _generate(self, prompt):
+        """Chamada ao modelo com retry (backoff exponencial com jitter). None se todas falharem."""
+        text = None
+        attempt = 0
+        started = time.perf_counter()
+        try:
+            for attempt in range(self.max_attempts):
+                self._count("calls")
+                try:
+                    text = self.model.generate(prompt)
+                    return text
+                except Exception as e:
+                    self._count("failed_calls")
+                    if attempt == self.max_attempts - 1:
+                        print(f"[AVISO] IA falhou após {self.max_attempts} tentativas: {e}")
+                        return None
+                    time.sleep(random.uniform(0, min(30.0, 2.0 ** attempt)))
+            return None
+        finally:
+            self.telemetry.record(
+                "ia", f"generate {getattr(self.model, 'model_name', '?')}", AI_PHASE,
+                "ok" if text is not None else "erro", time.perf_counter() - started,
+                retries=attempt, bytes_out=len(prompt.encode("utf-8")),
+                bytes_in=len(text.encode("utf-8")) if text else 0, error=text is None,
+            )
+
+    def _describe(self, batch):
+        ids = [item[0] for item in batch]
+        text = self._generate(build_prompt(self.project_name, batch))
+        return batch, parse_response(text, ids)
+
+    def _run(self, batches, progress):
+        """Roda os lotes em paralelo; devolve os itens que voltaram sem descrição."""
+        missing = []
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = [pool.submit(self._describe, batch) for batch in batches]
+            for fut in as_completed(futures):
+                batch, got = fut.result()
+                missing.extend(item for item in batch if item[0] not in got)
+                if got and self.on_result:
+                    self.on_result(got)
+                progress(got)
+        return missing
+
+    def enrich(self, items):
+        """items: [(id, nome, tabela, dax), ...] -> {id: descrição} (só as que a IA devolveu)."""
+        results = {}
+        total = len(items)
+        done = [0]
+
+        def progress(got):
+            before = done[0]
+            results.update(got)
+            done[0] = len(results)
+            # Com a linha de progresso ao vivo (progress_line) o contador fica só nela
+            if not self.telemetry.progress_enabled and (done[0] // 50 != before // 50 or done[0] == total):
+                print(f"  - IA: {done[0]}/{total} medidas descritas...")
+
+        batches = pack_batches(items, self.batch_size)
+        self.telemetry.start_progress("IA", len(batches), unit="lotes", kind="ia")
+        missing = self._run(batches, progress)
+        if missing:
+            # Itens que faltaram no lote (resposta incompleta / inválida): um a um
+            self.telemetry.end_progress()
+            print(f"  - IA: repetindo {len(missing)} medidas individualmente...")
+            self._count("retried_items", len(missing))
+            self.telemetry.start_progress("IA (itens)", len(missing), unit="chamadas", kind="ia")
+            missing = self._run([[item] for item in missing], progress)
+        self.telemetry.end_progress()
+        if missing:
+            print(f"[AVISO] IA não descreveu {len(missing)} medidas (ficam para a próxima execução).")
+        return results
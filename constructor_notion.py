@@ -1,16 +1,24 @@
 import os
 import json
-import csv
-import requests
-from datetime import datetime
+import argparse
+import asyncio
+from datetime import datetime, timezone
 import sys
 import time
 
-try:
-    # IA opcional para enriquecimento automático de descrições de medidas
-    from google import genai
-except ImportError:
-    genai = None
+from ai_enrichment import PROMPT_VERSION, EnrichmentEngine, make_model
+from dax_describer import RULES_MODEL, RULES_VERSION, DaxDescriber
+from description_cache import DescriptionCache
+from notion_api import NotionClient
+from notion_blocks import pack_blocks, payload_size
+from notion_journal import PublishJournal
+from notion_mirror import NotionMirror, properties_differ, property_value
+from notion_plan import PlanClient
+from notion_publisher import DEFAULT_CONCURRENCY, RowPublisher, estimate_requests
+from notion_sync import SyncState, content_hash, diff_rows
+from pbi_model import Visual, inventory_from_dict
+from static_site import DEFAULT_SITE_DIR, write_site
+from telemetry import TELEMETRY
 
 # ==============================================================================
 # CONFIGURAÇÕES (V28 - Page Unifier + Visual Label + Big DAX)
@@ -18,138 +26,92 @@ except ImportError:
 NOTION_TOKEN = os.environ.get("NOTION_API_TOKEN_PBI_HUB_INVENTORY")
 DATABASE_ID = os.environ.get("NOTION_DATABASE_ID_PBI_HUB_INVENTORY")
 
-HEADERS = {
-    "Authorization": f"Bearer {NOTION_TOKEN}",
-    "Content-Type": "application/json",
-    "Notion-Version": "2022-06-28"
-}
+# Sessão HTTP compartilhada (keep-alive); recriada no __main__ com as opções do pbi_config.json
+NOTION = NotionClient(NOTION_TOKEN)
 
 # ==============================================================================
 # IA HELPERS - GEMINI (Enriquecimento automático de descrições)
 # ==============================================================================
-def get_gemini_client():
-    """
-    Cria o client do Gemini usando variáveis de ambiente (GEMINI_API_KEY ou GOOGLE_API_KEY).
-    Se a lib não estiver instalada ou a chave não existir, retorna None.
-    """
-    if genai is None:
-        print("[AVISO] google-genai não instalado. Enriquecimento por IA será ignorado.")
-        return None
-    try:
-        client = genai.Client()
-        return client
-    except Exception as e:
-        print(f"[AVISO] Falha ao criar cliente Gemini: {e}")
-        return None
-
-
-def ai_enrich_measures(structure, project_name, model_name, existing_descriptions):
+def ai_enrich_measures(structure, config, cache):
     """
-    Gera descrições humanizadas para medidas via Gemini.
-    Só chama a IA para medidas que ainda não possuem descrição em existing_descriptions.
-    Retorna um dicionário {measure_name: description}.
+    Gera descrições humanizadas para medidas via IA (ai_enrichment.py: lotes em
+    JSON, chamadas em paralelo, retry por medida).
+    Só chama a IA para lógicas (hash do DAX) que ainda não têm descrição no cache;
+    medidas com o mesmo DAX compartilham uma chamada.
+    Cada lote concluído vai para o cache na hora (execução interrompida não perde o progresso).
+    Preenche m.desc e retorna quantas medidas foram descritas.
     """
-    client = get_gemini_client()
-    if client is None:
-        return {}
-
-    measures = structure.get("measures", [])
-    # filtra só as medidas que ainda não têm descrição
-    target_measures = [m for m in measures if not existing_descriptions.get(m.get("name", ""), "").strip()]
-    total = len(target_measures)
+    # agrupa por lógica as medidas que ainda não têm descrição
+    groups = {}
+    for m in structure.get("measures", []):
+        if not m.desc.strip():
+            groups.setdefault(cache.hash_of(m), []).append(m)
+    total = sum(len(g) for g in groups.values())
     if total == 0:
         print("[INFO] Todas as medidas já possuem descrição em cache. Nenhuma chamada à IA será feita.")
-        return {}
-
-    print(f"--- 1.A Enriquecendo descrições via IA ({total} medidas novas) ---")
-    new_descriptions = {}
+        return 0
 
-    for i, m in enumerate(target_measures, start=1):
-        dax_snippet = m.get("dax", "")
-        name = m.get("name", "")
-        table = m.get("table", "")
+    model_name = config.get("ai_model", "gemini-2.5-flash")
+    model = make_model(model_name)
+    if model is None:
+        return 0
 
-        prompt = f"""
-Você é um consultor sênior de BI ajudando a documentar um modelo de dados em Power BI.
+    # id no prompt -> medidas com a mesma lógica (global_id da 1ª; posição como reserva)
+    by_id = {}
+    for i, group in enumerate(groups.values(), start=1):
+        by_id.setdefault(group[0].global_id or f"X{i:04d}", group)
+    items = [(mid, g[0].name, g[0].table, g[0].dax) for mid, g in by_id.items()]
 
-Sua tarefa é escrever uma descrição curta (1 a 2 frases, em português do Brasil), simples e objetiva, que qualquer pessoa de negócio consiga entender, explicando o que a medida faz.
+    # Garante o CSV no formato atual antes de começar a anexar
+    cache.save(structure.get("measures", []))
 
-Não invente contexto de negócio. Use apenas:
-- o nome da medida,
-- o nome da tabela e
-- a definição DAX abaixo.
+    described = [0]
 
-Se o domínio (por exemplo, RH, Finanças, Marketing, Operações etc.) não ficar claro a partir desses elementos, use uma linguagem neutra, sem citar áreas de negócio. Se ele ficar evidente (porque aparece no nome do projeto, da tabela ou da medida), você pode mencioná-lo de forma natural.
+    def store(got):
+        for mid, desc in got.items():
+            group = by_id[mid]
+            for m in group:
+                m.desc = desc
+            cache.add(group, desc, model_name, PROMPT_VERSION)
+            described[0] += len(group)
 
-Contexto do projeto (apenas como referência, não invente nada além do que estiver claro): {project_name}
-Nome da medida: [{name}]
-Tabela de medidas: {table}
+    engine = EnrichmentEngine.from_config(model, config, on_result=store)
+    print(f"--- 1.A Enriquecendo descrições via IA ({total} medidas novas, {len(items)} lógicas distintas, "
+          f"lotes de {engine.batch_size}, {engine.concurrency} em paralelo) ---")
+    engine.enrich(items)
+    print(f"> IA: {described[0]}/{total} medidas descritas em {engine.stats['calls']} chamadas.")
+    return described[0]
 
-Definição DAX:
-```DAX
-{dax_snippet}
-```
 
-Na sua resposta:
-- Explique o que a medida retorna (contagem, soma, média, taxa, variação etc.).
-- Se possível, comente o escopo básico (período, filtros, se considera apenas registros ativos etc.), mas somente se isso estiver evidente no DAX ou nos nomes.
-
-IMPORTANTE:
-- Não inclua o código DAX na resposta.
-- Não use bullet points, numeração, markdown ou emojis.
-- Retorne APENAS o texto da descrição final, em uma ou duas frases.
-""".strip()
-
-        try:
-            response = client.models.generate_content(
-                model=model_name,
-                contents=prompt,
-            )
-            text = (response.text or "").strip()
-        except Exception as e:
-            print(f"[AVISO] Falha ao descrever medida {name} ({i}/{total}): {e}")
-            text = ""
-
-        new_descriptions[name] = text
-
-        if i % 50 == 0 or i == total:
-            print(f"  - IA: {i}/{total} medidas processadas...")
-
-        # Pequeno intervalo para evitar qualquer throttle agressivo
-        time.sleep(0.1)
-
-    return new_descriptions
-
-
-def save_measures_enriched(structure, descriptions_by_name, path="measures_enriched.csv"):
+def rule_describe_measures(structure, cache):
     """
-    Salva/atualiza um cache local com as descrições das medidas
-    para reaproveitar em execuções futuras.
-    Chave de controle = nome da medida.
+    Descrições por regras (dax_describer.py, offline) para as medidas sem descrição
+    em cache; descrições antigas das regras são refeitas (as regras podem ter mudado).
+    O que as regras não explicam fica vazio (e segue para a IA, se ligada).
     """
-    fieldnames = ["global_id", "measure_name", "description"]
-    try:
-        with open(path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            for m in structure.get("measures", []):
-                gid = m.get("global_id") or ""
-                name = m.get("name", "")
-                desc = descriptions_by_name.get(name, "")
-                writer.writerow({
-                    "global_id": gid,
-                    "measure_name": name,
-                    "description": desc
-                })
-        print(f"--- Cache de descrições salvo em {path} ({len(structure.get('measures', []))} medidas) ---")
-    except Exception as e:
-        print(f"[AVISO] Não foi possível salvar {path}: {e}")
+    measures = structure.get("measures", [])
+    describer = DaxDescriber(m.name for m in measures)
+    described = pending = 0
+    for m in measures:
+        from_rules = cache.model_of(m) == RULES_MODEL
+        if m.desc and not from_rules:
+            continue
+        desc = describer.describe(m.dax)
+        m.desc = desc
+        if desc:
+            cache.remember(m, desc, RULES_MODEL, RULES_VERSION)
+            described += 1
+        else:
+            pending += 1
+    print(f"> Descrições por regras: {described} medidas ({pending} sem regra aplicável).")
+    return described
 
 
 # ==============================================================================
 # 1. CARREGAMENTO E UNIFICAÇÃO
 # ==============================================================================
-def load_data():
+def load_data(use_ai=None):
+    """use_ai: None = segue o pbi_config.json; False força desligar a IA (ex: --plan)."""
     print("--- 1. Carregando Dados (V28 + IA + Visual Label) ---")
     if not os.path.exists("pbi_config.json"):
         sys.exit("[ERRO] pbi_config.json ausente.")
@@ -159,126 +121,131 @@ def load_data():
     with open("pbi_config.json", "r", encoding="utf-8") as f:
         config = json.load(f)
     with open("model_structure.json", "r", encoding="utf-8") as f:
-        structure = json.load(f)
+        structure = inventory_from_dict(json.load(f))
+    # Relatório de telemetria e linha de progresso (telemetry_report / progress_line)
+    TELEMETRY.configure(config)
 
     # Flag de controle do enriquecimento por IA (padrão: False se não existir no config)
-    use_ai = config.get("use_ai_enrichment", False)
-    ai_model = config.get("ai_model", "gemini-2.5-flash")
+    if use_ai is None:
+        use_ai = config.get("use_ai_enrichment", False)
 
-    # Dicionário mestre de descrições, mapeado por NOME da medida
-    descriptions_by_name = {}
+    # 1) Reaproveita descrições do cache (measures_enriched.csv [+ description_cache]):
+    #    pela lógica da medida (hash do DAX); pelo nome só nas linhas antigas sem hash
+    cache = DescriptionCache.from_config(config)
+    for m in structure.get("measures", []):
+        m.desc = cache.lookup(m)
+    hits = cache.hits
+    print(f"> Descrições do cache: {hits['hash']} por DAX, {hits['shared']} do portfólio, {hits['name']} só por nome.")
 
-    # 1) Tenta reaproveitar descrições existentes de um cache local (measures_enriched.csv)
-    if os.path.exists("measures_enriched.csv"):
-        try:
-            with open("measures_enriched.csv", "r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if not row:
-                        continue
-                    name = (row.get("measure_name") or "").strip()
-                    desc = (row.get("description") or "").strip()
-                    if name:
-                        descriptions_by_name[name] = desc
-            print(f"--- Cache de descrições carregado de measures_enriched.csv ({len(descriptions_by_name)} medidas) ---")
-        except Exception as e:
-            print(f"[AVISO] Falha ao ler measures_enriched.csv, seguirá sem cache: {e}")
-            descriptions_by_name = {}
-    else:
-        print("[INFO] Nenhum measures_enriched.csv encontrado. Cache de descrições começará vazio.")
+    # 2) Regras offline (dax_describer.py) para o que o cache não cobre
+    if config.get("rule_descriptions", True):
+        rule_describe_measures(structure, cache)
 
-    # 2) Se IA estiver habilitada, gera/atualiza descrições via Gemini
+    # 3) Se IA estiver habilitada, gera descrições via Gemini só para o que as regras não explicaram
     if use_ai:
-        project_name = config.get("project_name", "")
-        ai_desc = ai_enrich_measures(structure, project_name, ai_model, descriptions_by_name)
-
-        # IA tem precedência sobre cache antigo
-        for name, desc in ai_desc.items():
-            if desc is not None:
-                descriptions_by_name[name] = desc
+        ai_enrich_measures(structure, config, cache)
     else:
         print("[INFO] Enriquecimento por IA desabilitado (use_ai_enrichment = false ou ausência no pbi_config.json).")
 
-    # 3) UNIFICAÇÃO INTELIGENTE DE PÁGINAS (COM LABEL DO VISUAL)
+    # 4) UNIFICAÇÃO INTELIGENTE DE PÁGINAS (COM LABEL DO VISUAL)
     unified_pages = {}
+    visual_by_id = {}  # página -> {id do visual: Visual unificado}
 
-    # 3.1. Base principal: report_structure vindo do Minerador
+    # 4.1. Base principal: report_structure vindo do Minerador
     raw_pages = structure.get("report_structure", [])
     for p in raw_pages:
-        p_name = p.get("name", "Geral")
+        p_name = p.name or "Geral"
         if p_name not in unified_pages:
             unified_pages[p_name] = []
+            visual_by_id[p_name] = {}
+
+        current = visual_by_id[p_name]
+        for v in p.visuals:
+            if v.id not in current:
+                # Cópia própria: a lista de medidas é complementada no passo 4.2
+                # (sem repetições, mantendo a ordem do relatório: corpo estável para o notion_sync)
+                current[v.id] = Visual(v.id, v.type, list(dict.fromkeys(v.measures)), v.label)
+                unified_pages[p_name].append(current[v.id])
 
-        current_ids = {v["id"] for v in unified_pages[p_name]}
-        for v in p.get("visuals", []):
-            if v["id"] not in current_ids:
-                # Garante que existe campo label mesmo que vazio
-                unified_pages[p_name].append({
-                    "id": v.get("id"),
-                    "type": v.get("type", "Visual Desconhecido"),
-                    "label": v.get("label", ""),
-                    "measures": list(set(v.get("measures", [])))
-                })
-                current_ids.add(v["id"])
-
-    # 3.2. Fallback / complemento: visuais referenciados pelos detalhes das medidas
+    # 4.2. Fallback / complemento: visuais referenciados pelos detalhes das medidas
     for m in structure.get("measures", []):
-        vis_details = m.get("visual_details", [])
-        for v in vis_details:
-            p_name = v.get("page", "Geral")
+        for p_name, v_type, v_id in m.visual_details:
             if p_name not in unified_pages:
                 unified_pages[p_name] = []
+                visual_by_id[p_name] = {}
 
-            v_id = v.get("id")
-            v_type = v.get("type", "Visual Desconhecido")
-            v_label = v.get("label", "")  # pode vir do minerador se mapeado lá
-
-            found = False
-            for existing_v in unified_pages[p_name]:
-                if existing_v["id"] == v_id:
-                    if m["name"] not in existing_v["measures"]:
-                        existing_v["measures"].append(m["name"])
-                    found = True
-                    break
-
-            if not found:
-                unified_pages[p_name].append({
-                    "id": v_id,
-                    "type": v_type,
-                    "label": v_label,
-                    "measures": [m["name"]]
-                })
-
-    # Injeta de volta na estrutura para uso nos builders
+            existing_v = visual_by_id[p_name].get(v_id)
+            if existing_v is not None:
+                if m.name not in existing_v.measures:
+                    existing_v.measures.append(m.name)
+            else:
+                visual_by_id[p_name][v_id] = Visual(v_id, v_type, [m.name])
+                unified_pages[p_name].append(visual_by_id[p_name][v_id])
+
+    # Injeta de volta na estrutura para uso nos builders (+ índices para renderizar os corpos)
     structure["unified_pages"] = unified_pages
+    structure["render_index"] = build_render_index(structure)
 
-    # Enriquece medidas (descrições) usando dicionário por NOME
     for m in structure.get("measures", []):
-        m_name = m.get("name", "")
-        m["desc"] = descriptions_by_name.get(m_name, "")
-        m["visual_text"] = "Sim" if m.get("in_visual") else "Não"
+        m.visual_text = "Sim" if m.in_visual else "Não"
 
     print(f"> Páginas unificadas para processamento: {len(unified_pages)}")
 
     # Atualiza / garante measures_enriched.csv SEMPRE (com ou sem IA)
-    save_measures_enriched(structure, descriptions_by_name, path="measures_enriched.csv")
+    cache.save(structure.get("measures", []))
+    cache.close()
 
     return config, structure
 
 
+def build_render_index(structure):
+    """
+    Índices invertidos montados uma vez, depois da unificação, para que os
+    corpos do DB 3 e do DB 5 sejam só lookups:
+      measure_usage: nome da medida -> {(página, tipo do visual, label), ...}
+      visual_measure_ids: (página, id do visual) -> "M001, M002, ..."
+      measure_ids: nome da medida -> ID global (M001)
+    Na publicação, build_structure acrescenta depois do DB 5:
+      measure_pages: nome da medida -> page_id no DB 5 (links e relações do DB 3 / DB 4)
+      linked_dbs: DBs cujo schema já tem a relação "Medidas" -> DB 5
+    """
+    name_to_id = {m.name: m.global_id for m in structure.get("measures", [])}
+    usage = {}
+    visual_ids = {}
+    for p_name, v_list in structure.get("unified_pages", {}).items():
+        for v in v_list:
+            use = (p_name, v.type or "Visual", v.label)
+            for m_name in v.measures:
+                usage.setdefault(m_name, set()).add(use)
+            # IDs globais (M001, M002, ...) na ordem das medidas do visual
+            visual_ids[(p_name, v.id)] = ", ".join(name_to_id[n] for n in v.measures if name_to_id.get(n))
+    return {"measure_usage": usage, "visual_measure_ids": visual_ids, "measure_ids": name_to_id}
+
+
 # ==============================================================================
 # 2. API HELPERS
 # ==============================================================================
-def create_inline_db(parent_id, title, properties):
-    url = "https://api.notion.com/v1/databases"
-    payload = {
-        "parent": {"page_id": parent_id},
-        "title": [{"type": "text", "text": {"content": title}}],
-        "properties": properties,
-        "is_inline": True
-    }
+def find_inline_db(parent_id, title, exclude=()):
+    """Bloco do último inline DB `title` na página (exclude: IDs de DBs antigos). Levanta exceção se a leitura falhar."""
+    found, cursor = None, None
+    while True:
+        r = NOTION.list_block_children(parent_id, start_cursor=cursor)
+        if r.status_code != 200:
+            raise RuntimeError(f"listagem dos blocos da capa falhou ({r.status_code})")
+        data = r.json()
+        for block in data.get("results", []):
+            if (block.get("type") == "child_database" and block["id"] not in exclude
+                    and block["child_database"].get("title") == title):
+                found = block  # o bloco child_database tem o mesmo ID do database
+        cursor = data.get("next_cursor")
+        if not data.get("has_more") or not cursor:
+            return found
+
+
+def create_inline_db(parent_id, title, properties, exclude=()):
     try:
-        resp = requests.post(url, headers=HEADERS, json=payload)
+        resp = NOTION.create_database(parent_id, title, properties,
+                                      recover=lambda: find_inline_db(parent_id, title, exclude))
         data = resp.json()
         if resp.status_code != 200 or "id" not in data:
             print(f"❌ ERRO ao criar database inline '{title}'")
@@ -291,52 +258,337 @@ def create_inline_db(parent_id, title, properties):
         return None
 
 
-def add_row_heavy(db_id, props, children_blocks, name="Row"):
-    url_create = "https://api.notion.com/v1/pages"
-    payload_create = {"parent": {"database_id": db_id}, "properties": props}
+def find_rows(db_id, props, exclude=()):
+    """
+    Linhas já existentes no inline DB com as mesmas propriedades (query pelo título).
+    exclude: page_ids que já pertencem a outras linhas. Retorna None se o query falhar.
+    """
+    title = next(((k, property_value(v)) for k, v in props.items() if "title" in v), None)
+    if title is None:
+        return None
+    results, complete = NOTION.query_all(db_id, filter={"property": title[0], "title": {"equals": title[1]}})
+    if not complete:
+        return None
+    return [page for page in results
+            if page["id"] not in exclude and not page.get("archived")
+            and not properties_differ(page.get("properties", {}), props)]
+
+
+def create_row(db_id, props, name="Row", children=None, exclude=()):
+    """
+    Cria a linha no inline DB, já com o primeiro lote do corpo (children). Retorna o page_id ou None.
+    Se o POST ficar sem resposta confiável (5xx / timeout), a linha é procurada antes de repetir.
+    """
+    def recover():
+        found = find_rows(db_id, props, exclude)
+        if found is None:
+            raise RuntimeError("query do inline DB falhou")
+        return found[0] if found else None
+
+    try:
+        r = NOTION.create_page({"database_id": db_id}, props, children, recover=recover)
+        if r.status_code == 200:
+            return r.json()["id"]
+        print(f"[ERRO] Notion {r.status_code} ao criar linha '{name}': {r.text}")
+    except Exception as e:
+        print(f"[EXC] Exceção ao criar linha '{name}': {e}")
+
+    print(f"❌ Erro ao criar linha: {name}")
+    return None
+
+
+def append_children(page_id, req_batch, name="Row"):
+    """Anexa um lote de blocos ao corpo de uma página. Retorna os IDs dos blocos criados ou None."""
+    try:
+        r = NOTION.append_block_children(page_id, req_batch)
+        if r.status_code == 200:
+            return [b["id"] for b in r.json().get("results", []) if "id" in b]
+        print(f"[ERRO] Notion {r.status_code} ao anexar blocks da linha '{name}': {r.text}")
+    except Exception as e:
+        print(f"[EXC] Exceção ao anexar blocks da linha '{name}': {e}")
+    return None
+
+
+def append_body(page_id, batches, name="Row"):
+    """Anexa o corpo já empacotado (pack_blocks). Retorna todos os IDs criados ou None se algum lote falhar."""
+    ids = []
+    for batch in batches:
+        got = append_children(page_id, batch, name)
+        if got is None:
+            return None
+        ids.extend(got)
+    return ids
+
+
+def page_is_gone(resp):
+    """404 ou página arquivada/na lixeira (apagada à mão no Notion)."""
+    return resp.status_code == 404 or (resp.status_code == 400 and "archived" in (resp.text or ""))
+
 
-    page_id = None
-    for _ in range(3):
+def cover_is_live(page_id):
+    """A capa registrada no estado de sincronização ainda existe (e não está arquivada)?"""
+    try:
+        r = NOTION.get_page(page_id)
+    except Exception as e:
+        print(f"[AVISO] Falha ao consultar a capa {page_id}: {e}")
+        return False
+    if r.status_code != 200:
+        return False
+    data = r.json()
+    return not data.get("archived") and not data.get("in_trash")
+
+
+def ensure_inline_db(state, journal, key, parent_id, title, properties):
+    """
+    Sem estado: cria o inline DB (comportamento clássico).
+    Com estado: reaproveita o DB já publicado, atualizando o schema se ele mudou.
+    Na retomada (--resume), um DB já registrado no diário é reaproveitado direto.
+    """
+    NOTION.phase = title
+    db_id = journal.database(key) if journal else None
+    if db_id:
+        if state is not None:
+            state.set_database(key, db_id, content_hash(properties))
+        return db_id
+
+    if state is None:
+        db_id = create_inline_db(parent_id, title, properties)
+        if db_id and journal:
+            journal.record_database(key, db_id)
+        return db_id
+
+    schema_hash = content_hash(properties)
+    known = state.database(key)
+    if known:
+        if known["schema_hash"] == schema_hash:
+            return known["id"]
         try:
-            r = requests.post(url_create, headers=HEADERS, json=payload_create)
+            r = NOTION.update_database(known["id"], properties=properties, expected=(200, 404))
             if r.status_code == 200:
-                page_id = r.json()["id"]
-                break
-            elif r.status_code == 429:
-                print(f"[INFO] Notion 429 (rate limit) ao criar linha '{name}'. Aguardando...")
-                time.sleep(5)
-            else:
-                print(f"[ERRO] Notion {r.status_code} ao criar linha '{name}': {r.text}")
-                time.sleep(1)
+                state.set_database(key, known["id"], schema_hash)
+                return known["id"]
         except Exception as e:
-            print(f"[EXC] Exceção ao criar linha '{name}': {e}")
-            time.sleep(1)
+            print(f"[AVISO] Falha ao atualizar schema de '{title}': {e}")
+        print(f"[INFO] Database '{title}' não pôde ser reaproveitado. Criando de novo.")
+        state.drop_database(key)
 
-    if not page_id:
-        print(f"❌ Erro ao criar linha: {name}")
-        return None
+    db_id = create_inline_db(parent_id, title, properties, exclude=(known["id"],) if known else ())
+    if db_id:
+        state.set_database(key, db_id, schema_hash)
+        state.save()  # uma execução interrompida antes das linhas não recria o DB
+        if journal:
+            journal.record_database(key, db_id)
+    return db_id
+
+
+def link_measures_db(state, key, db_id, title, schema, measures_db_id):
+    """
+    Acrescenta ao DB a relação "Medidas" -> DB 5. O DB 5 é criado depois (ordem
+    da capa), então a relação entra por PATCH no schema; com estado, o hash
+    registrado passa a ser o do schema completo e a relação não é reenviada.
+    """
+    NOTION.phase = title
+    relation = measures_relation_schema(measures_db_id)
+    schema_hash = content_hash({**schema, **relation})
+    known = state.database(key) if state is not None else None
+    if known and known["schema_hash"] == schema_hash:
+        return True
+    try:
+        r = NOTION.update_database(db_id, properties=relation)
+    except Exception as e:
+        print(f"[AVISO] Falha ao criar a relação '{MEASURES_RELATION}' em '{title}': {e}")
+        return False
+    if r.status_code != 200:
+        print(f"[AVISO] Relação '{MEASURES_RELATION}' em '{title}' não criada ({r.status_code}); ficam só os links.")
+        return False
+    if state is not None:
+        state.set_database(key, db_id, schema_hash)
+    return True
+
+
+def unique_row_keys(rows):
+    """Garante chaves únicas dentro do DB (repetições viram 'chave#2', 'chave#3', ...)."""
+    seen = {}
+    out = []
+    for key, props, body, name in rows:
+        n = seen.get(key, 0) + 1
+        seen[key] = n
+        out.append((key if n == 1 else f"{key}#{n}", props, body, name))
+    return out
+
+
+def inline_block_ids(page_id, count, name="Row"):
+    """
+    IDs dos `count` primeiros blocos da página (o corpo enviado junto na criação;
+    a API não devolve esses IDs no POST /pages).
+    """
+    ids, cursor = [], None
+    while len(ids) < count:
+        try:
+            r = NOTION.list_block_children(page_id, start_cursor=cursor)
+        except Exception as e:
+            print(f"[EXC] Exceção ao listar blocos de '{name}': {e}")
+            break
+        if r.status_code != 200:
+            print(f"[AVISO] Não foi possível listar os blocos de '{name}' ({r.status_code}). O corpo antigo pode ficar duplicado.")
+            break
+        data = r.json()
+        ids.extend(b["id"] for b in data.get("results", []))
+        cursor = data.get("next_cursor")
+        if not cursor:
+            break
+    return ids[:count]
+
+
+def sync_changed_row(db_id, old, row, props_hash, body_hash):
+    """Atualiza propriedades e/ou corpo de uma linha já publicada. Retorna a nova entrada do estado ou None."""
+    key, props, body, name = row
+    entry = dict(old)
+    page_id = old["page_id"]
+
+    if old.get("props_hash") != props_hash:
+        try:
+            r = NOTION.update_page(page_id, properties=props, expected=(200, 404))
+        except Exception as e:
+            print(f"[EXC] Exceção ao atualizar linha '{name}': {e}")
+            return None
+        if page_is_gone(r):
+            # Linha apagada à mão no Notion: recria do zero
+            batches = pack_blocks(body, first_reserve=payload_size(props))
+            inline, batches = (batches[0], batches[1:]) if batches else ([], [])
+            new_id = create_row(db_id, props, name, inline)
+            if not new_id:
+                return None
+            ids = append_body(new_id, batches, name)
+            return {"page_id": new_id, "props_hash": props_hash,
+                    "body_hash": body_hash if ids is not None else "", "block_ids": ids or [],
+                    "inline_blocks": len(inline)}
+        if r.status_code != 200:
+            print(f"[ERRO] Notion {r.status_code} ao atualizar linha '{name}': {r.text}")
+            return None
+        entry["props_hash"] = props_hash
+
+    if old.get("body_hash") != body_hash:
+        # Só remove os blocos que o próprio constructor criou (notas manuais ficam):
+        # os enviados na criação (primeiros da página) + os anexados depois
+        old_ids = inline_block_ids(page_id, old.get("inline_blocks", 0), name) + old.get("block_ids", [])
+        for block_id in old_ids:
+            try:
+                NOTION.delete_block(block_id)
+            except Exception as e:
+                print(f"[EXC] Exceção ao remover bloco antigo de '{name}': {e}")
+        ids = append_body(page_id, pack_blocks(body), name)
+        entry["block_ids"] = ids or []
+        entry["inline_blocks"] = 0
+        entry["body_hash"] = body_hash if ids is not None else ""
+
+    return entry
+
+
+def archive_row(page_id, name):
+    try:
+        r = NOTION.update_page(page_id, archived=True, expected=(200, 404))
+        return r.status_code == 200 or page_is_gone(r)
+    except Exception as e:
+        print(f"[EXC] Exceção ao arquivar linha '{name}': {e}")
+        return False
 
-    url_app = f"https://api.notion.com/v1/blocks/{page_id}/children"
-    batch = 80
-    if children_blocks:
-        for i in range(0, len(children_blocks), batch):
-            req_batch = children_blocks[i:i + batch]
-            for _ in range(3):
-                try:
-                    r = requests.patch(url_app, headers=HEADERS, json={"children": req_batch})
-                    if r.status_code == 200:
-                        break
-                    elif r.status_code == 429:
-                        print(f"[INFO] Notion 429 (rate limit) ao anexar blocks da linha '{name}'. Aguardando...")
-                        time.sleep(5)
-                    else:
-                        print(f"[ERRO] Notion {r.status_code} ao anexar blocks da linha '{name}': {r.text}")
-                        time.sleep(1)
-                except Exception as e:
-                    print(f"[EXC] Exceção ao anexar blocks da linha '{name}': {e}")
-                    time.sleep(1)
-    return page_id
 
+def mark_remote_edits(db_id, known, rows, title):
+    """
+    Linhas cujas propriedades foram editadas à mão no Notion desde a última
+    execução (espelho: query incremental por last_edited_time) perdem o
+    props_hash e voltam a ser publicadas. Retorna quantas.
+    """
+    edited = NOTION.mirror.edited_pages(NOTION, db_id)
+    if not edited:
+        return 0
+    key_of = {entry["page_id"]: key for key, entry in known.items()}
+    props_of = {key: props for key, props, _, _ in rows}
+    drifted = 0
+    for page in edited:
+        key = key_of.get(page["id"])
+        if key in props_of and properties_differ(page.get("properties", {}), props_of[key]):
+            known[key]["props_hash"] = ""
+            drifted += 1
+    if drifted:
+        print(f"  > {title}: {drifted} linhas editadas no Notion desde a última sincronização serão restauradas")
+    return drifted
+
+
+async def publish_rows(publisher, state, db_key, db_id, rows, ordered=True, label="", title="", priority=0):
+    """
+    rows: lista de (chave, props, body, nome).
+    Sem estado: publica todas as linhas. Com estado (notion_sync): cria só as
+    novas, atualiza as alteradas, arquiva as que sumiram e não toca nas iguais.
+    Corrotina: os DBs rodam juntos em publisher.gather(), na mesma fila (priority).
+    Retorna {chave da linha: page_id} das linhas publicadas (para links de outros DBs).
+    """
+    NOTION.phase = title
+    rows = unique_row_keys(rows)
+    if state is None:
+        results = await publisher.publish_async(db_id, rows, ordered, label, db_key, title, priority)
+        return {row[0]: page_id for row, (page_id, _, _) in zip(rows, results) if page_id}
+
+    known = state.rows(db_key)
+    if known and NOTION.mirror is not None:
+        # Uma requisição (paginada) por DB, na mesma fila da publicação
+        await publisher.run_async([lambda: mark_remote_edits(db_id, known, rows, title)], priority)
+    new, changed, unchanged, removed = diff_rows(known, rows)
+    print(f"  > {title}: sync {len(new)} novas, {len(changed)} alteradas, {unchanged} iguais, {len(removed)} removidas")
+
+    if new:
+        results = await publisher.publish_async(db_id, [row for row, _, _ in new], ordered, label, db_key, title,
+                                                priority)
+        for ((key, _, _, _), ph, bh), (page_id, block_ids, n_inline) in zip(new, results):
+            if page_id:
+                known[key] = {"page_id": page_id, "props_hash": ph,
+                              "body_hash": bh if block_ids is not None else "", "block_ids": block_ids or [],
+                              "inline_blocks": n_inline}
+
+    journal = publisher.journal
+    pending = []
+    for row, ph, bh in changed:
+        # Retomada: atualização já concluída antes da queda
+        done = journal.synced(db_key, row[0]) if journal else None
+        if done and done.get("props_hash") == ph and done.get("body_hash") == bh:
+            known[row[0]] = done
+        else:
+            pending.append((row, ph, bh))
+
+    if pending:
+        def job(row, ph, bh):
+            entry = sync_changed_row(db_id, known[row[0]], row, ph, bh)
+            if entry and journal:
+                journal.record_synced(db_key, row[0], entry)
+            return entry
+
+        jobs = [(lambda r=row, ph=ph, bh=bh: job(r, ph, bh)) for row, ph, bh in pending]
+        for (row, _, _), entry in zip(pending, await publisher.run_async(jobs, priority)):
+            if entry:
+                known[row[0]] = entry
+
+    if removed:
+        jobs = [(lambda e=entry, k=key: archive_row(e["page_id"], k)) for key, entry in removed]
+        for (key, _), ok in zip(removed, await publisher.run_async(jobs, priority)):
+            if ok:
+                known.pop(key, None)
+
+    state.save()
+    return {row[0]: known[row[0]]["page_id"] for row in rows if row[0] in known}
+
+
+def make_publisher(config, journal=None):
+    """RowPublisher configurado pelo pbi_config.json (notion_concurrency)."""
+    return RowPublisher(
+        create_row,
+        append_children,
+        concurrency=config.get("notion_concurrency", DEFAULT_CONCURRENCY),
+        journal=journal,
+        discard_row=archive_row,
+        verbose=not TELEMETRY.progress_enabled,
+        find_row=find_rows,
+    )
 
 
 # Builders de blocos Notion
@@ -445,8 +697,9 @@ def create_table_block(headers, rows):
         }
     })
     for r in rows:
+        # Célula: texto simples ou lista de rich_text já montada (ex: IDs com link)
         cells = [
-            [{"type": "text", "text": {"content": str(c)[:1900]}}] for c in r
+            c if isinstance(c, list) else [{"type": "text", "text": {"content": str(c)[:1900]}}] for c in r
         ]
         tb["table"]["children"].append({
             "type": "table_row",
@@ -455,66 +708,19 @@ def create_table_block(headers, rows):
     return tb
 
 
-def archive_old_entries(project_name):
-    print("--- 2. Limpando Notion (arquivando versões antigas do projeto) ---")
-    url = f"https://api.notion.com/v1/databases/{DATABASE_ID}/query"
-    payload = {"filter": {"property": "Project Name", "title": {"equals": project_name}}}
-    try:
-        resp = requests.post(url, headers=HEADERS, json=payload)
-        data = resp.json()
-        for p in data.get("results", []):
-            requests.patch(
-                f"https://api.notion.com/v1/pages/{p['id']}",
-                headers=HEADERS,
-                json={"archived": True}
-            )
-    except Exception as e:
-        print(f"[AVISO] Falha ao arquivar entradas antigas no Notion: {e}")
-
-
-# ==============================================================================
-# 3. BUILDER
-# ==============================================================================
-def build_structure(config, structure):
-    print("--- 3. Construindo V28 (Final + IA + Visual Label + Big DAX) ---")
-
-    # Cria a capa do projeto
-    url = "https://api.notion.com/v1/pages"
-
-    # Normaliza o project_link: string vazia vira None (null no JSON)
-    raw_project_link = config.get("project_link")
-    if isinstance(raw_project_link, str):
-        raw_project_link = raw_project_link.strip()
-        if raw_project_link == "":
-            raw_project_link = None
-
-    properties = {
-        "Project Name": {
-            "title": [
-                {
-                    "text": {
-                        "content": config["project_name"]
-                    }
-                }
-            ]
-        },
-        "Last Update": {
-            "date": {
-                "start": datetime.now().strftime("%Y-%m-%d")
-            }
-        }
-    }
-
-    # Só define Project Link se houver valor (evita erro de validação com string vazia)
-    if raw_project_link is not None:
-        properties["Project Link"] = {"url": raw_project_link}
+def create_cover(properties):
+    """Cria a página de capa do projeto no database HUB. Encerra o script se falhar."""
+    started = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M")
 
-    payload = {
-        "parent": {"database_id": DATABASE_ID},
-        "properties": properties
-    }
+    def recover():
+        found = find_rows(DATABASE_ID, properties)
+        if found is None:
+            raise RuntimeError("query do HUB falhou")
+        # Versões antigas do mesmo dia têm as mesmas propriedades: só vale a criada agora
+        found = [page for page in found if page.get("created_time", "") >= started]
+        return found[0] if found else None
 
-    resp = requests.post(url, headers=HEADERS, json=payload)
+    resp = NOTION.create_page({"database_id": DATABASE_ID}, properties, recover=recover)
     if resp.status_code != 200:
         print("--- ERRO ao criar capa no Notion ---")
         print("Status:", resp.status_code)
@@ -525,356 +731,712 @@ def build_structure(config, structure):
             print("Resposta bruta:", resp.text)
         sys.exit(1)
 
-    data = resp.json()
-    main_id = data["id"]
     print("> Capa criada.")
+    return resp.json()["id"]
 
-    unified_pages = structure.get("unified_pages", {})
 
-    # Mapa NomeMedida -> ID global, para usar na coluna "ID Medidas"
-    measure_name_to_id = {
-        m["name"]: m.get("global_id", "")
-        for m in structure.get("measures", [])
-    }
+def archive_old_entries(project_name, config=None, max_listed=20):
+    """
+    Arquiva TODAS as versões anteriores do projeto no hub: lê o query inteiro
+    (paginado) antes de arquivar, para o cursor não pular páginas, e arquiva
+    em paralelo na mesma fila/limitador da publicação (notion_concurrency).
+    Retorna (arquivadas, falhas): listas de IDs.
+    """
+    print("--- 2. Limpando Notion (arquivando versões antigas do projeto) ---")
+    NOTION.phase = "Arquivamento"
+    flt = {"property": "Project Name", "title": {"equals": project_name}}
+    try:
+        pages, complete = NOTION.query_all(DATABASE_ID, filter=flt)
+    except Exception as e:
+        print(f"[AVISO] Falha ao consultar versões antigas no Notion: {e}")
+        return [], []
+    if not complete:
+        print(f"[AVISO] Consulta às versões antigas interrompida: só {len(pages)} encontradas serão arquivadas.")
+    if not pages:
+        print("> Nenhuma versão anterior para arquivar.")
+        return [], []
+
+    def archive_job(page_id):
+        def job():
+            try:
+                return NOTION.archive_page(page_id).status_code == 200
+            except Exception as e:
+                print(f"[AVISO] Falha ao arquivar {page_id}: {e}")
+                return False
+        return job
+
+    publisher = make_publisher(config or {})
+    TELEMETRY.start_progress("Arquivamento", len(pages), kind="notion")
+    results = publisher.run([archive_job(p["id"]) for p in pages])
+    TELEMETRY.end_progress()
+    archived = [p for p, ok in zip(pages, results) if ok]
+    failed = [p for p, ok in zip(pages, results) if not ok]
+
+    print(f"> Versões antigas arquivadas: {len(archived)} de {len(pages)}"
+          + (f" ({len(failed)} falharam, ficam para a próxima execução)" if failed else "") + ".")
+    for p in archived[:max_listed]:
+        print(f"  🗄️ {p['id']} (criada em {p.get('created_time', '?')})")
+    if len(archived) > max_listed:
+        print(f"  ... e mais {len(archived) - max_listed}.")
+    for p in failed:
+        print(f"  ❌ {p['id']} (criada em {p.get('created_time', '?')})")
+    return [p["id"] for p in archived], [p["id"] for p in failed]
 
-    # 1. RELACIONAMENTOS
-    print("> DB 1: Relacionamentos")
-    db_rel = create_inline_db(main_id, "1. Relacionamentos", {
-        "ID": {"title": {}},
-        "De": {"rich_text": {}},
-        "Para": {"rich_text": {}},
-        "Cardinalidade": {"select": {}},
-        "Direção": {"select": {}},
-        "Ativa?": {"select": {}}
-    })
-    if db_rel:
-        for i, r in enumerate(structure.get("relationships", [])):
-            add_row_heavy(
-                db_rel,
-                {
-                    "ID": {"title": [{"text": {"content": f"R{i + 1}"}}]},
-                    "De": {"rich_text": [{"text": {"content": r.get("from", "?")}}]},
-                    "Para": {"rich_text": [{"text": {"content": r.get("to", "?")}}]},
-                    "Cardinalidade": {"select": {"name": r.get("cardinality", "-")}},
-                    "Direção": {"select": {"name": r.get("filter", "-")}},
-                    "Ativa?": {"select": {"name": r.get("active", "-")}}
-                },
-                []
-            )
-
-    # 2. TABELAS
-    print("> DB 2: Tabelas")
-    db_tbl = create_inline_db(main_id, "2. Tabelas", {
-        "Nome": {"title": {}},
-        "Qtd Colunas": {"number": {}},
-        "Qtd Col Calculadas": {"number": {}},
-        "Qtd Col Físicas": {"number": {}}
-    })
+
+# ==============================================================================
+# 3. RENDERIZAÇÃO DOS INLINE DBs (offline: propriedades + corpo de cada linha)
+# ==============================================================================
+# 1. RELACIONAMENTOS
+SCHEMA_RELATIONSHIPS = {
+    "ID": {"title": {}},
+    "De": {"rich_text": {}},
+    "Para": {"rich_text": {}},
+    "Cardinalidade": {"select": {}},
+    "Direção": {"select": {}},
+    "Ativa?": {"select": {}}
+}
+
+
+def render_relationships(structure):
+    rows = []
+    for i, r in enumerate(structure.get("relationships", [])):
+        rows.append((
+            f"{r.from_column}->{r.to_column}",
+            {
+                "ID": {"title": [{"text": {"content": f"R{i + 1}"}}]},
+                "De": {"rich_text": [{"text": {"content": r.from_column}}]},
+                "Para": {"rich_text": [{"text": {"content": r.to_column}}]},
+                "Cardinalidade": {"select": {"name": r.cardinality}},
+                "Direção": {"select": {"name": r.filter}},
+                "Ativa?": {"select": {"name": r.active}}
+            },
+            [],
+            f"R{i + 1}"
+        ))
+    return rows
+
+
+# 2. TABELAS
+SCHEMA_TABLES = {
+    "Nome": {"title": {}},
+    "Qtd Colunas": {"number": {}},
+    "Qtd Col Calculadas": {"number": {}},
+    "Qtd Col Físicas": {"number": {}}
+}
+
+
+def render_tables(structure):
     IGNORE = ["_DAX", "_DAX_AUDIT", "DAX", "_TEST"]
-    if db_tbl:
-        for t_name, t_data in sorted(structure.get("tables", {}).items()):
-            if any(ign in t_name for ign in IGNORE):
-                continue
-            body = []
-            cols = t_data.get("columns", [])
-            if cols:
-                body.append(mk_p(f"Colunas ({len(cols)}):"))
-                h = ["Coluna", "Origem", "Tipo"]
-                rs = [
-                    [c["name"], c.get("origin", "Física"), c["type"]]
-                    for c in cols
-                ]
-                if len(rs) > 90:
-                    rs = rs[:90]
-                body.append(create_table_block(h, rs))
-            total_cols = len(cols)
-            calc_cols = sum(1 for c in cols if c.get("origin") == "Calculada (DAX)")
-            phys_cols = total_cols - calc_cols
-
-            add_row_heavy(
-                db_tbl,
-                {
-                    "Nome": {"title": [{"text": {"content": t_name}}]},
-                    "Qtd Colunas": {"number": total_cols},
-                    "Qtd Col Calculadas": {"number": calc_cols},
-                    "Qtd Col Físicas": {"number": phys_cols}
-                },
-                body,
-                t_name
-            )
-
-    # 3. PÁGINAS (UNIFICADAS, COM VISUAL LABEL + ID Medidas)
-    print("> DB 3: Páginas do Relatório (Unified + Label + IDs)")
-    db_pg = create_inline_db(main_id, "3. Páginas do Relatório", {
-        "Página": {"title": {}},
-        "Qtd Visuais": {"number": {}}
-    })
 
-    if db_pg:
-        for p_name, vis_list in sorted(unified_pages.items()):
-            body = [mk_head(f"Visuais nesta página ({len(vis_list)}):", 3)]
-
-            if vis_list:
-                # Agora mostramos IDs das medidas, não os nomes
-                h = ["Tipo Visual", "Visual Label", "Qtd", "ID Medidas"]
-                rs = []
-                for v in vis_list:
-                    m_names = v.get("measures", [])
-                    m_len = len(m_names)
-
-                    # Converte nomes das medidas em IDs globais (M001, M002, ...)
-                    m_ids = []
-                    for m_name in m_names:
-                        mid = measure_name_to_id.get(m_name, "")
-                        if mid:
-                            m_ids.append(mid)
-                    m_str_ids = ", ".join(m_ids)
-
-                    label = v.get("label", "") or ""
-                    rs.append([
-                        v.get("type", "Visual Desconhecido"),
-                        label,
-                        str(m_len),
-                        m_str_ids
-                    ])
-
-                if len(rs) > 90:
-                    rs = rs[:90]
-                body.append(create_table_block(h, rs))
-            else:
-                body.append(mk_p("Nenhum visual com medidas detectado."))
+    rows = []
+    for t_name, t_data in sorted(structure.get("tables", {}).items()):
+        if any(ign in t_name for ign in IGNORE):
+            continue
+        body = []
+        cols = t_data.columns
+        if cols:
+            body.append(mk_p(f"Colunas ({len(cols)}):"))
+            h = ["Coluna", "Origem", "Tipo"]
+            rs = [
+                [c.name, c.origin, c.type]
+                for c in cols
+            ]
+            if len(rs) > 90:
+                rs = rs[:90]
+            body.append(create_table_block(h, rs))
+        total_cols = len(cols)
+        calc_cols = sum(1 for c in cols if c.is_calculated)
+        phys_cols = total_cols - calc_cols
+
+        rows.append((
+            t_name,
+            {
+                "Nome": {"title": [{"text": {"content": t_name}}]},
+                "Qtd Colunas": {"number": total_cols},
+                "Qtd Col Calculadas": {"number": calc_cols},
+                "Qtd Col Físicas": {"number": phys_cols}
+            },
+            body,
+            t_name
+        ))
+    return rows
+
+
+# Ligações com o DB 5 (publicação): relação "Medidas" no DB 3 e no DB 4 e IDs
+# já com link nas tabelas do DB 3 (dispensa o antigo pós-processamento de links)
+MEASURES_RELATION = "Medidas"
+MAX_RELATIONS = 100   # itens por propriedade relation numa requisição (limite do Notion)
+MAX_LINKED_IDS = 49   # IDs com link por célula (rich_text aceita até 100 itens, com as vírgulas)
+
+
+def measures_relation_schema(measures_db_id):
+    return {MEASURES_RELATION: {"relation": {"database_id": measures_db_id, "type": "single_property",
+                                             "single_property": {}}}}
+
+
+def page_url(page_id):
+    return f"https://www.notion.so/{page_id.replace('-', '')}"
+
+
+def linked_measure_ids(names, measure_ids, measure_pages):
+    """Célula 'M001, M002, ...' em rich_text, cada ID com link para a página da medida no DB 5."""
+    ids = [(measure_ids[n], measure_pages.get(n)) for n in names if measure_ids.get(n)]
+    segments = []
+    for i, (mid, page_id) in enumerate(ids[:MAX_LINKED_IDS]):
+        if i:
+            segments.append({"type": "text", "text": {"content": ", "}})
+        text = {"content": mid}
+        if page_id:
+            text["link"] = {"url": page_url(page_id)}
+        segments.append({"type": "text", "text": text})
+    rest = ", ".join(mid for mid, _ in ids[MAX_LINKED_IDS:])
+    if rest:
+        segments.append({"type": "text", "text": {"content": f", {rest}"[:1900]}})
+    return segments
+
+
+def measures_relation(names, measure_pages):
+    """Propriedade relation com as páginas (únicas, na ordem) das medidas no DB 5."""
+    page_ids = list(dict.fromkeys(measure_pages[n] for n in names if measure_pages.get(n)))
+    return {"relation": [{"id": pid} for pid in page_ids[:MAX_RELATIONS]]}
+
+
+# 3. PÁGINAS (UNIFICADAS, COM VISUAL LABEL + ID Medidas)
+SCHEMA_PAGES = {
+    "Página": {"title": {}},
+    "Qtd Visuais": {"number": {}}
+}
 
-            add_row_heavy(
-                db_pg,
-                {
-                    "Página": {"title": [{"text": {"content": p_name}}]},
-                    "Qtd Visuais": {"number": len(vis_list)}
-                },
-                body,
-                p_name
-            )
-
-    # 4. VISUAIS (Agrupados por Tipo)
-    print("> DB 4: Tipos de Visuais")
-    db_vis = create_inline_db(main_id, "4. Visuais Detalhados", {
-        "Tipo": {"title": {}},
-        "Qtd Páginas": {"number": {}}
-    })
+
+def render_pages(structure):
+    unified_pages = structure.get("unified_pages", {})
+    index = structure["render_index"]
+    visual_measure_ids = index["visual_measure_ids"]
+    # Só na publicação, depois do DB 5 (no --site os IDs viram links pelo próprio site)
+    measure_pages = index.get("measure_pages")
+    related = "pages" in index.get("linked_dbs", ())
+
+    rows = []
+    for p_name, vis_list in sorted(unified_pages.items()):
+        body = [mk_head(f"Visuais nesta página ({len(vis_list)}):", 3)]
+
+        if vis_list:
+            # Agora mostramos IDs das medidas, não os nomes
+            h = ["Tipo Visual", "Visual Label", "Qtd", "ID Medidas"]
+            rs = []
+            for v in vis_list:
+                rs.append([
+                    v.type,
+                    v.label,
+                    str(len(v.measures)),
+                    linked_measure_ids(v.measures, index["measure_ids"], measure_pages)
+                    if measure_pages else visual_measure_ids[(p_name, v.id)]
+                ])
+
+            if len(rs) > 90:
+                rs = rs[:90]
+            body.append(create_table_block(h, rs))
+        else:
+            body.append(mk_p("Nenhum visual com medidas detectado."))
+
+        props = {
+            "Página": {"title": [{"text": {"content": p_name}}]},
+            "Qtd Visuais": {"number": len(vis_list)}
+        }
+        if measure_pages and related:
+            props[MEASURES_RELATION] = measures_relation([n for v in vis_list for n in v.measures], measure_pages)
+
+        rows.append((p_name, props, body, p_name))
+    return rows
+
+
+# 4. VISUAIS (Agrupados por Tipo)
+SCHEMA_VISUAL_TYPES = {
+    "Tipo": {"title": {}},
+    "Qtd Páginas": {"number": {}}
+}
+
+
+def render_visual_types(structure):
+    unified_pages = structure.get("unified_pages", {})
+    index = structure["render_index"]
+    measure_pages = index.get("measure_pages")
+    related = "visual_types" in index.get("linked_dbs", ())
 
     type_map = {}
+    type_measures = {}
     for p_name, v_list in unified_pages.items():
         for v in v_list:
-            vt = v.get("type", "Visual Desconhecido")
+            vt = v.type
             if vt not in type_map:
                 type_map[vt] = set()
             type_map[vt].add(p_name)
+            type_measures.setdefault(vt, []).extend(v.measures)
 
-    if db_vis:
-        for v_type, pages in type_map.items():
-            body = [mk_head("Presente nas Páginas:", 3)]
-            for pg in sorted(list(pages)):
-                body.append(mk_li(pg))
+    rows = []
+    for v_type, pages in type_map.items():
+        body = [mk_head("Presente nas Páginas:", 3)]
+        for pg in sorted(list(pages)):
+            body.append(mk_li(pg))
 
-            add_row_heavy(
-                db_vis,
-                {
-                    "Tipo": {"title": [{"text": {"content": v_type}}]},
-                    "Qtd Páginas": {"number": len(pages)}
-                },
-                body,
-                v_type
-            )
-
-    # 5. DAX
-    print("> DB 5: Medidas DAX")
-    db_dax = create_inline_db(main_id, "5. Medidas DAX", {
-        "Nome": {"title": {}},
-        "ID": {"rich_text": {}},
-        "Status": {"select": {}},
-        "Visual?": {"select": {}}
-    })
+        props = {
+            "Tipo": {"title": [{"text": {"content": v_type}}]},
+            "Qtd Páginas": {"number": len(pages)}
+        }
+        if measure_pages and related:
+            props[MEASURES_RELATION] = measures_relation(type_measures[v_type], measure_pages)
 
-    if db_dax:
-        total = len(structure.get("measures", []))
-        for i, m in enumerate(structure.get("measures", [])):
-            status = m.get("status", "Analise")
+        rows.append((v_type, props, body, v_type))
+    return rows
 
-            # Sanitiza o nome da medida para evitar erros no Notion
-            raw_name = (m.get("name") or "").strip()
-            if not raw_name:
-                safe_name = f"[Unnamed Measure {m.get('global_id', '')}]".strip()
-            else:
-                # Evita títulos excessivamente longos
-                safe_name = raw_name[:1800]
+
+# 5. DAX
+SCHEMA_MEASURES = {
+    "Nome": {"title": {}},
+    "ID": {"rich_text": {}},
+    "Status": {"select": {}},
+    "Visual?": {"select": {}}
+}
+
+
+def render_measures(structure):
+    measure_usage = structure["render_index"]["measure_usage"]
+    rows = []
+    for m in structure.get("measures", []):
+        status = m.status or "Analise"
+
+        # Sanitiza o nome da medida para evitar erros no Notion
+        raw_name = m.name.strip()
+        if not raw_name:
+            safe_name = f"[Unnamed Measure {m.global_id}]".strip()
+        else:
+            # Evita títulos excessivamente longos
+            safe_name = raw_name[:1800]
+
+
+        body = [
+            mk_head("📖 Descrição", 3),
+            mk_p(m.desc),
+            mk_div(),
+            mk_head("💻 Código DAX", 3),
+            mk_code(m.dax),
+            mk_div(),
+            mk_head("📄 Uso em Visuais", 3)
+        ]
+
+        found_in_pages = {f"Pág: {p_name} | {v_type} | {label}" for p_name, v_type, label in measure_usage.get(m.name, ())}
+        if found_in_pages:
+            for fp in sorted(found_in_pages):
+                body.append(mk_li(fp))
+        else:
+            body.append(mk_p("Sem uso direto."))
+
+        body.append(mk_div())
+        body.append(mk_head("🔗 Pais", 3))
+        if m.parent_names:
+            for x in m.parent_names:
+                body.append(mk_li(x))
+        else:
+            body.append(mk_p("-"))
+
+        body.append(mk_head("🌲 Filhos", 3))
+        if m.child_names:
+            for x in m.child_names:
+                body.append(mk_li(x))
+        else:
+            body.append(mk_p("-"))
+
+        rows.append((
+            m.name,
+            {
+                "Nome": {"title": [{"text": {"content": safe_name}}]},
+                "ID": {"rich_text": [{"text": {"content": m.global_id}}]},
+                "Status": {"select": {"name": status}},
+                "Visual?": {"select": {"name": m.visual_text}}
+            },
+            body,
+            m.name
+        ))
+    return rows
+
+
+# 6. DAX Tabelas (Colunas Calculadas)
+SCHEMA_CALC_COLUMNS = {
+    "Nome Coluna": {"title": {}},
+    "Tabela": {"rich_text": {}}
+}
 
 
+def render_calc_columns(structure):
+    rows = []
+    for t_name, t_data in sorted(structure.get("tables", {}).items()):
+        for c in t_data.columns:
+            if not c.is_calculated:
+                continue
+            expr = (c.expression_dax or "").strip()
             body = [
-                mk_head("📖 Descrição", 3),
-                mk_p(m.get("desc", "")),
-                mk_div(),
-                mk_head("💻 Código DAX", 3),
-                mk_code(m.get("dax", "")),
+                mk_head("Tabela", 3),
+                mk_p(t_name),
                 mk_div(),
-                mk_head("📄 Uso em Visuais", 3)
+                mk_head("Código DAX", 3),
+                mk_code(expr or "// Expressão DAX não capturada automaticamente.")
             ]
+            rows.append((
+                f"{t_name}.{c.name}",
+                {
+                    "Nome Coluna": {"title": [{"text": {"content": c.name}}]},
+                    "Tabela": {"rich_text": [{"text": {"content": t_name}}]}
+                },
+                body,
+                f"{t_name}.{c.name}"
+            ))
+    return rows
+
+
+# 7. Conexões DB
+SCHEMA_CONNECTIONS = {
+    "Nome Tabela": {"title": {}},
+    "Fonte": {"rich_text": {}},
+    "Projeto / Servidor": {"rich_text": {}},
+    "Dataset / Schema": {"rich_text": {}},
+    "Objeto": {"rich_text": {}}
+}
 
-            found_in_pages = []
-            for p_name, v_list in unified_pages.items():
-                for v in v_list:
-                    if m["name"] in v.get("measures", []):
-                        found_in_pages.append(f"Pág: {p_name} | {v.get('type', 'Visual')} | {v.get('label', '')}")
 
-            if found_in_pages:
-                for fp in sorted(list(set(found_in_pages))):
-                    body.append(mk_li(fp))
-            else:
-                body.append(mk_p("Sem uso direto."))
+def render_connections(structure):
+    # Fonte -> partições que a leem (grafo de fontes do minerador)
+    readers_by_source = {
+        n["source"]: n.get("partitions", [])
+        for n in structure.get("source_graph", [])
+        if n.get("duplicate")
+    }
 
-            body.append(mk_div())
-            body.append(mk_head("🔗 Pais", 3))
-            if m.get("parent_names"):
-                for x in m.get("parent_names"):
-                    body.append(mk_li(x))
-            else:
-                body.append(mk_p("-"))
+    rows = []
+    for conn in structure.get("connections", []):
+        t_name = conn.table
+        fonte = conn.source_type
+        projeto = conn.project
+        dataset = conn.dataset
+        obj = conn.object
+        m_expr = conn.m_expression.strip()
+
+        body = [
+            mk_head("Detalhes da Conexão", 3),
+            mk_p(f"Fonte: {fonte}"),
+            mk_p(f"Projeto/Servidor: {projeto}"),
+            mk_p(f"Dataset/Schema: {dataset}"),
+            mk_p(f"Objeto: {obj}"),
+        ]
+        if conn.partition:
+            body.append(mk_p(f"Partição: {conn.partition}" + (f" ({conn.mode})" if conn.mode else "")))
+        if conn.sources:
+            body.append(mk_head("🧭 Fonte resolvida", 3))
+            for src in conn.sources:
+                body.append(mk_li(src))
+        label = t_name if conn.partition in ("", t_name) else f"{t_name} / {conn.partition}"
+        shared = sorted({
+            other
+            for src in conn.sources
+            for other in readers_by_source.get(src, [])
+            if other != label
+        })
+        if shared:
+            body.append(mk_head("♻️ Mesma fonte lida também por", 3))
+            for other in shared:
+                body.append(mk_li(other))
+        body += [
+            mk_div(),
+            mk_head("M Code (Consulta)", 3),
+            mk_code(m_expr or "// M code não capturado automaticamente.")
+        ]
 
-            body.append(mk_head("🌲 Filhos", 3))
-            if m.get("child_names"):
-                for x in m.get("child_names"):
-                    body.append(mk_li(x))
-            else:
-                body.append(mk_p("-"))
+        rows.append((
+            label,
+            {
+                "Nome Tabela": {"title": [{"text": {"content": label}}]},
+                "Fonte": {"rich_text": [{"text": {"content": fonte}}]},
+                "Projeto / Servidor": {"rich_text": [{"text": {"content": projeto}}]},
+                "Dataset / Schema": {"rich_text": [{"text": {"content": dataset}}]},
+                "Objeto": {"rich_text": [{"text": {"content": obj}}]}
+            },
+            body,
+            t_name or fonte
+        ))
+    return rows
+
+
+# 8. RLS (Row-Level Security)
+SCHEMA_RLS = {
+    "Role Name": {"title": {}},
+    "Qtd Tabelas": {"number": {}}
+}
 
-            time.sleep(0.1)
-            add_row_heavy(
-                db_dax,
-                {
-                    "Nome": {"title": [{"text": {"content": safe_name}}]},
-                    "ID": {"rich_text": [{"text": {"content": m.get("global_id", "")}}]},
-                    "Status": {"select": {"name": status}},
-                    "Visual?": {"select": {"name": m.get("visual_text", "")}}
-                },
-                body,
-                m["name"]
-            )
 
-            if (i + 1) % 50 == 0:
-                print(f"  - {i + 1}/{total} medidas enviadas para o Notion...")
+def render_rls(structure):
+    roles = structure.get("roles", [])
 
+    rows = []
+    for role in roles:
+        rname = role.get("name", "")
+        tables = role.get("tables", [])
+        body = [mk_head("Tabelas e Regras", 3)]
+        if tables:
+            for t in tables:
+                tname = t.get("table", "")
+                fdax = (t.get("filter_dax") or "").strip()
+                body.append(mk_head(tname, 3))
+                if fdax:
+                    body.append(mk_code(fdax))
+                else:
+                    body.append(mk_p("Sem filtro definido."))
+        else:
+            body.append(mk_p("Role sem tabelas associadas."))
+
+        rows.append((
+            rname,
+            {
+                "Role Name": {"title": [{"text": {"content": rname}}]},
+                "Qtd Tabelas": {"number": len(tables)}
+            },
+            body,
+            rname
+        ))
+    return rows
+
+
+# DBs com links / relação para as páginas do DB 5 (publicados depois dele)
+MEASURE_LINKED_DBS = ("pages", "visual_types")
+
+# (chave, título, schema, render, ordered, label), na ordem em que aparecem na capa
+INLINE_DBS = [
+    ("relationships", "1. Relacionamentos", SCHEMA_RELATIONSHIPS, render_relationships, True, ""),
+    ("tables", "2. Tabelas", SCHEMA_TABLES, render_tables, True, ""),
+    ("pages", "3. Páginas do Relatório", SCHEMA_PAGES, render_pages, True, ""),
+    ("visual_types", "4. Visuais Detalhados", SCHEMA_VISUAL_TYPES, render_visual_types, False, ""),
+    ("measures", "5. Medidas DAX", SCHEMA_MEASURES, render_measures, True, "medidas"),
+    ("calc_columns", "6. Medidas DAX Tabelas", SCHEMA_CALC_COLUMNS, render_calc_columns, True, ""),
+    ("connections", "7. Conexões DB", SCHEMA_CONNECTIONS, render_connections, False, ""),
+    ("rls", "8. RLS", SCHEMA_RLS, render_rls, False, ""),
+]
 
 
-    # 6. DAX Tabelas (Colunas Calculadas)
-    print("> DB 6: Medidas DAX Tabelas (Colunas Calculadas)")
-    db_dax_cols = create_inline_db(main_id, "6. Medidas DAX Tabelas", {
-        "Nome Coluna": {"title": {}},
-        "Tabela": {"rich_text": {}}
-    })
+# ==============================================================================
+# 4. BUILDER
+# ==============================================================================
+def build_site(config, structure):
+    """Mesmo conteúdo do build_structure (capa + 8 DBs), gravado como site estático (static_site.py)."""
+    out_dir = config.get("site_dir", DEFAULT_SITE_DIR)
+    fmt = config.get("site_format", "html")
+    print(f"--- 3. Gerando site estático ({fmt}) em {out_dir} ---")
+    t0 = time.perf_counter()
+    sections = [(key, title, schema, render(structure)) for key, title, schema, render, _, _ in INLINE_DBS]
+    try:
+        written = write_site(config, structure, sections, out_dir, fmt, updated=datetime.now().strftime("%Y-%m-%d"))
+    except ValueError as e:
+        sys.exit(f"[ERRO] {e}")
+    print(f"> {written} páginas geradas em {time.perf_counter() - t0:.1f}s. Abra {os.path.join(out_dir, 'index.' + ('html' if fmt == 'html' else 'md'))}")
+    print("\n✨ SUCESSO TOTAL! ✨")
 
-    if db_dax_cols:
-        for t_name, t_data in sorted(structure.get("tables", {}).items()):
-            cols = t_data.get("columns", [])
-            for c in cols:
-                if c.get("origin") != "Calculada (DAX)":
-                    continue
-                expr = (c.get("expression_dax") or "").strip()
-                body = [
-                    mk_head("Tabela", 3),
-                    mk_p(t_name),
-                    mk_div(),
-                    mk_head("Código DAX", 3),
-                    mk_code(expr or "// Expressão DAX não capturada automaticamente.")
-                ]
-                add_row_heavy(
-                    db_dax_cols,
-                    {
-                        "Nome Coluna": {"title": [{"text": {"content": c.get("name", "")}}]},
-                        "Tabela": {"rich_text": [{"text": {"content": t_name}}]}
-                    },
-                    body,
-                    f"{t_name}.{c.get('name', '')}"
-                )
-
-    # 7. Conexões DB
-    print("> DB 7: Conexões DB")
-    db_conn = create_inline_db(main_id, "7. Conexões DB", {
-        "Nome Tabela": {"title": {}},
-        "Fonte": {"rich_text": {}},
-        "Projeto / Servidor": {"rich_text": {}},
-        "Dataset / Schema": {"rich_text": {}},
-        "Objeto": {"rich_text": {}}
-    })
 
-    if db_conn:
-        for conn in structure.get("connections", []):
-            t_name = conn.get("table", "")
-            fonte = conn.get("source_type", "")
-            projeto = conn.get("project", "")
-            dataset = conn.get("dataset", "")
-            obj = conn.get("object", "")
-            m_expr = (conn.get("m_expression") or "").strip()
+def build_structure(config, structure, state=None, journal=None):
+    print("--- 3. Construindo V28 (Final + IA + Visual Label + Big DAX) ---")
 
-            body = [
-                mk_head("Detalhes da Conexão", 3),
-                mk_p(f"Fonte: {fonte}"),
-                mk_p(f"Projeto/Servidor: {projeto}"),
-                mk_p(f"Dataset/Schema: {dataset}"),
-                mk_p(f"Objeto: {obj}"),
-                mk_div(),
-                mk_head("M Code (Consulta)", 3),
-                mk_code(m_expr or "// M code não capturado automaticamente.")
-            ]
+    # Cria a capa do projeto
+    # Normaliza o project_link: string vazia vira None (null no JSON)
+    raw_project_link = config.get("project_link")
+    if isinstance(raw_project_link, str):
+        raw_project_link = raw_project_link.strip()
+        if raw_project_link == "":
+            raw_project_link = None
 
-            add_row_heavy(
-                db_conn,
+    properties = {
+        "Project Name": {
+            "title": [
                 {
-                    "Nome Tabela": {"title": [{"text": {"content": t_name}}]},
-                    "Fonte": {"rich_text": [{"text": {"content": fonte}}]},
-                    "Projeto / Servidor": {"rich_text": [{"text": {"content": projeto}}]},
-                    "Dataset / Schema": {"rich_text": [{"text": {"content": dataset}}]},
-                    "Objeto": {"rich_text": [{"text": {"content": obj}}]}
-                },
-                body,
-                t_name or fonte
-            )
-
-    # 8. RLS (Row-Level Security)
-    print("> DB 8: RLS (Row-Level Security)")
-    db_rls = create_inline_db(main_id, "8. RLS", {
-        "Role Name": {"title": {}},
-        "Qtd Tabelas": {"number": {}}
-    })
+                    "text": {
+                        "content": config["project_name"]
+                    }
+                }
+            ]
+        },
+        "Last Update": {
+            "date": {
+                "start": datetime.now().strftime("%Y-%m-%d")
+            }
+        }
+    }
 
-    roles = structure.get("roles", [])
-    if db_rls and roles:
-        for role in roles:
-            rname = role.get("name", "")
-            tables = role.get("tables", [])
-            body = [mk_head("Tabelas e Regras", 3)]
-            if tables:
-                for t in tables:
-                    tname = t.get("table", "")
-                    fdax = (t.get("filter_dax") or "").strip()
-                    body.append(mk_head(tname, 3))
-                    if fdax:
-                        body.append(mk_code(fdax))
-                    else:
-                        body.append(mk_p("Sem filtro definido."))
-            else:
-                body.append(mk_p("Role sem tabelas associadas."))
+    # Só define Project Link se houver valor (evita erro de validação com string vazia)
+    if raw_project_link is not None:
+        properties["Project Link"] = {"url": raw_project_link}
 
-            add_row_heavy(
-                db_rls,
-                {
-                    "Role Name": {"title": [{"text": {"content": rname}}]},
-                    "Qtd Tabelas": {"number": len(tables)}
-                },
-                body,
-                rname
-            )
-    print("\n✨ SUCESSO TOTAL! ✨")
+    NOTION.phase = "Capa"
+    if journal and journal.cover_id:
+        main_id = journal.cover_id
+        print("> Capa reaproveitada (retomada).")
+    elif state is not None and state.main_id:
+        # Sincronização diferencial: a capa continua a mesma, só atualiza as propriedades
+        main_id = state.main_id
+        NOTION.update_page(main_id, properties=properties)
+        print("> Capa reaproveitada (sincronização diferencial).")
+    else:
+        main_id = create_cover(properties)
+        if journal:
+            journal.record_cover(main_id)
+    if state is not None and state.main_id != main_id:
+        state.main_id = main_id
+        state.save()
+
+    publisher = make_publisher(config, journal)
+
+    # Schemas primeiro, na ordem (o Notion mostra os DBs na ordem de criação).
+    # DB 3 / DB 4 já levam a relação com o DB 5 se ele vier do estado de sincronização
+    known_measures = state.database("measures") if state is not None else None
+    databases = []
+    schemas = {}
+    for key, title, schema, render, ordered, label in INLINE_DBS:
+        print(f"> DB {title}")
+        schemas[key] = schema
+        if key in MEASURE_LINKED_DBS and known_measures:
+            schema = {**schema, **measures_relation_schema(known_measures["id"])}
+        db_id = ensure_inline_db(state, journal, key, main_id, title, schema)
+        if db_id:
+            databases.append((key, title, db_id, render(structure), ordered, label))
+
+    # Relação "Medidas" (DB 3 / DB 4 -> DB 5), agora que o DB 5 existe
+    index = structure["render_index"]
+    db_ids = {db[0]: db[2] for db in databases}
+    index["linked_dbs"] = {
+        key for key, title, _, _, _, _ in INLINE_DBS
+        if key in MEASURE_LINKED_DBS and key in db_ids and "measures" in db_ids
+        and link_measures_db(state, key, db_ids[key], title, schemas[key], db_ids["measures"])
+    }
+    if state is not None:
+        # Ids e hashes de schema gravados antes do conteúdo (que pode levar horas)
+        state.save()
+    NOTION.phase = None
+
+    # Depois o conteúdo: todos os DBs em paralelo numa fila única (respeitando o
+    # rate limit do Notion; o DB com mais requisições pela frente tem prioridade).
+    # DB 3 / DB 4 esperam só o DB 5 terminar: as linhas são renderizadas de novo
+    # com os links e relações apontando para as páginas de medidas recém-publicadas
+    databases.sort(key=lambda db: estimate_requests(db[3]), reverse=True)
+    render_of = {key: render for key, _, _, render, _, _ in INLINE_DBS}
+    measures = {"pages": {}}
+
+    def measures_ready():
+        # Criado dentro do loop do gather (asyncio.run), não antes dele
+        if "event" not in measures:
+            measures["event"] = asyncio.Event()
+        return measures["event"]
+
+    async def fill(priority, key, title, db_id, rows, ordered, label):
+        if key in MEASURE_LINKED_DBS and "measures" in db_ids:
+            await measures_ready().wait()
+            index["measure_pages"] = measures["pages"]
+            rows = render_of[key](structure)
+        if key != "measures":
+            return await publish_rows(publisher, state, key, db_id, rows, ordered, label, title, priority)
+        try:
+            measures["pages"] = await publish_rows(publisher, state, key, db_id, rows, ordered, label, title, priority)
+            return measures["pages"]
+        finally:
+            measures_ready().set()
+
+    if isinstance(NOTION, PlanClient):
+        NOTION.parallel_phases = {title for _, title, _, _, ordered, _ in databases if not ordered}
+    print(f"--- Preenchendo {len(databases)} DBs em paralelo (concorrência {publisher.concurrency}) ---")
+    # ETA da linha de progresso: requisições de uma publicação do zero (na sincronização é um teto)
+    TELEMETRY.start_progress("Notion", sum(estimate_requests(db[3]) for db in databases), kind="notion")
+    publisher.gather([fill(priority, *db) for priority, db in enumerate(databases)])
+    TELEMETRY.end_progress()
+
+    NOTION.print_summary()
+    if isinstance(NOTION, PlanClient):
+        return
+    if NOTION.failures:
+        print(f"\n⚠️ Concluído com {len(NOTION.failures)} chamadas ao Notion sem sucesso (ver lista acima).")
+        if journal:
+            print("   Rode de novo com --resume para reenviar só o que faltou.")
+    else:
+        if journal:
+            journal.finish()
+        print("\n✨ SUCESSO TOTAL! ✨")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Constrói o inventário do projeto no Notion.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--resume", action="store_true",
+        help="Retoma a última publicação interrompida a partir do notion_publish_journal.jsonl",
+    )
+    mode.add_argument(
+        "--plan", action="store_true",
+        help="Simula a publicação sem chamar o Notion: requisições, lotes, bytes e tempo estimado por DB",
+    )
+    mode.add_argument(
+        "--site", action="store_true",
+        help="Gera um site estático (HTML ou Markdown, ver site_format/site_dir) em vez de publicar no Notion",
+    )
+    args = parser.parse_args()
+
+    if args.site:
+        # Offline: sem Notion e sem IA (descrições do cache + regras)
+        conf, struct = load_data(use_ai=False)
+        build_site(conf, struct)
+        sys.exit(0)
+
+    if args.plan:
+        # Renderiza tudo offline (sem IA, sem Notion, sem gravar diário/estado)
+        print("[INFO] Modo --plan: nenhuma chamada será feita ao Notion nem à IA.")
+        conf, struct = load_data(use_ai=False)
+        TELEMETRY.progress_enabled = False  # o PlanClient não faz chamadas de verdade
+        NOTION = PlanClient.from_config(conf)
+        plan_state = None
+        if conf.get("notion_sync", False):
+            plan_state = SyncState.load(conf["project_name"])
+            plan_state.read_only = True
+            if plan_state.main_id:
+                print("[INFO] notion_sync: o plano conta só as diferenças para o notion_sync_state.json.")
+        build_structure(conf, struct, plan_state)
+        sys.exit(0)
+
     conf, struct = load_data()
-    archive_old_entries(conf["project_name"])
-    build_structure(conf, struct)
+    NOTION = NotionClient.from_config(conf, NOTION_TOKEN)
+    if conf.get("notion_sync", False):
+        # Espelho local (notion_mirror.json): o que o Notion devolveu, com last_edited_time
+        NOTION.mirror = NotionMirror.load()
+
+    if args.resume:
+        journal = PublishJournal.resume(conf["project_name"])
+        if journal is None:
+            sys.exit("[ERRO] Nenhum diário de publicação deste projeto para retomar. Rode sem --resume.")
+        if journal.finished:
+            print("[INFO] A última publicação já foi concluída. Nada para retomar.")
+            sys.exit(0)
+        print("--- Retomando publicação interrompida (notion_publish_journal.jsonl) ---")
+    else:
+        journal = PublishJournal.start(conf["project_name"])
+
+    # notion_sync: publica só as diferenças em relação ao notion_sync_state.json
+    sync_state = None
+    if conf.get("notion_sync", False):
+        sync_state = SyncState.load(conf["project_name"])
+        if sync_state.main_id and not cover_is_live(sync_state.main_id):
+            print("[INFO] A capa registrada no estado de sincronização não existe mais. Publicação completa.")
+            sync_state.reset()
+        if sync_state.main_id:
+            print("--- 2. Sincronização diferencial (sem arquivar a versão atual) ---")
+
+    try:
+        # Na retomada a capa do diário é a versão em construção: não arquivar
+        if not journal.cover_id and (sync_state is None or not sync_state.main_id):
+            archive_old_entries(conf["project_name"], conf)
+        build_structure(conf, struct, sync_state, journal)
+    finally:
+        # Telemetria da execução (Notion + IA) e espelho, mesmo se ela for interrompida
+        TELEMETRY.write_report()
+        if NOTION.mirror is not None:
+            NOTION.mirror.save()
+    journal.close()
@@ -0,0 +1,507 @@
+import re
+
+# ==============================================================================
+# DESCRIÇÕES DE MEDIDAS POR REGRAS (sem IA)
+# ==============================================================================
+# Parser pequeno de DAX -> frase curta em português, ex:
+#     SUM(Vendas[Valor]) -> Retorna a soma de Vendas[Valor].
+# Pedaço não reconhecido -> "" e a medida segue para a IA, se ligada.
+
+RULES_MODEL = "regras"
+RULES_VERSION = "1"   # mude ao alterar as regras (descrições antigas são refeitas)
+MAX_PHRASE = 280
+
+RE_TOKEN = re.compile(
+    r"(?P<ws>\s+|//[^\n]*|--[^\n]*|/\*.*?(?:\*/|$))"
+    r"|(?P<str>\"(?:[^\"]|\"\")*\")"
+    r"|(?P<table>'(?:[^']|'')*')"
+    r"|(?P<col>\[(?:[^\]]|\]\])*\])"
+    r"|(?P<num>\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|\.\d+)"
+    r"|(?P<name>[A-Za-z_][\w\.]*)"
+    r"|(?P<op>&&|\|\||<>|<=|>=|==|[-+*/^&=<>(),{}])",
+    re.S,
+)
+
+# model_structure.json guarda o bloco TMDL inteiro: "measure 'Nome' = <DAX>" + propriedades
+RE_TMDL_HEADER = re.compile(r"^\s*measure\s+(?:'(?:[^']|'')*'|\"[^\"]*\"|[^=\n]+?)\s*=", re.S)
+RE_TMDL_PROPERTY = re.compile(
+    r"\n\s*(?:[A-Za-z]+\s*:|(?:annotation|changedProperty|extendedProperty|formatStringDefinition|detailRowsDefinition|kpi)\b)"
+)
+
+# Precedência (menor -> maior); IN entra junto das comparações
+BINARY_LEVELS = (
+    ("||",),
+    ("&&",),
+    ("=", "==", "<>", "<", ">", "<=", ">=", "IN"),
+    ("&",),
+    ("+", "-"),
+    ("*", "/"),
+    ("^",),
+)
+
+AGGREGATIONS = {
+    "SUM": "a soma de {}",
+    "AVERAGE": "a média de {}",
+    "MIN": "o menor valor de {}",
+    "MAX": "o maior valor de {}",
+    "MEDIAN": "a mediana de {}",
+    "COUNT": "a contagem de valores de {}",
+    "COUNTA": "a contagem de valores de {}",
+    "COUNTBLANK": "a quantidade de valores em branco de {}",
+    "DISTINCTCOUNT": "a quantidade de valores distintos de {}",
+    "DISTINCTCOUNTNOBLANK": "a quantidade de valores distintos (sem brancos) de {}",
+}
+
+ITERATORS = {
+    "SUMX": "a soma, linha a linha de {t}, de {e}",
+    "AVERAGEX": "a média, linha a linha de {t}, de {e}",
+    "MINX": "o menor valor, linha a linha de {t}, de {e}",
+    "MAXX": "o maior valor, linha a linha de {t}, de {e}",
+    "MEDIANX": "a mediana, linha a linha de {t}, de {e}",
+    "COUNTX": "a contagem, linha a linha de {t}, de {e}",
+}
+
+PERIOD_TO_DATE = {
+    "DATESYTD": "no acumulado do ano", "DATESQTD": "no acumulado do trimestre", "DATESMTD": "no acumulado do mês",
+}
+TOTAL_TO_DATE = {
+    "TOTALYTD": "no acumulado do ano", "TOTALQTD": "no acumulado do trimestre", "TOTALMTD": "no acumulado do mês",
+}
+RELATIVE_PERIOD = {
+    "SAMEPERIODLASTYEAR": "no mesmo período do ano anterior",
+    "PREVIOUSYEAR": "no ano anterior", "PREVIOUSQUARTER": "no trimestre anterior",
+    "PREVIOUSMONTH": "no mês anterior", "PREVIOUSDAY": "no dia anterior",
+    "NEXTYEAR": "no ano seguinte", "NEXTQUARTER": "no trimestre seguinte",
+    "NEXTMONTH": "no mês seguinte", "NEXTDAY": "no dia seguinte",
+    "LASTDATE": "na última data do período", "FIRSTDATE": "na primeira data do período",
+    "ENDOFYEAR": "no fim do ano", "ENDOFQUARTER": "no fim do trimestre", "ENDOFMONTH": "no fim do mês",
+    "STARTOFYEAR": "no início do ano", "STARTOFQUARTER": "no início do trimestre", "STARTOFMONTH": "no início do mês",
+}
+BALANCES = {
+    "OPENINGBALANCEYEAR": "no início do ano", "OPENINGBALANCEQUARTER": "no início do trimestre",
+    "OPENINGBALANCEMONTH": "no início do mês", "CLOSINGBALANCEYEAR": "no fim do ano",
+    "CLOSINGBALANCEQUARTER": "no fim do trimestre", "CLOSINGBALANCEMONTH": "no fim do mês",
+}
+UNITS = {"YEAR": ("ano", "anos"), "QUARTER": ("trimestre", "trimestres"), "MONTH": ("mês", "meses"), "DAY": ("dia", "dias")}
+COMPARISONS = {
+    "=": "é igual a", "==": "é igual a", "<>": "é diferente de",
+    ">": "é maior que", ">=": "é maior ou igual a", "<": "é menor que", "<=": "é menor ou igual a",
+}
+
+
+class _Unknown(Exception):
+    """Trecho de DAX que as regras não sabem explicar."""
+
+
+# ==============================================================================
+# PARSER
+# ==============================================================================
+
+def tokenize(dax):
+    tokens, pos = [], 0
+    while pos < len(dax):
+        mt = RE_TOKEN.match(dax, pos)
+        if not mt:
+            raise _Unknown(f"caractere inesperado: {dax[pos]!r}")
+        pos = mt.end()
+        kind = mt.lastgroup
+        if kind != "ws":
+            tokens.append((kind, mt.group()))
+    return tokens
+
+
+class _Parser:
+    """Descida recursiva: nós são tuplas ("call", NOME, args), ("col", tabela, coluna), ("op", op, a, b)..."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset=0):
+        i = self.pos + offset
+        return self.tokens[i] if i < len(self.tokens) else (None, None)
+
+    def take(self, text=None):
+        tok = self.peek()
+        if tok[0] is None or (text is not None and tok[1].upper() != text):
+            raise _Unknown(f"esperado {text}, veio {tok[1]}")
+        self.pos += 1
+        return tok
+
+    def parse(self):
+        node = self.expr()
+        if self.pos != len(self.tokens):
+            raise _Unknown("sobra de tokens")
+        return node
+
+    def expr(self):
+        kind, text = self.peek()
+        if kind == "name" and text.upper() == "VAR":
+            defs = []
+            while self.peek()[0] == "name" and self.peek()[1].upper() == "VAR":
+                self.take()
+                name = self.take()[1].upper()
+                self.take("=")
+                defs.append((name, self.expr()))
+            self.take("RETURN")
+            return ("var", defs, self.expr())
+        return self.binary(0)
+
+    def binary(self, level):
+        if level == len(BINARY_LEVELS):
+            return self.unary()
+        left = self.binary(level + 1)
+        while True:
+            kind, text = self.peek()
+            op = text.upper() if kind in ("op", "name") and text else None
+            if op not in BINARY_LEVELS[level]:
+                return left
+            self.take()
+            left = ("op", "=" if op == "==" else op, left, self.binary(level + 1))
+
+    def unary(self):
+        kind, text = self.peek()
+        if kind == "op" and text in "-+":
+            self.take()
+            operand = self.unary()
+            return ("neg", operand) if text == "-" else operand
+        if kind == "name" and text.upper() == "NOT" and self.peek(1)[1] != "(":
+            self.take()
+            return ("call", "NOT", [self.unary()])
+        return self.primary()
+
+    def primary(self):
+        kind, text = self.take()
+        if kind == "num":
+            return ("num", text)
+        if kind == "str":
+            return ("str", text[1:-1].replace('""', '"'))
+        if kind == "col":
+            return ("col", None, text[1:-1].replace("]]", "]"))
+        if kind in ("name", "table"):
+            name = text[1:-1].replace("''", "'") if kind == "table" else text
+            if self.peek()[0] == "col":
+                return ("col", name, self.take()[1][1:-1].replace("]]", "]"))
+            if kind == "name" and self.peek()[1] == "(":
+                self.take()
+                args = []
+                if self.peek()[1] != ")":
+                    args.append(self.expr())
+                    while self.peek()[1] == ",":
+                        self.take()
+                        args.append(self.expr())
+                self.take(")")
+                return ("call", name.upper(), args)
+            return ("name", name)
+        if text == "(":
+            node = self.expr()
+            self.take(")")
+            return node
+        if text == "{":
+            items = [self.expr()]
+            while self.peek()[1] == ",":
+                self.take()
+                items.append(self.expr())
+            self.take("}")
+            return ("list", items)
+        raise _Unknown(f"token inesperado: {text}")
+
+
+def measure_expression(dax):
+    """Só a expressão DAX (sem o cabeçalho "measure X =", propriedades TMDL e crases)."""
+    text = dax or ""
+    header = RE_TMDL_HEADER.match(text)
+    if header:
+        text = text[header.end():]
+        prop = RE_TMDL_PROPERTY.search(text)
+        if prop:
+            text = text[:prop.start()]
+    return text.strip().strip("`").strip()
+
+
+def parse_dax(dax):
+    """DAX -> árvore (levanta _Unknown se a sintaxe não for reconhecida)."""
+    return _Parser(tokenize(dax or "")).parse()
+
+
+# ==============================================================================
+# DESCRITOR
+# ==============================================================================
+
+class DaxDescriber:
+    """describe(dax) -> frase em português, ou "" se as regras não explicam a medida (aceita o bloco TMDL)."""
+
+    def __init__(self, measure_names=()):
+        self.measures = {n.upper() for n in measure_names}
+
+    def describe(self, dax):
+        try:
+            tree = parse_dax(measure_expression(dax))
+            if tree[0] == "col" and tree[1] is None and tree[2].upper() in self.measures:
+                phrase = f"o valor da medida [{tree[2]}]"
+            else:
+                phrase = self._expr(tree, {})
+        except (_Unknown, RecursionError, IndexError):
+            return ""
+        if not phrase or len(phrase) > MAX_PHRASE:
+            return ""
+        return f"Retorna {phrase}."
+
+    # --- expressões (frases nominais: "a soma de ...") -------------------------
+
+    def _expr(self, node, env):
+        kind = node[0]
+        if kind == "var":
+            env = dict(env)
+            for name, value in node[1]:
+                env[name] = value if value[0] != "name" else env.get(value[1].upper(), value)
+            return self._expr(node[2], env)
+        if kind == "name":
+            if node[1].upper() in env:
+                return self._expr(env[node[1].upper()], env)
+            raise _Unknown(node[1])
+        if kind in ("col", "num", "str"):
+            return self._value(node, env)
+        if kind == "neg":
+            return f"o negativo de {self._expr(node[1], env)}"
+        if kind == "op":
+            return self._arith(node, env)
+        if kind == "call":
+            return self._call(node[1], node[2], env)
+        raise _Unknown(kind)
+
+    def _arith(self, node, env):
+        _, op, a, b = node
+        if op == "/":
+            return self._ratio(a, b, env)
+        if op == "-":
+            return f"a diferença entre {self._expr(a, env)} e {self._expr(b, env)}"
+        if op == "+":
+            return f"{self._expr(a, env)} somado a {self._expr(b, env)}"
+        if op == "*":
+            if b[0] == "num" and b[1] == "100":
+                return f"{self._expr(a, env)} em pontos percentuais"
+            return f"{self._expr(a, env)} multiplicado por {self._expr(b, env)}"
+        raise _Unknown(op)
+
+    def _ratio(self, a, b, env):
+        if a[0] == "op" and a[1] == "-" and a[3] == b:
+            return f"a variação percentual de {self._expr(a[2], env)} em relação a {self._expr(b, env)}"
+        return f"a razão entre {self._operand(a, env)} e {self._operand(b, env)}"
+
+    def _operand(self, node, env):
+        """Soma/subtração dentro de uma razão: "(x menos y)" em vez de "a diferença entre x e y"."""
+        if node[0] == "name" and node[1].upper() in env:
+            return self._operand(env[node[1].upper()], env)
+        if node[0] == "op" and node[1] in ("+", "-"):
+            word = "mais" if node[1] == "+" else "menos"
+            return f"({self._expr(node[2], env)} {word} {self._expr(node[3], env)})"
+        return self._expr(node, env)
+
+    def _call(self, fn, args, env):
+        if fn in AGGREGATIONS and len(args) == 1:
+            return AGGREGATIONS[fn].format(self._value(args[0], env))
+        if fn in ITERATORS and len(args) == 2:
+            return ITERATORS[fn].format(t=self._table(args[0], env), e=self._expr(args[1], env))
+        if fn == "COUNTROWS" and len(args) == 1:
+            return f"o número de linhas de {self._table(args[0], env)}"
+        if fn in ("CALCULATE", "CALCULATETABLE") and args:
+            return self._with_filters(self._expr(args[0], env), args[1:], env)
+        if fn in TOTAL_TO_DATE and len(args) >= 2:
+            return self._with_filters(f"{self._expr(args[0], env)} {TOTAL_TO_DATE[fn]}", args[2:3], env)
+        if fn in BALANCES and len(args) >= 2:
+            return self._with_filters(f"{self._expr(args[0], env)} {BALANCES[fn]}", args[2:3], env)
+        if fn == "DIVIDE" and len(args) in (2, 3):
+            return self._ratio(args[0], args[1], env)
+        if fn == "COALESCE" and len(args) >= 2:
+            alts = " ou ".join(self._value(a, env) for a in args[1:])
+            return f"{self._expr(args[0], env)} (ou {alts} quando vazio)"
+        if fn == "IF" and len(args) in (2, 3):
+            cond = self._cond(args[0], env)
+            if len(args) == 2:
+                return f"{self._expr(args[1], env)} somente quando {cond}"
+            return f"{self._expr(args[1], env)} quando {cond}; caso contrário, {self._expr(args[2], env)}"
+        if fn == "SELECTEDVALUE" and args:
+            return f"o valor selecionado de {self._value(args[0], env)}"
+        if fn == "RELATED" and len(args) == 1:
+            return f"{self._value(args[0], env)} da tabela relacionada"
+        if fn == "ABS" and len(args) == 1:
+            return f"o valor absoluto de {self._expr(args[0], env)}"
+        if fn in ("ROUND", "ROUNDUP", "ROUNDDOWN") and len(args) == 2:
+            return f"{self._expr(args[0], env)} arredondado em {self._value(args[1], env)} casas decimais"
+        if fn in ("BLANK", "TODAY", "NOW", "TRUE", "FALSE") and not args:
+            return self._value(("call", fn, args), env)
+        raise _Unknown(fn)
+
+    # --- valores, tabelas, condições e filtros --------------------------------
+
+    def _value(self, node, env):
+        kind = node[0]
+        if kind == "col":
+            return f"{node[1]}[{node[2]}]" if node[1] else f"[{node[2]}]"
+        if kind == "num":
+            return node[1]
+        if kind == "str":
+            return f'"{node[1]}"'
+        if kind == "list":
+            return "(" + ", ".join(self._value(i, env) for i in node[1]) + ")"
+        if kind == "name":
+            if node[1].upper() in env:
+                return self._value(env[node[1].upper()], env)
+            return node[1]
+        if kind == "call" and not node[2]:
+            fixed = {"BLANK": "vazio", "TODAY": "a data de hoje", "NOW": "o momento atual",
+                     "TRUE": "verdadeiro", "FALSE": "falso"}
+            if node[1] in fixed:
+                return fixed[node[1]]
+        if kind == "neg" and node[1][0] == "num":
+            return f"-{node[1][1]}"
+        return self._expr(node, env)
+
+    def _table(self, node, env):
+        kind = node[0]
+        if kind == "name":
+            if node[1].upper() in env:
+                return self._table(env[node[1].upper()], env)
+            return node[1]
+        if kind != "call":
+            raise _Unknown("tabela")
+        fn, args = node[1], node[2]
+        if fn == "FILTER" and len(args) == 2:
+            return f"{self._table(args[0], env)} onde {self._cond(args[1], env)}"
+        if fn in ("VALUES", "DISTINCT") and len(args) == 1:
+            return f"valores distintos de {self._value(args[0], env)}"
+        if fn == "ALL" and len(args) == 1:
+            return f"{self._table(args[0], env) if args[0][0] != 'col' else self._value(args[0], env)} (ignorando filtros)"
+        if fn == "RELATEDTABLE" and len(args) == 1:
+            return f"{self._table(args[0], env)} relacionadas"
+        if fn == "CALCULATETABLE" and args:
+            return self._with_filters(self._table(args[0], env), args[1:], env)
+        raise _Unknown(fn)
+
+    def _cond(self, node, env):
+        kind = node[0]
+        if kind == "name" and node[1].upper() in env:
+            return self._cond(env[node[1].upper()], env)
+        if kind == "op":
+            _, op, a, b = node
+            if op == "&&":
+                return f"{self._cond(a, env)} e {self._cond(b, env)}"
+            if op == "||":
+                return f"{self._cond(a, env)} ou {self._cond(b, env)}"
+            if op == "IN":
+                return f"{self._value(a, env)} está em {self._value(b, env)}"
+            if op in COMPARISONS:
+                return f"{self._value(a, env)} {COMPARISONS[op]} {self._value(b, env)}"
+            raise _Unknown(op)
+        if kind == "call":
+            fn, args = node[1], node[2]
+            if fn == "NOT" and len(args) == 1:
+                inner = args[0]
+                if inner[0] == "call" and inner[1] == "ISBLANK" and len(inner[2]) == 1:
+                    return f"{self._value(inner[2][0], env)} não está vazio"
+                return f"não ({self._cond(inner, env)})"
+            if fn == "ISBLANK" and len(args) == 1:
+                return f"{self._value(args[0], env)} está vazio"
+            if fn == "HASONEVALUE" and len(args) == 1:
+                return f"há um único valor de {self._value(args[0], env)}"
+            if fn in ("AND", "OR") and len(args) == 2:
+                joiner = " e " if fn == "AND" else " ou "
+                return joiner.join(self._cond(a, env) for a in args)
+        return self._value(node, env)
+
+    def _with_filters(self, base, filters, env):
+        """base + filtros: tempo direto ("no ano anterior"), "ignorando ..." (ALL) e o resto em "considerando ..."."""
+        timing, ignoring, other = [], [], []
+        for f in filters:
+            phrase = self._time(f, env)
+            if phrase:
+                timing.append(phrase)
+                continue
+            phrase = self._ignore(f, env)
+            if phrase:
+                ignoring.append(phrase)
+            else:
+                other.append(self._filter(f, env))
+        out = base
+        if timing:
+            out += " " + " e ".join(timing)
+        if other:
+            out += ", considerando " + " e ".join(other)
+        if ignoring:
+            out += ", ignorando " + " e ".join(ignoring)
+        return out
+
+    def _ignore(self, node, env):
+        """ALL / REMOVEFILTERS / ALLEXCEPT usados como filtro -> "os filtros de ..." (None se não for o caso)."""
+        if node[0] == "name" and node[1].upper() in env:
+            return self._ignore(env[node[1].upper()], env)
+        if node[0] != "call":
+            return None
+        fn, args = node[1], node[2]
+        if fn in ("ALL", "REMOVEFILTERS"):
+            if not args:
+                return "todos os filtros"
+            return "os filtros de " + ", ".join(
+                self._value(a, env) if a[0] == "col" else self._table(a, env) for a in args)
+        if fn == "ALLEXCEPT" and len(args) >= 2:
+            keep = ", ".join(self._value(a, env) for a in args[1:])
+            return f"os filtros de {self._table(args[0], env)} (exceto os de {keep})"
+        return None
+
+    def _time(self, node, env):
+        if node[0] == "name" and node[1].upper() in env:
+            return self._time(env[node[1].upper()], env)
+        if node[0] != "call":
+            return None
+        fn, args = node[1], node[2]
+        if fn in PERIOD_TO_DATE:
+            return PERIOD_TO_DATE[fn]
+        if fn in RELATIVE_PERIOD:
+            return RELATIVE_PERIOD[fn]
+        if fn in ("DATEADD", "PARALLELPERIOD") and len(args) == 3:
+            n, unit = self._shift(args[1], args[2])
+            amount = f"{abs(n)} {UNITS[unit][abs(n) != 1]} {'antes' if n < 0 else 'depois'}"
+            if fn == "PARALLELPERIOD":
+                return f"no {UNITS[unit][0]} inteiro, {amount}"
+            return f"no período {amount}"
+        if fn == "DATESINPERIOD" and len(args) == 4:
+            n, unit = self._shift(args[2], args[3])
+            return f"nos {'últimos' if n < 0 else 'próximos'} {abs(n)} {UNITS[unit][abs(n) != 1]}"
+        if fn == "DATESBETWEEN" and len(args) == 3:
+            return f"entre {self._value(args[1], env)} e {self._value(args[2], env)}"
+        return None
+
+    @staticmethod
+    def _shift(count, unit):
+        sign = 1
+        if count[0] == "neg":
+            sign, count = -1, count[1]
+        if count[0] != "num" or unit[0] != "name" or unit[1].upper() not in UNITS:
+            raise _Unknown("deslocamento")
+        return sign * int(float(count[1])), unit[1].upper()
+
+    def _filter(self, node, env):
+        if node[0] == "name" and node[1].upper() in env:
+            return self._filter(env[node[1].upper()], env)
+        if node[0] == "op":
+            return f"que {self._cond(node, env)}"
+        if node[0] != "call":
+            raise _Unknown("filtro")
+        fn, args = node[1], node[2]
+        if fn == "ALLSELECTED":
+            return "apenas a seleção feita no relatório"
+        if fn == "KEEPFILTERS" and len(args) == 1:
+            return f"que {self._cond(args[0], env)} (mantendo os filtros existentes)"
+        if fn == "USERELATIONSHIP" and len(args) == 2:
+            return f"o relacionamento entre {self._value(args[0], env)} e {self._value(args[1], env)}"
+        if fn == "FILTER" and len(args) == 2:
+            return f"que {self._cond(args[1], env)}"
+        if fn in ("VALUES", "DISTINCT") and len(args) == 1:
+            return f"os valores atuais de {self._value(args[0], env)}"
+        if fn == "TREATAS" and len(args) >= 2:
+            cols = ", ".join(self._value(a, env) for a in args[1:])
+            return f"{self._value(args[0], env)} aplicados como filtro em {cols}"
+        if fn in ("NOT", "AND", "OR", "ISBLANK"):
+            return f"que {self._cond(node, env)}"
+        raise _Unknown(fn)
@@ -0,0 +1,232 @@
+import csv
+import hashlib
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+from dax_describer import measure_expression
+
+# ==============================================================================
+# CACHE DE DESCRIÇÕES (measures_enriched.csv + SQLite compartilhado opcional)
+# ==============================================================================
+# Chave = hash da expressão DAX normalizada (sem nome, formatString, lineageTag e
+# comentários): renomear a medida ou copiá-la para outro projeto reaproveita a
+# descrição. Linhas antigas sem dax_hash ainda valem pelo nome.
+
+CACHE_CSV = "measures_enriched.csv"
+SHARED_CACHE_DB = "description_cache.db"
+FIELDNAMES = ["global_id", "measure_name", "description", "dax_hash", "model", "prompt_version"]
+
+# Strings "..." e nomes [..] / '..' ficam intactos; comentários somem; espaço vira separador
+RE_DAX_TOKEN = re.compile(
+    r'"(?:[^"]|"")*"'
+    r"|'(?:[^']|'')*'"
+    r"|\[(?:[^\]]|\]\])*\]"
+    r"|/\*.*?(?:\*/|$)"
+    r"|//[^\n]*"
+    r"|--[^\n]*"
+    r"|\s+"
+    r"|[^\"'\[/\-\s]+"
+    r"|.",
+    re.S,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS descriptions (
+    dax_hash TEXT PRIMARY KEY,
+    description TEXT NOT NULL,
+    measure_name TEXT,
+    project TEXT,
+    model TEXT,
+    prompt_version TEXT,
+    updated_at TEXT
+);
+"""
+
+
+def normalize_dax(dax):
+    """DAX sem comentários, com espaços mínimos e código (fora de literais) em minúsculas."""
+    out = []
+    pending_space = False
+    for tok in RE_DAX_TOKEN.findall(dax or ""):
+        first = tok[0]
+        if first.isspace() or tok.startswith(("//", "--", "/*")):
+            pending_space = True
+            continue
+        if first not in "\"'[":
+            tok = tok.lower()
+        if pending_space and out and (out[-1][-1].isalnum() or out[-1][-1] == "_") and (tok[0].isalnum() or tok[0] == "_"):
+            out.append(" ")
+        out.append(tok)
+        pending_space = False
+    return "".join(out)
+
+
+def dax_hash(dax):
+    """Hash estável (sha1) da expressão DAX normalizada (o bloco TMDL perde cabeçalho e propriedades)."""
+    return hashlib.sha1(normalize_dax(measure_expression(dax)).encode("utf-8")).hexdigest()
+
+
+def legacy_dax_hash(dax):
+    """Hash das versões anteriores (bloco TMDL inteiro); só para reaproveitar linhas antigas do CSV."""
+    return hashlib.sha1(normalize_dax(dax).encode("utf-8")).hexdigest()
+
+
+class DescriptionCache:
+    """
+    Descrições por hash do DAX (CSV do projeto + SQLite compartilhado opcional).
+    lookup(m) -> descrição ou ""; add(m, ...) grava na hora (CSV e SQLite);
+    save(measures) reescreve o CSV completo no formato atual.
+    """
+
+    def __init__(self, path=CACHE_CSV, shared_path=None, project=""):
+        self.path = path
+        self.project = project
+        self.by_hash = {}   # dax_hash -> (descrição, model, prompt_version)
+        self.by_name = {}   # nome -> descrição (só linhas sem dax_hash)
+        self.hits = {"hash": 0, "shared": 0, "name": 0}
+        self._hashes = {}   # id(medida) -> hash (DAX não muda durante a execução)
+        self._conn = None
+        if shared_path:
+            try:
+                self._conn = sqlite3.connect(shared_path)
+                self._conn.executescript(SCHEMA)
+            except sqlite3.Error as e:
+                print(f"[AVISO] Cache compartilhado de descrições indisponível ({shared_path}): {e}")
+                self._conn = None
+
+    @classmethod
+    def from_config(cls, config, path=CACHE_CSV):
+        """description_cache: false (padrão) | true (description_cache.db local) | caminho do .db."""
+        shared = config.get("description_cache", False)
+        cache = cls(path, SHARED_CACHE_DB if shared is True else (shared or None), config.get("project_name", ""))
+        cache.load()
+        return cache
+
+    def hash_of(self, m):
+        h = self._hashes.get(id(m))
+        if h is None:
+            h = self._hashes[id(m)] = dax_hash(m.dax)
+        return h
+
+    def load(self):
+        if not os.path.exists(self.path):
+            print(f"[INFO] Nenhum {self.path} encontrado. Cache de descrições começará vazio.")
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    if not row:
+                        continue
+                    name = (row.get("measure_name") or "").strip()
+                    desc = (row.get("description") or "").strip()
+                    h = (row.get("dax_hash") or "").strip()
+                    if not desc:
+                        continue
+                    if h:
+                        self.by_hash[h] = (desc, row.get("model") or "", row.get("prompt_version") or "")
+                    elif name:
+                        self.by_name[name] = desc
+            print(f"--- Cache de descrições carregado de {self.path} "
+                  f"({len(self.by_hash)} por DAX, {len(self.by_name)} só por nome) ---")
+        except Exception as e:
+            print(f"[AVISO] Falha ao ler {self.path}, seguirá sem cache: {e}")
+            self.by_hash, self.by_name = {}, {}
+
+    def lookup(self, m):
+        """Descrição para a lógica atual da medida: CSV por hash (atual ou legado) > SQLite por hash > CSV por nome (legado)."""
+        h = self.hash_of(m)
+        entry = self.by_hash.get(h) or self.by_hash.get(legacy_dax_hash(m.dax))
+        if entry:
+            self.by_hash[h] = entry
+            self.hits["hash"] += 1
+            return entry[0]
+        if self._conn is not None:
+            row = self._conn.execute(
+                "SELECT description, model, prompt_version FROM descriptions WHERE dax_hash IN (?, ?) "
+                "ORDER BY dax_hash = ? DESC",
+                (h, legacy_dax_hash(m.dax), h),
+            ).fetchone()
+            if row and row[0]:
+                self.by_hash[h] = tuple(r or "" for r in row)
+                self.hits["shared"] += 1
+                return row[0]
+        desc = self.by_name.get(m.name, "")
+        if desc:
+            # Descrição legada / manual sem hash: adota a lógica atual
+            self.by_hash[h] = (desc, "", "")
+            self.hits["name"] += 1
+        return desc
+
+    def model_of(self, m):
+        """Quem escreveu a descrição em cache para a lógica da medida ("" se manual/desconhecido)."""
+        entry = self.by_hash.get(self.hash_of(m))
+        return entry[1] if entry else ""
+
+    def remember(self, m, desc, model="", prompt_version=""):
+        """Registra a descrição só em memória (vai para o CSV no save)."""
+        self.by_hash[self.hash_of(m)] = (desc, model, prompt_version)
+
+    def add(self, measures, desc, model="", prompt_version=""):
+        """Registra a descrição de medidas com o mesmo DAX e grava na hora (CSV + SQLite)."""
+        h = self.hash_of(measures[0])
+        self.by_hash[h] = (desc, model, prompt_version)
+        try:
+            with open(self.path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                for m in measures:
+                    writer.writerow([m.global_id, m.name, desc, h, model, prompt_version])
+        except Exception as e:
+            print(f"[AVISO] Não foi possível anexar descrições em {self.path}: {e}")
+        if self._conn is not None:
+            self._upsert([(h, desc, measures[0].name, model, prompt_version)])
+            self._conn.commit()
+
+    def _upsert(self, rows):
+        now = datetime.now().isoformat(timespec="seconds")
+        self._conn.executemany(
+            "INSERT INTO descriptions (dax_hash, description, measure_name, project, model, prompt_version, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(dax_hash) DO UPDATE SET description = excluded.description, "
+            "measure_name = excluded.measure_name, project = excluded.project, model = excluded.model, "
+            "prompt_version = excluded.prompt_version, updated_at = excluded.updated_at "
+            "WHERE descriptions.description <> excluded.description",
+            [(h, d, n, self.project, mo, pv, now) for h, d, n, mo, pv in rows],
+        )
+
+    def save(self, measures):
+        """Reescreve o CSV (uma linha por medida) e publica no SQLite compartilhado as descrições do projeto."""
+        shared = []
+        try:
+            with open(self.path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+                writer.writeheader()
+                for m in measures:
+                    h = self.hash_of(m)
+                    # m.desc é a palavra final (cache ou IA); model/versão só se o texto for o do cache
+                    desc = m.desc
+                    cached, model, version = self.by_hash.get(h, ("", "", ""))
+                    if cached != desc:
+                        model, version = "", ""
+                    writer.writerow({
+                        "global_id": m.global_id,
+                        "measure_name": m.name,
+                        "description": desc,
+                        "dax_hash": h,
+                        "model": model,
+                        "prompt_version": version,
+                    })
+                    if desc:
+                        shared.append((h, desc, m.name, model, version))
+            print(f"--- Cache de descrições salvo em {self.path} ({len(measures)} medidas) ---")
+        except Exception as e:
+            print(f"[AVISO] Não foi possível salvar {self.path}: {e}")
+        if self._conn is not None and shared:
+            self._upsert(shared)
+            self._conn.commit()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
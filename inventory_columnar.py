@@ -0,0 +1,171 @@
+import os
+import re
+
+try:
+    # Exportação colunar opcional (Parquet / Arrow IPC)
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# ==============================================================================
+# EXPORT COLUNAR DO INVENTÁRIO (Parquet / Arrow)
+# ==============================================================================
+# Tabelas normalizadas (measures, columns, visuals, source_reads, ...) com um
+# arquivo por projeto em inventory_columnar/<tabela>/<project_key>.parquet:
+# rodar de novo troca só o arquivo do projeto.
+
+COLUMNAR_DIR = "inventory_columnar"
+
+# Colunas de cada tabela: (nome, tipo). "str" vira dictionary<int32, string>.
+SCHEMAS = {
+    "measures": [
+        ("project", "str"), ("measure_id", "str"), ("name", "str"), ("table", "str"),
+        ("status", "str"), ("in_visual", "bool"), ("parent_count", "int"),
+        ("child_count", "int"), ("visual_count", "int"), ("dax_length", "int"), ("dax", "str"),
+    ],
+    "measure_edges": [
+        ("project", "str"), ("parent_id", "str"), ("child_id", "str"),
+    ],
+    "tables": [
+        ("project", "str"), ("table", "str"), ("column_count", "int"), ("calculated_count", "int"),
+        ("physical_count", "int"), ("unused_column_count", "int"), ("has_connection", "bool"),
+    ],
+    "columns": [
+        ("project", "str"), ("table", "str"), ("column", "str"), ("data_type", "str"),
+        ("origin", "str"), ("sort_by", "str"), ("is_unused", "bool"),
+    ],
+    "relationships": [
+        ("project", "str"), ("from_column", "str"), ("to_column", "str"),
+        ("cardinality", "str"), ("filter", "str"), ("active", "bool"),
+    ],
+    "pages": [
+        ("project", "str"), ("page_id", "str"), ("page_name", "str"), ("visual_count", "int"),
+    ],
+    "visuals": [
+        ("project", "str"), ("page_id", "str"), ("visual_id", "str"), ("visual_type", "str"),
+        ("label", "str"), ("measure_count", "int"),
+    ],
+    "visual_measures": [
+        ("project", "str"), ("page_id", "str"), ("visual_id", "str"), ("measure_id", "str"),
+    ],
+    "connections": [
+        ("project", "str"), ("table", "str"), ("partition", "str"), ("mode", "str"), ("source_type", "str"),
+        ("source_project", "str"), ("dataset", "str"), ("object", "str"),
+    ],
+    "source_reads": [
+        ("project", "str"), ("source", "str"), ("connector", "str"), ("table", "str"),
+        ("partition", "str"), ("table_count", "int"), ("duplicate", "bool"),
+    ],
+}
+
+
+def project_key_from(name):
+    """Chave de projeto segura para nome de arquivo (ex: 'HR Board KPIs' -> 'HR_Board_KPIs')."""
+    key = re.sub(r"[^\w\-]+", "_", (name or "").strip()).strip("_")
+    return key or "projeto"
+
+
+def build_columnar_rows(inv, project):
+    """
+    Normaliza o inventário em linhas por tabela: {tabela: [tupla, ...]}.
+    Não depende do pyarrow (útil para inspeção/testes).
+    """
+    rows = {name: [] for name in SCHEMAS}
+    measures = inv.get("measures", [])
+    name_to_id = {m.name: m.global_id for m in measures}
+    unused = inv.get("unused_columns", {})
+
+    for m in measures:
+        rows["measures"].append((
+            project, m.global_id, m.name, m.table, m.status, m.in_visual,
+            len(m.parent_names), len(m.child_names), len(m.visual_details), len(m.dax), m.dax,
+        ))
+        for parent in m.parent_names:
+            pid = name_to_id.get(parent)
+            if pid:
+                rows["measure_edges"].append((project, pid, m.global_id))
+
+    for t_name, t in sorted(inv.get("tables", {}).items()):
+        t_unused = unused.get(t_name, {})
+        unused_names = set(t_unused.get("physical", [])) | set(t_unused.get("calculated", []))
+        calc = sum(1 for c in t.columns if c.is_calculated)
+        rows["tables"].append((
+            project, t_name, len(t.columns), calc, len(t.columns) - calc,
+            len(unused_names), t.connection is not None,
+        ))
+        for c in t.columns:
+            rows["columns"].append((
+                project, t_name, c.name, c.type, c.origin, c.sort_by or "", c.name in unused_names,
+            ))
+
+    for r in inv.get("relationships", []):
+        rows["relationships"].append((
+            project, r.from_column, r.to_column, r.cardinality, r.filter, r.active == "True",
+        ))
+
+    for p in inv.get("report_structure", []):
+        rows["pages"].append((project, p.id, p.name, len(p.visuals)))
+        for v in p.visuals:
+            rows["visuals"].append((project, p.id, v.id, v.type, v.label, len(v.measures)))
+            for m_name in v.measures:
+                mid = name_to_id.get(m_name)
+                if mid:
+                    rows["visual_measures"].append((project, p.id, v.id, mid))
+
+    graph = {n["source"]: n for n in inv.get("source_graph", [])}
+    for c in inv.get("connections", []):
+        rows["connections"].append((
+            project, c.table, c.partition, c.mode, c.source_type, c.project, c.dataset, c.object,
+        ))
+        for src in c.sources:
+            node = graph.get(src, {})
+            rows["source_reads"].append((
+                project, src, node.get("connector", ""), c.table, c.partition,
+                len(node.get("tables", [])), bool(node.get("duplicate")),
+            ))
+
+    return rows
+
+
+def _to_arrow_table(name, tuples):
+    arrow_types = {"str": pa.string(), "int": pa.int64(), "bool": pa.bool_()}
+    arrays, fields = [], []
+    for idx, (col, kind) in enumerate(SCHEMAS[name]):
+        arr = pa.array([t[idx] for t in tuples], type=arrow_types[kind])
+        if kind == "str":
+            arr = arr.dictionary_encode()
+        arrays.append(arr)
+        fields.append(pa.field(col, arr.type))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def save_columnar_outputs(inv, project, out_dir=COLUMNAR_DIR, fmt="parquet"):
+    """
+    Grava as tabelas normalizadas em out_dir/<tabela>/<project_key>.<parquet|arrow>.
+    fmt: "parquet" (padrão) ou "arrow" (Arrow IPC / Feather v2).
+    Retorna {tabela: qtd_linhas} ou {} se o pyarrow não estiver instalado.
+    """
+    if pa is None:
+        print("[AVISO] pyarrow não instalado. Exportação colunar (Parquet/Arrow) será ignorada.")
+        return {}
+    if fmt not in ("parquet", "arrow"):
+        raise ValueError(f"Formato colunar inválido: {fmt} (use 'parquet' ou 'arrow')")
+
+    key = project_key_from(project)
+    counts = {}
+    for name, tuples in build_columnar_rows(inv, project).items():
+        table = _to_arrow_table(name, tuples)
+        t_dir = os.path.join(out_dir, name)
+        os.makedirs(t_dir, exist_ok=True)
+        path = os.path.join(t_dir, f"{key}.{fmt}")
+        if fmt == "parquet":
+            pq.write_table(table, path, use_dictionary=True, compression="zstd")
+        else:
+            feather.write_feather(table, path, compression="zstd")
+        counts[name] = table.num_rows
+
+    print(f"--- 🧱 Export colunar ({fmt}) em {out_dir}/ para '{key}': "
+          + ", ".join(f"{k}={v}" for k, v in counts.items()) + " ---")
+    return counts
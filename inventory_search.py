@@ -0,0 +1,168 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+
+# ==============================================================================
+# ÍNDICE FULL-TEXT (SQLite FTS5) DO DAX E M CODE
+# ==============================================================================
+# Um .db pode guardar o portfólio todo; cada projeto só atualiza o que mudou. Uso:
+#     python inventory_search.py CALCULATE "Sales[Amount]"
+#     python inventory_search.py 'SAMEPERIODLASTYEAR AND NOT DATEADD' --fts --db portfolio.db
+
+SEARCH_DB = "inventory_search.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    entry_key TEXT PRIMARY KEY,
+    fts_rowid INTEGER NOT NULL,
+    project TEXT NOT NULL,
+    content_hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_project ON entries(project);
+CREATE VIRTUAL TABLE IF NOT EXISTS code_fts USING fts5(
+    project UNINDEXED,
+    kind UNINDEXED,
+    table_name UNINDEXED,
+    object_id UNINDEXED,
+    name,
+    code,
+    tokenize = "unicode61 remove_diacritics 2 tokenchars '_'"
+);
+"""
+
+
+def open_index(db_path=SEARCH_DB):
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def iter_index_entries(inv):
+    """Gera (kind, tabela, id, nome, código) para tudo que deve ser indexado."""
+    for m in inv.get("measures", []):
+        yield "measure", m.table, m.global_id, m.name, m.dax
+    for t_name, t in inv.get("tables", {}).items():
+        for c in t.columns:
+            if c.is_calculated and c.expression_dax:
+                yield "column", t_name, f"{t_name}.{c.name}", c.name, c.expression_dax
+    for c in inv.get("connections", []):
+        # Uma entrada por partição (Tabela ou Tabela/Partição)
+        obj_id = c.table if c.partition in ("", c.table) else f"{c.table}/{c.partition}"
+        yield "connection", c.table, obj_id, c.partition or c.table, c.m_expression
+    for e in inv.get("expressions", []):
+        if e.get("kind") == "query":
+            yield "expression", "", e["name"], e["name"], e.get("m_expression", "")
+
+
+def update_search_index(inv, project, db_path=SEARCH_DB):
+    """
+    Atualiza incrementalmente o índice de um projeto.
+    Retorna {"added": n, "updated": n, "removed": n, "unchanged": n}.
+    """
+    stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+    conn = open_index(db_path)
+    try:
+        with conn:
+            existing = {
+                key: (rowid, h)
+                for key, rowid, h in conn.execute(
+                    "SELECT entry_key, fts_rowid, content_hash FROM entries WHERE project = ?", (project,)
+                )
+            }
+            current = set()
+            for kind, table_name, obj_id, name, code in iter_index_entries(inv):
+                key = f"{project}\x1f{kind}\x1f{obj_id}"
+                current.add(key)
+                h = hashlib.sha1(f"{table_name}\x1f{name}\x1f{code}".encode("utf-8")).hexdigest()
+                old = existing.get(key)
+                if old and old[1] == h:
+                    stats["unchanged"] += 1
+                    continue
+                if old:
+                    conn.execute("DELETE FROM code_fts WHERE rowid = ?", (old[0],))
+                cur = conn.execute(
+                    "INSERT INTO code_fts (project, kind, table_name, object_id, name, code) VALUES (?, ?, ?, ?, ?, ?)",
+                    (project, kind, table_name, obj_id, name, code),
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (entry_key, fts_rowid, project, content_hash) VALUES (?, ?, ?, ?)",
+                    (key, cur.lastrowid, project, h),
+                )
+                stats["updated" if old else "added"] += 1
+
+            for key, (rowid, _) in existing.items():
+                if key not in current:
+                    conn.execute("DELETE FROM code_fts WHERE rowid = ?", (rowid,))
+                    conn.execute("DELETE FROM entries WHERE entry_key = ?", (key,))
+                    stats["removed"] += 1
+    finally:
+        conn.close()
+
+    print(f"--- 🔎 Índice de busca ({db_path}) atualizado para '{project}': "
+          f"+{stats['added']} ~{stats['updated']} -{stats['removed']} ={stats['unchanged']} ---")
+    return stats
+
+
+def to_fts_query(text):
+    """Converte texto livre em frases FTS5 (cada termo entre aspas)."""
+    terms = [t for t in text.split() if t]
+    return " ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+
+def search(query, db_path=SEARCH_DB, project=None, kind=None, limit=20, raw=False):
+    """Busca no índice. Retorna lista de dicts ordenada por relevância (bm25)."""
+    conn = open_index(db_path)
+    try:
+        sql = (
+            "SELECT project, kind, table_name, object_id, name, "
+            "snippet(code_fts, 5, '»', '«', ' … ', 12) "
+            "FROM code_fts WHERE code_fts MATCH ?"
+        )
+        params = [query if raw else to_fts_query(query)]
+        if project:
+            sql += " AND project = ?"
+            params.append(project)
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        sql += " ORDER BY bm25(code_fts) LIMIT ?"
+        params.append(limit)
+        return [
+            {"project": p, "kind": k, "table": t, "id": i, "name": n, "snippet": s}
+            for p, k, t, i, n, s in conn.execute(sql, params)
+        ]
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Busca full-text no DAX / M code dos inventários.")
+    parser.add_argument("query", nargs="+", help="Termos de busca")
+    parser.add_argument("--db", default=SEARCH_DB, help=f"Arquivo do índice (padrão: {SEARCH_DB})")
+    parser.add_argument("--project", help="Filtra por projeto")
+    parser.add_argument("--kind", choices=["measure", "column", "connection", "expression"], help="Filtra por tipo")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--fts", action="store_true", help="Usa a sintaxe FTS5 crua (AND/OR/NOT, prefixo*)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        sys.exit(f"[ERRO] Índice {args.db} não encontrado. Rode o minerador_pbi.py com search_index habilitado.")
+
+    t0 = time.perf_counter()
+    try:
+        results = search(" ".join(args.query), args.db, args.project, args.kind, args.limit, args.fts)
+    except sqlite3.OperationalError as e:
+        sys.exit(f"[ERRO] Consulta inválida: {e}")
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+
+    for r in results:
+        print(f"[{r['kind']}] {r['project']} | {r['table']} | {r['id']} | {r['name']}")
+        print(f"    {' '.join(r['snippet'].split())}")
+    print(f"\n{len(results)} resultado(s) em {elapsed_ms:.1f} ms.")
+
+
+if __name__ == "__main__":
+    main()
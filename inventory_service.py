@@ -0,0 +1,337 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from pbi_model import inventory_from_dict
+
+# ==============================================================================
+# SERVIÇO HTTP/JSON LOCAL DO INVENTÁRIO
+# ==============================================================================
+# Consulta um ou mais model_structure.json sem o Notion (/measures, /usage,
+# /dependencies, /impact, /pages, /visuals, /tables). Uso:
+#     python inventory_service.py C:/Projetos_PBI --port 8765
+
+DEFAULT_PORT = 8765
+
+
+# ==============================================================================
+# ÍNDICES POR PROJETO
+# ==============================================================================
+
+class InventoryIndex:
+    """Inventário de um projeto + índices para consultas em O(1)/O(grafo)."""
+
+    def __init__(self, project, inv):
+        self.project = project
+        self.inv = inv
+        measures = inv.get("measures", [])
+        self.by_id = {m.global_id.upper(): m for m in measures if m.global_id}
+        self.by_name = {m.name.casefold(): m for m in measures}
+        self.by_table = {}
+        for m in measures:
+            self.by_table.setdefault(m.table.casefold(), []).append(m)
+        self.tables = {name.casefold(): (name, t) for name, t in inv.get("tables", {}).items()}
+
+        # Páginas por nome e por id; visual -> (página, visual); medida -> usos
+        self.pages = {}
+        self.visuals = {}
+        self.usage = {}
+        for p in inv.get("report_structure", []):
+            self.pages[p.name.casefold()] = p
+            self.pages[p.id.casefold()] = p
+            for v in p.visuals:
+                self.visuals[v.id.casefold()] = (p, v)
+                for m_name in v.measures:
+                    self.usage.setdefault(m_name, []).append((p, v))
+
+    def resolve_measure(self, key):
+        if not key:
+            return None
+        return self.by_id.get(key.strip().upper()) or self.by_name.get(key.strip().casefold())
+
+    def walk(self, start, attr):
+        """BFS em parent_names (dependências) ou child_names (impacto). Retorna [(medida, distância)]."""
+        seen = {start.name}
+        out = []
+        queue = deque([(start, 0)])
+        while queue:
+            m, depth = queue.popleft()
+            for n in getattr(m, attr):
+                if n in seen:
+                    continue
+                seen.add(n)
+                nm = self.by_name.get(n.casefold())
+                if nm is None:
+                    continue
+                out.append((nm, depth + 1))
+                queue.append((nm, depth + 1))
+        return out
+
+    # --- serialização compacta -------------------------------------------------
+    def measure_ref(self, m, **extra):
+        d = {"project": self.project, "id": m.global_id, "name": m.name, "table": m.table, "status": m.status}
+        d.update(extra)
+        return d
+
+    def visual_ref(self, p, v):
+        return {
+            "project": self.project, "page": p.name, "page_id": p.id,
+            "visual_id": v.id, "type": v.type, "label": v.label,
+        }
+
+
+def load_inventory_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        inv = inventory_from_dict(json.load(f))
+    folder = os.path.dirname(os.path.abspath(path))
+    project = os.path.basename(folder)
+    cfg_path = os.path.join(folder, "pbi_config.json")
+    if os.path.exists(cfg_path):
+        try:
+            with open(cfg_path, "r", encoding="utf-8") as f:
+                project = json.load(f).get("project_name") or project
+        except Exception:
+            pass
+    return project, inv
+
+
+def find_inventory_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path):
+                if "model_structure.json" in filenames:
+                    files.append(os.path.join(dirpath, "model_structure.json"))
+        elif os.path.exists(path):
+            files.append(path)
+        else:
+            print(f"[AVISO] Caminho não encontrado: {path}")
+    return files
+
+
+# ==============================================================================
+# CONSULTAS
+# ==============================================================================
+
+class InventoryService:
+    def __init__(self, indexes):
+        self.indexes = {ix.project: ix for ix in indexes}
+
+    @classmethod
+    def from_paths(cls, paths):
+        indexes = []
+        for path in find_inventory_files(paths):
+            try:
+                project, inv = load_inventory_file(path)
+            except Exception as e:
+                print(f"[AVISO] Falha ao carregar {path}: {e}")
+                continue
+            indexes.append(InventoryIndex(project, inv))
+            print(f"  > {project}: {len(inv.get('measures', []))} medidas ({path})")
+        return cls(indexes)
+
+    def _selected(self, params):
+        project = params.get("project")
+        if project:
+            ix = self.indexes.get(project)
+            return [ix] if ix else []
+        return list(self.indexes.values())
+
+    def _resolve_all(self, params, key):
+        return [(ix, m) for ix in self._selected(params) for m in [ix.resolve_measure(key)] if m is not None]
+
+    def projects(self, params):
+        return [
+            {
+                "project": ix.project,
+                "measures": len(ix.by_id),
+                "tables": len(ix.tables),
+                "pages": len(ix.inv.get("report_structure", [])),
+                "visuals": len(ix.visuals),
+            }
+            for ix in self.indexes.values()
+        ]
+
+    def measures(self, params):
+        needle = (params.get("name") or "").casefold()
+        table = (params.get("table") or "").casefold()
+        status = params.get("status")
+        out = []
+        for ix in self._selected(params):
+            pool = ix.by_table.get(table, []) if table else ix.by_id.values()
+            for m in pool:
+                if needle and needle not in m.name.casefold():
+                    continue
+                if status and m.status != status:
+                    continue
+                out.append(ix.measure_ref(m))
+        return out
+
+    def measure_detail(self, params, key):
+        out = []
+        for ix, m in self._resolve_all(params, key):
+            out.append(ix.measure_ref(
+                m,
+                dax=m.dax,
+                in_visual=m.in_visual,
+                parents=[ix.measure_ref(p) for n in m.parent_names for p in [ix.by_name.get(n.casefold())] if p],
+                children=[ix.measure_ref(c) for n in m.child_names for c in [ix.by_name.get(n.casefold())] if c],
+                visuals=[ix.visual_ref(p, v) for p, v in ix.usage.get(m.name, [])],
+            ))
+        return out
+
+    def usage(self, params):
+        return [
+            ix.measure_ref(m, visuals=[ix.visual_ref(p, v) for p, v in ix.usage.get(m.name, [])])
+            for ix, m in self._resolve_all(params, params.get("measure"))
+        ]
+
+    def dependencies(self, params):
+        return [
+            ix.measure_ref(m, depends_on=[ix.measure_ref(d, depth=depth) for d, depth in ix.walk(m, "parent_names")])
+            for ix, m in self._resolve_all(params, params.get("measure"))
+        ]
+
+    def impact(self, params):
+        out = []
+        for ix, m in self._resolve_all(params, params.get("measure")):
+            affected = ix.walk(m, "child_names")
+            visuals, seen = [], set()
+            for am in [m] + [a for a, _ in affected]:
+                for p, v in ix.usage.get(am.name, []):
+                    if (p.id, v.id) not in seen:
+                        seen.add((p.id, v.id))
+                        visuals.append(ix.visual_ref(p, v))
+            out.append(ix.measure_ref(
+                m,
+                affected_measures=[ix.measure_ref(a, depth=depth) for a, depth in affected],
+                affected_visuals=visuals,
+                affected_pages=sorted({v["page"] for v in visuals}),
+            ))
+        return out
+
+    def page(self, params, key):
+        out = []
+        for ix in self._selected(params):
+            p = ix.pages.get(key.casefold())
+            if p is None:
+                continue
+            m_names = sorted({n for v in p.visuals for n in v.measures})
+            out.append({
+                "project": ix.project, "page": p.name, "page_id": p.id,
+                "visuals": [dict(ix.visual_ref(p, v), measures=list(v.measures)) for v in p.visuals],
+                "measures": [ix.measure_ref(m) for n in m_names for m in [ix.by_name.get(n.casefold())] if m],
+            })
+        return out
+
+    def visual(self, params, key):
+        out = []
+        for ix in self._selected(params):
+            hit = ix.visuals.get(key.casefold())
+            if hit:
+                p, v = hit
+                out.append(dict(
+                    ix.visual_ref(p, v),
+                    measures=[ix.measure_ref(m) for n in v.measures for m in [ix.by_name.get(n.casefold())] if m],
+                ))
+        return out
+
+    def table(self, params, key):
+        out = []
+        for ix in self._selected(params):
+            hit = ix.tables.get(key.casefold())
+            if hit is None:
+                continue
+            name, t = hit
+            out.append({
+                "project": ix.project,
+                "table": name,
+                "columns": [c.to_dict() for c in t.columns],
+                "measures": [ix.measure_ref(m) for m in ix.by_table.get(key.casefold(), [])],
+                "connection": t.connection.to_dict() if t.connection else None,
+                "unused_columns": ix.inv.get("unused_columns", {}).get(name, {"physical": [], "calculated": []}),
+            })
+        return out
+
+    def dispatch(self, path, params):
+        """Roteia (path, params) -> (status, payload)."""
+        parts = [unquote(p) for p in path.strip("/").split("/") if p]
+        if not parts:
+            return 200, {"endpoints": ["/projects", "/measures", "/measures/<id|nome>", "/usage", "/dependencies",
+                                       "/impact", "/pages/<nome|id>", "/visuals/<id>", "/tables/<nome>"]}
+        head, rest = parts[0], "/".join(parts[1:])
+        if head in ("usage", "dependencies", "impact") and not params.get("measure"):
+            return 400, {"error": "Parâmetro 'measure' obrigatório (ID ou nome)."}
+        routes = {
+            "projects": lambda: self.projects(params),
+            "measures": lambda: self.measure_detail(params, rest) if rest else self.measures(params),
+            "usage": lambda: self.usage(params),
+            "dependencies": lambda: self.dependencies(params),
+            "impact": lambda: self.impact(params),
+            "pages": lambda: self.page(params, rest),
+            "visuals": lambda: self.visual(params, rest),
+            "tables": lambda: self.table(params, rest),
+        }
+        handler = routes.get(head)
+        if handler is None:
+            return 404, {"error": f"Endpoint desconhecido: /{head}"}
+        return 200, {"results": handler()}
+
+
+# ==============================================================================
+# HTTP
+# ==============================================================================
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            t0 = time.perf_counter()
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            try:
+                status, payload = service.dispatch(url.path, params)
+            except Exception as e:
+                status, payload = 500, {"error": str(e)}
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("X-Elapsed-Ms", f"{(time.perf_counter() - t0) * 1000:.2f}")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço local de consulta aos inventários (offline).")
+    parser.add_argument("paths", nargs="*", default=["."], help="model_structure.json ou pastas a varrer")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    print("--- 🗂️  Carregando inventários ---")
+    service = InventoryService.from_paths(args.paths)
+    if not service.indexes:
+        sys.exit("[ERRO] Nenhum model_structure.json carregado. Rode o minerador_pbi.py primeiro.")
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"✅ Serviço no ar em http://{args.host}:{args.port}/ ({len(service.indexes)} projeto(s)). Ctrl+C para sair.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
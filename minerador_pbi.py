@@ -1,8 +1,13 @@
 import os
 import re
+import sys
 import json
 import csv
 
+from inventory_columnar import save_columnar_outputs
+from inventory_search import SEARCH_DB, update_search_index
+from pbi_model import Column, Connection, Measure, Page, Relationship, Table, Visual, inventory_to_dict
+
 # ==============================================================================
 # CONFIGURAÇÃO
 # ==============================================================================
@@ -45,6 +50,9 @@ def clean_name(raw_name):
         raw_name = raw_name[1:-1]
     return raw_name.replace('"', '').replace("'", '').replace('`', '').strip()
 
+# Referência a coluna em DAX: 'Tabela'[Coluna], Tabela[Coluna] ou [Coluna]
+RE_DAX_COL_REF = re.compile(r"(?:'((?:[^']|'')+)'|([A-Za-z_][\w\.]*))?\s*\[((?:[^\]]|\]\])+)\]")
+
 def clean_ref(ref):
     return ref.replace("'", "").replace('"', "").strip()
 
@@ -54,14 +62,44 @@ def get_human_visual_type(raw_type):
         return "Visual Desconhecido"
     return VISUAL_TRANSLATE.get(raw_type, raw_type)
 
+def collect_visual_field_refs(data, refs):
+    """
+    Percorre um JSON de visual/página/relatório e acumula em refs os pares
+    (tabela, coluna) usados em campos, filtros e ordenações.
+    Strings que são JSON embutido (config do report.json legado) também são lidas.
+    """
+    if isinstance(data, dict):
+        col_node = data.get("Column")
+        if isinstance(col_node, dict):
+            entity = (((col_node.get("Expression") or {}).get("SourceRef") or {}).get("Entity"))
+            prop = col_node.get("Property")
+            if entity and prop:
+                refs.add((entity, prop))
+        for v in data.values():
+            collect_visual_field_refs(v, refs)
+    elif isinstance(data, list):
+        for v in data:
+            collect_visual_field_refs(v, refs)
+    elif isinstance(data, str) and data[:1] == "{" and '"Property"' in data:
+        try:
+            collect_visual_field_refs(json.loads(data), refs)
+        except Exception:
+            pass
+
 # --- SCANNER V31 (Smart Type Detection) ---
-def scan_report_hierarchy_v31(root_path, all_measures_names):
+def scan_report_hierarchy_v31(root_path, all_measures_names, field_refs=None):
+    """
+    Mapeia páginas e visuais do relatório com as medidas usadas em cada visual.
+    Se field_refs (set) for informado, acumula nele as colunas (tabela, coluna)
+    referenciadas por qualquer JSON do relatório (visuais, filtros de página etc.).
+    """
     print(f"--- 🕵️  Mapeando Hierarquia (V31 Visual Decoder) ---")
     
     # 1. Mapeia Páginas
     page_map = {}
-    for dirpath, _, filenames in os.walk(root_path):
-        for f in filenames:
+    for dirpath, dirnames, filenames in os.walk(root_path):
+        dirnames.sort()
+        for f in sorted(filenames):
             if f.lower().endswith(".json"):
                 try:
                     with open(os.path.join(dirpath, f), "r", encoding="utf-8-sig") as file:
@@ -82,20 +120,38 @@ def scan_report_hierarchy_v31(root_path, all_measures_names):
     files_scanned = 0
 
     # 2. Varredura
-    for dirpath, _, filenames in os.walk(root_path):
+    for dirpath, dirnames, filenames in os.walk(root_path):
+        dirnames.sort()
         if "SemanticModel" in dirpath:
             continue
 
-        for filename in filenames:
+        for filename in sorted(filenames):
             if not filename.lower().endswith(".json"):
                 continue
             
             # Filtro estrito para pegar apenas arquivos de configuração visual
             is_visual_file = "visual" in filename.lower() or "visuals" in dirpath.lower()
-            if not is_visual_file:
+            if not is_visual_file and field_refs is None:
                 continue
 
             filepath = os.path.join(dirpath, filename)
+
+            # B. Lê Conteúdo
+            try:
+                with open(filepath, "r", encoding="utf-8-sig") as f:
+                    file_content = f.read()
+            except:
+                continue
+
+            # Uso de colunas vale para qualquer JSON do relatório (filtros de página/relatório inclusive)
+            if field_refs is not None:
+                try:
+                    collect_visual_field_refs(json.loads(file_content), field_refs)
+                except Exception:
+                    pass
+
+            if not is_visual_file:
+                continue
             files_scanned += 1
             
             # A. Identifica Página
@@ -109,15 +165,8 @@ def scan_report_hierarchy_v31(root_path, all_measures_names):
                     break
             
             if page_id not in pages_db:
-                pages_db[page_id] = {"id": page_id, "name": page_name, "visuals": []}
+                pages_db[page_id] = Page(page_id, page_name)
 
-            # B. Lê Conteúdo
-            try:
-                with open(filepath, "r", encoding="utf-8-sig") as f:
-                    file_content = f.read()
-            except:
-                continue
-            
             lower_content = file_content.lower()
 
             # C. Busca Medidas
@@ -169,23 +218,325 @@ def scan_report_hierarchy_v31(root_path, all_measures_names):
                 except Exception:
                     vis_label = ""
 
-                existing = next((v for v in pages_db[page_id]["visuals"] if v["id"] == vis_id_short), None)
+                existing = next((v for v in pages_db[page_id].visuals if v.id == vis_id_short), None)
                 if existing:
-                    existing["measures"] = list(set(existing["measures"] + measures_found))
-                    if not existing.get("label") and vis_label:
-                        existing["label"] = vis_label
+                    existing.measures = list(dict.fromkeys(existing.measures + measures_found))
+                    if not existing.label and vis_label:
+                        existing.label = vis_label
                 else:
-                    pages_db[page_id]["visuals"].append({
-                        "id": vis_id_short,
-                        "type": vis_type,
-                        "measures": measures_found,
-                        "label": vis_label
-                    })
-
-    total_vis = sum(len(p["visuals"]) for p in pages_db.values())
+                    pages_db[page_id].visuals.append(Visual(vis_id_short, vis_type, measures_found, vis_label))
+
+    total_vis = sum(len(p.visuals) for p in pages_db.values())
     print(f"   > Visuais DECODIFICADOS: {total_vis}")
     return list(pages_db.values()), total_vis
 
+# ==============================================================================
+# M CODE: PARTIÇÕES, EXPRESSÕES COMPARTILHADAS E GRAFO DE FONTES
+# ==============================================================================
+# Namespaces M que transformam dados (não são leitura de fonte)
+M_NON_SOURCE_NS = {
+    "Table", "List", "Text", "Record", "Value", "Number", "Date", "DateTime", "DateTimeZone",
+    "Duration", "Time", "Logical", "Json", "Csv", "Excel", "Binary", "Lines", "Xml", "Splitter",
+    "Combiner", "Replacer", "Comparer", "Character", "Uri", "Expression", "Function", "Type",
+    "Int64", "Int32", "Currency", "Percentage", "Byte", "Single", "Double", "Decimal", "Diagnostics",
+}
+RE_M_CALL = re.compile(r"\b((?:[A-Z][A-Za-z0-9]*\.)+[A-Z][A-Za-z0-9]*)\s*\(")
+RE_M_NAV = re.compile(r"\{\s*\[([^\]]*)\]\s*\}")
+RE_M_NAV_FIELD = re.compile(r"(Name|Schema|Item|Id)\s*=\s*(\"(?:[^\"]|\"\")*\"|#\"(?:[^\"]|\"\")*\"|[A-Za-z_][\w\.]*)")
+RE_M_STRING = re.compile(r"\"(?:[^\"]|\"\")*\"")
+RE_M_ARG = re.compile(r"\"(?:[^\"]|\"\")*\"|(?<![\w\.#])[A-Za-z_]\w*")
+# Passo do let no início da linha (Nome = ... / #"Nome" = ...), base de uma navegação e SQL nativo
+RE_M_STEP = re.compile(r"^[ \t]*(#\"(?:[^\"]|\"\")*\"|[A-Za-z_]\w*)\s*=(?![=>])", re.M)
+RE_M_NAV_BASE = re.compile(r"(#\"(?:[^\"]|\"\")*\"|(?<![\w\.])[A-Za-z_]\w*)?\s*$")
+RE_M_NATIVE = re.compile(r"Value\.NativeQuery\s*\(\s*(#\"(?:[^\"]|\"\")*\"|[A-Za-z_]\w*)[^,]*,\s*(\"(?:[^\"]|\"\")*\")")
+RE_M_TOKEN = re.compile(r"#\"(?:[^\"]|\"\")*\"|\"(?:[^\"]|\"\")*\"|(?<![\w\.])[A-Za-z_]\w*(?![\w\.])")
+
+def _indent(line):
+    return len(line.expandtabs(4)) - len(line.expandtabs(4).lstrip())
+
+def _indented_body(lines, start, base_indent):
+    """
+    Coleta o corpo de uma expressão TMDL a partir de lines[start]: linhas mais
+    indentadas que base_indent, parando na primeira linha (não vazia) com
+    indentação menor que a do próprio corpo (próxima propriedade / bloco).
+    """
+    body, body_indent = [], None
+    for line in lines[start:]:
+        if not line.strip():
+            body.append(line)
+            continue
+        ind = _indent(line)
+        if ind <= base_indent or (body_indent is not None and ind < body_indent):
+            break
+        if body_indent is None:
+            body_indent = ind
+        body.append(line)
+    return "\n".join(body).strip()
+
+def parse_m_partitions(content, kind="m"):
+    """Retorna [(nome_partição, modo, source)] das partições de um arquivo de tabela (kind: "m" ou "calculated")."""
+    lines = content.split("\n")
+    parts = []
+    for i, line in enumerate(lines):
+        head = re.match(r"^(\s*)partition\s+(.+?)\s*=\s*(\w+)\s*$", line)
+        if not head or head.group(3).lower() != kind:
+            continue
+        p_indent = _indent(line)
+        mode, m_code = "", ""
+        for j in range(i + 1, len(lines)):
+            ln = lines[j]
+            if ln.strip() and _indent(ln) <= p_indent:
+                break
+            st = ln.strip()
+            if st.startswith("mode:"):
+                mode = st.replace("mode:", "").strip()
+            src = re.match(r"^\s*source\s*=\s*(.*)$", ln)
+            if src and not m_code:
+                inline = src.group(1).strip()
+                m_code = inline if inline else _indented_body(lines, j + 1, _indent(ln))
+        parts.append((clean_name(head.group(2)), mode, m_code))
+    return parts
+
+def parse_table_dax(content):
+    """
+    DAX da tabela fora de colunas e medidas: fonte das partições calculadas
+    (tabelas calculadas) e itens de grupos de cálculo (com formatStringDefinition).
+    Retorna [{"kind", "name", "expression"}].
+    """
+    out = [
+        {"kind": "calculated_table", "name": p_name, "expression": dax.strip("`").strip()}
+        for p_name, _, dax in parse_m_partitions(content, "calculated")
+    ]
+    lines = content.split("\n")
+    item = ""
+    for i, line in enumerate(lines):
+        head = re.match(r"^(\s*)(calculationItem\s+(.+?)|formatStringDefinition)\s*=\s*(.*)$", line)
+        if not head:
+            continue
+        inline = head.group(4).strip()
+        dax = inline if inline else _indented_body(lines, i + 1, _indent(line))
+        if head.group(3):
+            item = clean_name(head.group(3))
+            kind = "calculation_item"
+        else:
+            kind = "format_string"
+        out.append({"kind": kind, "name": item, "expression": dax.strip("`").strip()})
+    return out
+
+def parse_m_expressions(content):
+    """
+    Retorna [{"name", "kind", "value", "m_expression"}] das expressões compartilhadas
+    (expressions.tmdl). kind = "parameter" para parâmetros (IsParameterQuery=true).
+    """
+    lines = content.split("\n")
+    exprs = []
+    for i, line in enumerate(lines):
+        head = re.match(r"^(\s*)expression\s+(.+?)\s*=\s*(.*)$", line)
+        if not head:
+            continue
+        inline = head.group(3).strip()
+        m_code = inline if inline else _indented_body(lines, i + 1, _indent(line))
+        is_param = "IsParameterQuery" in m_code and "true" in m_code.split("IsParameterQuery", 1)[1][:20].lower()
+        value = ""
+        if is_param:
+            lit = RE_M_STRING.match(m_code.strip())
+            value = lit.group(0)[1:-1].replace('""', '"') if lit else m_code.split(" meta ")[0].strip()
+        exprs.append({
+            "name": clean_name(head.group(2)),
+            "kind": "parameter" if is_param else "query",
+            "value": value,
+            "m_expression": m_code,
+        })
+    return exprs
+
+def find_m_references(m_code, names):
+    """Nomes de outras queries/parâmetros referenciados num trecho de M code."""
+    no_strings = RE_M_STRING.sub('""', re.sub(r"#\"(?:[^\"]|\"\")*\"", " ", m_code))
+    refs = []
+    for n in names:
+        if f'#"{n}"' in m_code:
+            refs.append(n)
+        elif re.match(r"^[A-Za-z_]\w*$", n) and re.search(r"(?<![\w\.])" + re.escape(n) + r"(?![\w])", no_strings):
+            refs.append(n)
+    return refs
+
+def _m_value(token, params):
+    """Resolve um literal M ou nome de parâmetro para texto."""
+    token = token.strip()
+    if token.startswith('#"'):
+        token = token[1:]
+    if token.startswith('"') and token.endswith('"'):
+        return token[1:-1].replace('""', '"')
+    return params.get(token, token)
+
+def _m_name(token):
+    """Nome de passo/query M: #"Nome com espaço" -> Nome com espaço."""
+    return token[2:-1].replace('""', '"') if token.startswith('#"') else token
+
+def _m_connectors(m_code, params):
+    """Chamadas de conector (leitura de fonte) num trecho M: [(conector, args)]."""
+    connectors = []
+    for call in RE_M_CALL.finditer(m_code):
+        fn = call.group(1)
+        if fn.split(".")[0] in M_NON_SOURCE_NS:
+            continue
+        depth, k = 1, call.end()
+        while k < len(m_code) and depth:
+            depth += {"(": 1, ")": -1}.get(m_code[k], 0)
+            k += 1
+        raw_args = m_code[call.end():k - 1]
+        args = [
+            _m_value(tok, params)
+            for tok in RE_M_ARG.findall(raw_args)
+            if tok.startswith('"') or tok in params
+        ]
+        connectors.append((fn, tuple(args)))
+    return connectors
+
+def describe_m_nav(m_code, params, refs=()):
+    """
+    Conectores e passos de navegação ({[Name=...]}, {[Schema=...,Item=...]}, SQL
+    nativo) de um trecho M, amarrados pela variável do let: cada passo navega a
+    partir da origem do passo que ele referencia (ex: ds = Source{[...]} -> Source).
+    Retorna ([(conector, args, origem)], {origem: [passos de navegação]});
+    origem = nome do passo com o conector, ou ("ref", query) para uma query
+    compartilhada (refs).
+    """
+    marks = [(_m_name(m.group(1)), m.end()) for m in RE_M_STEP.finditer(m_code)] or [("", 0)]
+    roots, connectors, nav = {}, [], {}
+
+    def origin_of(token, default):
+        name = _m_name(token) if token else ""
+        if not name:
+            return default
+        if name in roots:
+            return roots[name]
+        return ("ref", name) if name in refs else default
+
+    for i, (name, start) in enumerate(marks):
+        body = m_code[start:marks[i + 1][1] if i + 1 < len(marks) else len(m_code)]
+        calls = _m_connectors(body, params)
+        root = name if calls else None
+        if root is None:
+            # Sem conector: herda a origem do primeiro passo / query que o passo usa
+            for tok in RE_M_TOKEN.findall(body):
+                if not tok.startswith('"'):
+                    root = origin_of(tok, None)
+                    if root is not None:
+                        break
+        roots[name] = root
+        connectors.extend((fn, args, name) for fn, args in calls)
+        for step in RE_M_NAV.finditer(body):
+            base = RE_M_NAV_BASE.search(body, 0, step.start())
+            origin = origin_of(base.group(1) if base else "", root)
+            fields = dict(RE_M_NAV_FIELD.findall(step.group(1)))
+            for key in ("Name", "Schema", "Item", "Id"):
+                if key in fields and origin is not None:
+                    nav.setdefault(origin, []).append(_m_value(fields[key], params))
+        for native in RE_M_NATIVE.finditer(body):
+            origin = origin_of(native.group(1), root)
+            if origin is not None:
+                nav.setdefault(origin, []).append("SQL: " + " ".join(_m_value(native.group(2), params).split()))
+    return connectors, nav
+
+def describe_m_sources(m_code, params):
+    """
+    Extrai as leituras de fonte de um M code: [(conector, args, [passos de navegação])].
+    args e passos já vêm com parâmetros resolvidos para os valores; cada conector
+    leva só os passos que navegam a partir dele.
+    """
+    connectors, nav = describe_m_nav(m_code, params)
+    return [(fn, args, nav.get(origin, [])) for fn, args, origin in connectors]
+
+def source_key(connector, args, nav):
+    key = f"{connector}({', '.join(args)})"
+    return " › ".join([key] + list(nav))
+
+def build_source_graph(partitions, expressions):
+    """
+    Resolve partições -> expressões compartilhadas -> fontes e agrupa por fonte.
+    partitions: [(tabela, partição, modo, m_code)].
+    Retorna (grafo, fontes_por_partição):
+        grafo = [{"source", "connector", "tables", "partitions", "via", "reads", "duplicate"}]
+        fontes_por_partição = {(tabela, partição): [source_key, ...]}
+    """
+    params = {e["name"]: e["value"] for e in expressions if e["kind"] == "parameter"}
+    queries = {e["name"]: e for e in expressions if e["kind"] == "query"}
+    names = list(queries)
+    resolved = {}
+
+    def resolve(m_code, stack):
+        refs = [r for r in find_m_references(m_code, names) if r not in stack]
+        connectors, nav = describe_m_nav(m_code, params, refs)
+        out = [(fn, args, nav.get(origin, []), ()) for fn, args, origin in connectors]
+        # Queries compartilhadas sempre entram, somadas às fontes da própria partição
+        for r in refs:
+            if r not in resolved:
+                resolved[r] = resolve(queries[r]["m_expression"], stack | {r})
+            for fn, args, r_nav, via in resolved[r]:
+                out.append((fn, args, list(r_nav) + nav.get(("ref", r), []), (r,) + via))
+        return out
+
+    for e in queries.values():
+        e["references"] = find_m_references(e["m_expression"], [n for n in names + list(params) if n != e["name"]])
+    for e in expressions:
+        e.setdefault("references", [])
+
+    graph, by_partition = {}, {}
+    for t_name, p_name, mode, m_code in partitions:
+        for fn, args, nav, via in resolve(m_code, frozenset()):
+            key = source_key(fn, args, nav)
+            node = graph.setdefault(key, {
+                "source": key, "connector": fn, "tables": [], "partitions": [], "via": [], "modes": [],
+            })
+            label = t_name if p_name == t_name else f"{t_name} / {p_name}"
+            if label not in node["partitions"]:
+                node["partitions"].append(label)
+            if t_name not in node["tables"]:
+                node["tables"].append(t_name)
+            for v in via:
+                if v not in node["via"]:
+                    node["via"].append(v)
+            if mode and mode not in node["modes"]:
+                node["modes"].append(mode)
+            by_partition.setdefault((t_name, p_name), []).append(key)
+
+    out = []
+    for node in graph.values():
+        node["reads"] = len(node["partitions"])
+        # Várias partições da mesma tabela (ex.: por ano) são normais; duplicidade = tabelas distintas
+        node["duplicate"] = len(node["tables"]) > 1
+        out.append(node)
+    out.sort(key=lambda n: (-n["reads"], n["source"]))
+    return out, by_partition
+
+def legacy_connection_fields(m_block):
+    """Campos clássicos do BD7 (fonte, projeto/servidor, dataset/schema, objeto) a partir do M code."""
+    # Tipo de fonte (primeira linha após 'Source =')
+    src_type = ""
+    m_src_type = re.search(r"Source\s*=\s*([^,\n]+)", m_block)
+    if m_src_type:
+        src_type = m_src_type.group(1).strip()
+
+    # Projeto / servidor (Name="...")
+    project = ""
+    m_proj = re.search(r"Source\{\[Name=\"([^\"]+)\"\]\}\[Data\]", m_block)
+    if m_proj:
+        project = m_proj.group(1).strip()
+
+    # Dataset / schema
+    dataset = ""
+    m_schema = re.search(r"Name=\"([^\"]+)\",Kind=\"Schema\"", m_block)
+    if m_schema:
+        dataset = m_schema.group(1).strip()
+
+    # Objeto (View/Table)
+    obj_name = ""
+    m_obj = re.search(r"Name=\"([^\"]+)\",Kind=\"(View|Table)\"", m_block)
+    if m_obj:
+        obj_name = m_obj.group(1).strip()
+    return src_type, project, dataset, obj_name
+
 def parse_tmdl_structure(root_path):
     print(f"--- ⛏️  Iniciando Mineração V31 ---")
     tables_data = {}
@@ -193,16 +544,22 @@ def parse_tmdl_structure(root_path):
     measures = []
     connections = []
     roles = []  # Infra de RLS (preenchido em projetos com roles)
+    m_partitions = []  # (tabela, partição, modo, m_code)
+    m_expressions = []  # expressões compartilhadas / parâmetros
+    table_dax = []  # tabelas calculadas e itens de grupos de cálculo
 
-    re_table = re.compile(r"^\s*table\s+['\"]?([^'\"]+)['\"]?", re.MULTILINE)
+    re_table = re.compile(r"^\s*table\s+['\"]?([^'\"\n]+)['\"]?", re.MULTILINE)
     re_measure = re.compile(r"measure\s+(['\"]?.*?['\"]?)\s*=")
+    re_role = re.compile(r"^\s*role\s+(.+?)\s*$", re.MULTILINE)
+    re_table_perm = re.compile(r"^\s*tablePermission\s+('[^']+'|\S+)\s*=", re.MULTILINE)
     re_rel_block = re.compile(
         r"relationship\s+.*?(?=\n\s*(?:relationship|table|measure|\Z))",
         re.DOTALL | re.IGNORECASE,
     )
 
-    for dirpath, _, filenames in os.walk(root_path):
-        for filename in filenames:
+    for dirpath, dirnames, filenames in os.walk(root_path):
+        dirnames.sort()  # ordem estável: o inventário não pode mudar entre execuções
+        for filename in sorted(filenames):
             if not filename.endswith(TMDL_EXT):
                 continue
             filepath = os.path.join(dirpath, filename)
@@ -218,7 +575,8 @@ def parse_tmdl_structure(root_path):
                 raw = t_match.group(1) if t_match else filename.replace(TMDL_EXT, "")
                 current_table = clean_name(raw)
                 if current_table not in tables_data:
-                    tables_data[current_table] = {"columns": []}
+                    tables_data[current_table] = Table(current_table)
+                table_obj = tables_data[current_table]
                 
                 lines = content.split('\n')
                 curr_col = None
@@ -226,19 +584,25 @@ def parse_tmdl_structure(root_path):
                     strip = line.strip()
                     if strip.startswith("column "):
                         if curr_col:
-                            tables_data[current_table]["columns"].append(curr_col)
+                            table_obj.columns.append(curr_col)
                         raw_c = strip.replace("column ", "")
                         is_calc = "=" in raw_c
                         c_name = clean_name(raw_c.split('=')[0])
-                        curr_col = {
-                            "name": c_name,
-                            "type": "string",
-                            "origin": "Calculada (DAX)" if is_calc else "Física",
-                        }
+                        curr_col = Column(c_name, "string", "Calculada (DAX)" if is_calc else "Física")
                     elif curr_col and strip.startswith("dataType:"):
-                        curr_col["type"] = strip.replace("dataType:", "").strip()
+                        curr_col.type = sys.intern(strip.replace("dataType:", "").strip())
+                    elif curr_col and strip.startswith("sortByColumn:"):
+                        curr_col.sort_by = sys.intern(clean_name(strip.replace("sortByColumn:", "")))
+                    elif strip.startswith("column:"):
+                        # Nível de hierarquia apontando para uma coluna da tabela
+                        table_obj.hierarchy_columns.append(sys.intern(clean_name(strip.replace("column:", ""))))
+                    elif strip.startswith(("measure ", "hierarchy ", "partition ")):
+                        # Fecha a coluna corrente para não herdar propriedades de outros blocos
+                        if curr_col:
+                            table_obj.columns.append(curr_col)
+                            curr_col = None
                 if curr_col:
-                    tables_data[current_table]["columns"].append(curr_col)
+                    table_obj.columns.append(curr_col)
 
                 # Captura opcional de expressão DAX para colunas calculadas
                 try:
@@ -255,60 +619,51 @@ def parse_tmdl_structure(root_path):
                         expr_text = expr_text.strip()
                         col_exprs[col_name] = expr_text
 
-                    for col in tables_data[current_table]["columns"]:
-                        if col.get("origin") == "Calculada (DAX)":
-                            expr_text = col_exprs.get(col["name"])
+                    for col in table_obj.columns:
+                        if col.is_calculated:
+                            expr_text = col_exprs.get(col.name)
                             if expr_text:
-                                col["expression_dax"] = expr_text
+                                col.expression_dax = expr_text
                 except Exception:
                     # Em caso de falha no parsing, seguimos só com metadados básicos
                     pass
 
-                # Captura dados de conexão / origem (M code) para a tabela atual
+                # Partições M da tabela (todas); conexões são resolvidas após a varredura,
+                # quando as expressões compartilhadas (expressions.tmdl) já foram lidas
                 try:
-                    src_match = re.search(r"source\s*=\s*let(.*?)in\s+(.*)", content, re.DOTALL | re.IGNORECASE)
-                    if src_match and current_table:
-                        m_block = src_match.group(0)
-                        src_body = src_match.group(1)
-
-                        # Tipo de fonte (primeira linha após 'Source =')
-                        src_type = ""
-                        m_src_type = re.search(r"Source\s*=\s*([^,\n]+)", m_block)
-                        if m_src_type:
-                            src_type = m_src_type.group(1).strip()
-
-                        # Projeto / servidor (Name="...")
-                        project = ""
-                        m_proj = re.search(r"Source\{\[Name=\"([^\"]+)\"\]\}\[Data\]", m_block)
-                        if m_proj:
-                            project = m_proj.group(1).strip()
-
-                        # Dataset / schema
-                        dataset = ""
-                        m_schema = re.search(r"Name=\"([^\"]+)\",Kind=\"Schema\"", m_block)
-                        if m_schema:
-                            dataset = m_schema.group(1).strip()
-
-                        # Objeto (View/Table)
-                        obj_name = ""
-                        m_obj = re.search(r"Name=\"([^\"]+)\",Kind=\"(View|Table)\"", m_block)
-                        if m_obj:
-                            obj_name = m_obj.group(1).strip()
-
-                        conn = {
-                            "table": current_table,
-                            "source_type": src_type,
-                            "project": project,
-                            "dataset": dataset,
-                            "object": obj_name,
-                            "m_expression": m_block.strip()
-                        }
-                        tables_data.setdefault(current_table, {}).setdefault("connection", conn)
-                        connections.append(conn)
+                    for p_name, p_mode, m_code in parse_m_partitions(content):
+                        m_partitions.append((current_table, p_name, p_mode, m_code))
                 except Exception:
                     # Em caso de falha na detecção de conexão, ignoramos silenciosamente
                     pass
 
+                # DAX de tabelas calculadas / grupos de cálculo (conta no uso de colunas)
+                try:
+                    for expr in parse_table_dax(content):
+                        table_dax.append({"table": current_table, **expr})
+                except Exception:
+                    pass
+
+            else:
+                # Expressões compartilhadas e parâmetros (expressions.tmdl)
+                try:
+                    m_expressions.extend(parse_m_expressions(content))
+                except Exception:
+                    pass
+
+            # Roles de RLS (roles/*.tmdl ou model.tmdl): role + tablePermission com filtro DAX
+            for r_match in (re_role.finditer(content) if "tables" not in dirpath else []):
+                r_start = r_match.end()
+                r_next = re_role.search(content, r_start)
+                r_body = content[r_start:r_next.start() if r_next else len(content)]
+                role = {"name": clean_name(r_match.group(1)), "tables": []}
+                for tp in re_table_perm.finditer(r_body):
+                    tp_rest = r_body[tp.end():]
+                    tp_nx = re.search(r"\n\s*(?:tablePermission|member|annotation|modelPermission|role)\b", tp_rest)
+                    f_dax = (tp_rest[: tp_nx.start()] if tp_nx else tp_rest).strip().strip("`").strip()
+                    role["tables"].append({"table": clean_name(tp.group(1)), "filter_dax": f_dax})
+                roles.append(role)
+
             fb_table = current_table if current_table else "System"
             for match in re_measure.finditer(content):
                 name = clean_name(match.group(1))
@@ -316,7 +671,7 @@ def parse_tmdl_structure(root_path):
                 rest = content[start + 1 :]
                 nx = re.search(r"\n\s*(measure|column|table)\s", rest)
                 end = (start + 1 + nx.start()) if nx else len(content)
-                measures.append({"name": name, "table": fb_table, "dax": content[start:end]})
+                measures.append(Measure(name, fb_table, content[start:end]))
 
             for r in re_rel_block.finditer(content):
                 b = r.group(0)
@@ -326,89 +681,239 @@ def parse_tmdl_structure(root_path):
                 filt = re.search(r"crossFilteringBehavior:\s*(\w+)", b)
                 act = re.search(r"isActive:\s*(false)", b)
                 if fc and tc:
-                    relationships.append({
-                        "from": clean_ref(fc.group(1)),
-                        "to": clean_ref(tc.group(1)),
-                        "cardinality": clean_ref(card.group(1)) if card else "OneToMany",
-                        "filter": clean_ref(filt.group(1)) if filt else "Single",
-                        "active": "False" if act else "True",
-                    })
-
-    unique_rels = [dict(t) for t in {tuple(d.items()) for d in relationships}]
+                    relationships.append(Relationship(
+                        clean_ref(fc.group(1)),
+                        clean_ref(tc.group(1)),
+                        clean_ref(card.group(1)) if card else "OneToMany",
+                        clean_ref(filt.group(1)) if filt else "Single",
+                        "False" if act else "True",
+                    ))
+
+    # Sem set(): a ordem (e os títulos R001, R002...) não pode depender do hash seed
+    unique_rels = list(dict.fromkeys(relationships))
+
+    # Conexões: uma por partição M, com a fonte resolvida através das queries compartilhadas
+    source_graph, sources_by_partition = build_source_graph(m_partitions, m_expressions)
+    expr_by_name = {e["name"]: e for e in m_expressions}
+    for t_name, p_name, p_mode, m_code in m_partitions:
+        fields = legacy_connection_fields(m_code)
+        if not describe_m_sources(m_code, {}):
+            # Partição apenas referencia uma query compartilhada: herda os campos dela
+            for ref in find_m_references(m_code, list(expr_by_name)):
+                fields = legacy_connection_fields(expr_by_name[ref]["m_expression"])
+                if any(fields):
+                    break
+        conn = Connection(t_name, *fields, m_code, p_name, p_mode, sources_by_partition.get((t_name, p_name)))
+        table_obj = tables_data.get(t_name)
+        if table_obj is not None and table_obj.connection is None:
+            table_obj.connection = conn
+        connections.append(conn)
+
+    dup_sources = [n for n in source_graph if n["duplicate"]]
+    print(f"> Fontes distintas: {len(source_graph)} | Lidas por mais de uma tabela: {len(dup_sources)} "
+          f"({sum(n['reads'] for n in dup_sources)} leituras)")
+    for n in dup_sources[:10]:
+        print(f"   ♻️  {len(n['tables'])} tabelas leem {n['source']}")
     print(f"> Tabelas: {len(tables_data)} | Rels: {len(unique_rels)} | Medidas: {len(measures)} | Conexões: {len(connections)}")
     return {
         "tables": tables_data,
         "relationships": unique_rels,
         "measures": measures,
         "connections": connections,
-        "roles": roles
+        "roles": roles,
+        "table_dax": table_dax,
+        "expressions": m_expressions,
+        "source_graph": source_graph
     }
 
 def analyze_and_map(inventory, root_path):
     print("--- 🧠 Cruzando Dados (V31) ---")
-    all_names = {m["name"] for m in inventory["measures"]}
+    # Lista na ordem do modelo (não set): pais, filhos e medidas dos visuais saem sempre na mesma ordem
+    all_names = list(dict.fromkeys(m.name for m in inventory["measures"]))
     
     # SCAN V31
-    report_structure, total_vis = scan_report_hierarchy_v31(root_path, all_names)
+    field_refs = set()
+    report_structure, total_vis = scan_report_hierarchy_v31(root_path, all_names, field_refs)
     inventory["report_structure"] = report_structure
+    inventory["unused_columns"] = detect_unused_columns(inventory, field_refs)
     
     measure_to_visuals = {m: [] for m in all_names}
     for page in report_structure:
-        for vis in page["visuals"]:
-            for m_in_vis in vis["measures"]:
-                measure_to_visuals[m_in_vis].append({
-                    "page": page["name"],
-                    "type": vis["type"],
-                    "id": vis["id"],
-                })
+        for vis in page.visuals:
+            for m_in_vis in vis.measures:
+                measure_to_visuals[m_in_vis].append((page.name, vis.type, vis.id))
 
     enhanced = []
     for i, m in enumerate(inventory["measures"]):
-        m["global_id"] = f"M{str(i+1).zfill(3)}"
+        m.global_id = sys.intern(f"M{str(i+1).zfill(3)}")
         parents = []
         for other in all_names:
-            if other == m["name"]:
+            if other == m.name:
                 continue
             if re.search(
                 r'\[\s*' + re.escape(other) + r'\s*\]|"\s*' + re.escape(other) + r'\s*"',
-                m["dax"],
+                m.dax,
                 re.IGNORECASE,
             ):
                 parents.append(other)
-        m["parent_names"] = parents
-        m["visual_details"] = measure_to_visuals.get(m["name"], [])
-        m["in_visual"] = len(m["visual_details"]) > 0
+        m.parent_names = parents
+        m.visual_details = measure_to_visuals.get(m.name, [])
+        m.in_visual = len(m.visual_details) > 0
         enhanced.append(m)
     
     candidates = 0
     for m in enhanced:
-        children = [c["name"] for c in enhanced if m["name"] in c["parent_names"]]
-        m["child_names"] = children
-        if (not m["parent_names"]) and (not children) and (not m["in_visual"]):
-            m["status"] = "Delete Candidate"
+        children = [c.name for c in enhanced if m.name in c.parent_names]
+        m.child_names = children
+        if (not m.parent_names) and (not children) and (not m.in_visual):
+            m.status = "Delete Candidate"
             candidates += 1
-        elif m["in_visual"]:
-            m["status"] = "Visual"
+        elif m.in_visual:
+            m.status = "Visual"
         elif children:
-            m["status"] = "Base Cálculo"
+            m.status = "Base Cálculo"
         else:
-            m["status"] = "Dependente"
+            m.status = "Dependente"
 
     print(f"--- 🧹 Delete Candidates: {candidates} ---")
     inventory["measures"] = enhanced
     return inventory
 
+def extract_dax_column_refs(dax, table_names_cf):
+    """
+    Extrai referências a colunas de um texto DAX.
+    Retorna set de (tabela_casefold ou None, coluna_casefold); None = referência
+    não qualificada ([Coluna]), que por segurança vale para qualquer tabela.
+    """
+    refs = set()
+    for m in RE_DAX_COL_REF.finditer(dax or ""):
+        tbl = m.group(1) or m.group(2)
+        col = m.group(3).replace("]]", "]").strip().casefold()
+        tbl_cf = tbl.replace("''", "'").strip().casefold() if tbl else None
+        refs.add((tbl_cf if tbl_cf in table_names_cf else None, col))
+    return refs
+
+def detect_unused_columns(inventory, field_refs=None):
+    """
+    Cruza as colunas de cada tabela com todos os pontos de uso conhecidos:
+    DAX de medidas, colunas calculadas, tabelas calculadas, grupos de cálculo,
+    chaves de relacionamento, filtros de RLS, sortByColumn, níveis de hierarquia
+    e campos usados nos visuais.
+    Retorna {tabela: {"physical": [...], "calculated": [...]}} só com tabelas que
+    têm colunas sem referência. Referências não qualificadas contam para qualquer
+    tabela (preferimos não sinalizar a sinalizar errado).
+    """
+    tables = inventory.get("tables", {})
+    table_names_cf = {t.casefold() for t in tables}
+    used = set()
+
+    def mark(table, column):
+        if table and column:
+            used.add((table.casefold(), column.casefold()))
+
+    # 1. DAX (medidas, colunas calculadas, tabelas calculadas, grupos de cálculo e RLS)
+    dax_texts = [m.dax for m in inventory.get("measures", [])]
+    for t_data in tables.values():
+        dax_texts.extend(c.expression_dax for c in t_data.columns)
+    dax_texts.extend(e.get("expression", "") for e in inventory.get("table_dax", []))
+    for role in inventory.get("roles", []):
+        dax_texts.extend(t.get("filter_dax", "") for t in role.get("tables", []))
+    unqualified = set()
+    for txt in dax_texts:
+        for tbl_cf, col_cf in extract_dax_column_refs(txt, table_names_cf):
+            if tbl_cf is None:
+                unqualified.add(col_cf)
+            else:
+                used.add((tbl_cf, col_cf))
+
+    # 2. Chaves de relacionamento ("Tabela.Coluna")
+    for r in inventory.get("relationships", []):
+        for ref in (r.from_column, r.to_column):
+            for t_name in tables:
+                if ref.casefold().startswith(t_name.casefold() + "."):
+                    mark(t_name, ref[len(t_name) + 1:].strip())
+                    break
+
+    # 3. sortByColumn e níveis de hierarquia
+    for t_name, t_data in tables.items():
+        for c in t_data.columns:
+            mark(t_name, c.sort_by)
+        for h_col in t_data.hierarchy_columns:
+            mark(t_name, h_col)
+
+    # 4. Campos usados nos visuais / filtros do relatório
+    for t_name, c_name in (field_refs or ()):
+        mark(t_name, c_name)
+
+    unused = {}
+    total_phys = total_calc = 0
+    for t_name, t_data in sorted(tables.items()):
+        phys, calc = [], []
+        for c in t_data.columns:
+            c_cf = c.name.casefold()
+            if (t_name.casefold(), c_cf) in used or c_cf in unqualified:
+                continue
+            if c.is_calculated:
+                calc.append(c.name)
+            else:
+                phys.append(c.name)
+        if phys or calc:
+            unused[t_name] = {"physical": phys, "calculated": calc}
+            total_phys += len(phys)
+            total_calc += len(calc)
+
+    print(f"--- 🧊 Colunas sem uso: {total_phys} físicas | {total_calc} calculadas (em {len(unused)} tabelas) ---")
+    return unused
+
 def save_outputs(inv):
     with open("model_structure.json", "w", encoding="utf-8") as f:
-        json.dump(inv, f, indent=4)
+        json.dump(inventory_to_dict(inv), f, indent=4)
     with open("measures_for_ai.csv", "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
         writer.writerow(["global_id", "measure_name", "dax_code"])
         for m in inv["measures"]:
-            dax_c = re.sub(r"\s+", " ", m["dax"]).replace('"', "'")[:1000]
-            writer.writerow([m["global_id"], m["name"], dax_c])
+            dax_c = re.sub(r"\s+", " ", m.dax).replace('"', "'")[:1000]
+            writer.writerow([m.global_id, m.name, dax_c])
+    with open("unused_columns.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["table", "column", "origin"])
+        for t_name, groups in inv.get("unused_columns", {}).items():
+            for c_name in groups["physical"]:
+                writer.writerow([t_name, c_name, "Física"])
+            for c_name in groups["calculated"]:
+                writer.writerow([t_name, c_name, "Calculada (DAX)"])
+
+def load_project_config(root_path):
+    """Lê o pbi_config.json do projeto (opcional para o minerador)."""
+    path = os.path.join(root_path, "pbi_config.json")
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[AVISO] Falha ao ler pbi_config.json: {e}")
+        return {}
 
 if __name__ == "__main__":
+    config = load_project_config(os.getcwd())
     data = analyze_and_map(parse_tmdl_structure(os.getcwd()), os.getcwd())
     save_outputs(data)
+
+    project_name = config.get("project_name") or os.path.basename(os.getcwd())
+
+    # Export colunar opcional para análise de portfólio ("parquet" ou "arrow")
+    columnar_fmt = config.get("columnar_export", False)
+    if columnar_fmt:
+        save_columnar_outputs(
+            data,
+            project_name,
+            out_dir=config.get("columnar_dir", "inventory_columnar"),
+            fmt="parquet" if columnar_fmt is True else columnar_fmt,
+        )
+
+    # Índice full-text opcional (true = inventory_search.db local; string = caminho compartilhado)
+    search_db = config.get("search_index", False)
+    if search_db:
+        update_search_index(data, project_name, SEARCH_DB if search_db is True else search_db)
     print("\n✅ MINERADOR V31 CONCLUÍDO.")
@@ -0,0 +1,457 @@
+import contextvars
+import os
+import random
+import threading
+import time
+from json import dumps
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from telemetry import TELEMETRY, endpoint_of
+
+# ==============================================================================
+# CLIENTE HTTP DO NOTION
+# ==============================================================================
+# Session com keep-alive e pool configurável (pool_size >= concorrência do publisher),
+# timeouts, limitador de taxa compartilhado (3 req/s; 429 -> pausa + taxa pela
+# metade) e retry com backoff. Falhas ficam em client.failures; client.phase soma
+# as estatísticas por etapa. NOTION_API_BASE_URL aponta para o notion_mock_server.py.
+# Obs.: não se chama notion_client.py para não sombrear o SDK oficial.
+
+NOTION_API_URL = "https://api.notion.com/v1"
+NOTION_VERSION = "2022-06-28"
+TOKEN_ENV = "NOTION_API_TOKEN_PBI_HUB_INVENTORY"
+BASE_URL_ENV = "NOTION_API_BASE_URL"
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = (5, 60)  # (conexão, leitura) em segundos
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RATE_LIMIT = 3.0  # requisições/segundo (média aceita pelo Notion)
+BACKOFF_BASE = 1.0        # segundos (1ª espera), dobra a cada tentativa
+BACKOFF_CAP = 30.0
+
+# Criações (não idempotentes): timeout de leitura / 5xx não garantem que nada foi criado
+UNSAFE_WRITES = {("POST", "pages"), ("POST", "databases")}
+
+# Etapa atual por contexto (thread / task asyncio), ver NotionClient.phase
+_PHASE = contextvars.ContextVar("notion_phase", default=None)
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket thread-safe com ajuste AIMD da taxa:
+    429 -> taxa / 2 (e pausa global pelo Retry-After); sucesso -> taxa + 5% do teto.
+    rate <= 0 desliga o limitador.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE_LIMIT, burst=None, min_rate=0.5):
+        self.max_rate = float(rate or 0)
+        self.rate = self.max_rate
+        self.min_rate = min(min_rate, self.max_rate) if self.max_rate > 0 else 0.0
+        self.capacity = float(burst or max(1.0, self.max_rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloqueia até haver um token disponível."""
+        if self.max_rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def on_throttled(self, retry_after=None):
+        if self.max_rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+            self.updated = now
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+    def on_success(self):
+        if self.max_rate <= 0 or self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + 0.05 * self.max_rate)
+
+
+def backoff_delay(attempt):
+    """Backoff exponencial com jitter ("full jitter"): uniforme em [0, min(cap, base * 2^n)]."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def parse_retry_after(resp):
+    """Segundos do header Retry-After (None se ausente/ inválido)."""
+    value = resp.headers.get("Retry-After") if resp is not None else None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def reached_server(exc):
+    """O erro de rede pode ter acontecido depois de o Notion receber a requisição? (falha ao conectar = não)"""
+    if isinstance(exc, requests.ConnectTimeout):
+        return False
+    if isinstance(exc, requests.ConnectionError):
+        reason = getattr(exc.args[0], "reason", None) if exc.args else None
+        return not isinstance(reason, NewConnectionError)
+    return True
+
+
+def found_response(url, data):
+    """Response 200 com o objeto encontrado pelo recover (criação que já tinha acontecido)."""
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.url = url
+    resp.encoding = "utf-8"
+    resp._content = dumps(data).encode("utf-8")
+    return resp
+
+
+class NotionClient:
+    """Sessão HTTP compartilhada (keep-alive + pool) para a API do Notion."""
+
+    def __init__(self, token=None, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, rate_limit=DEFAULT_RATE_LIMIT, base_url=None,
+                 telemetry=None):
+        token = token or os.environ.get(TOKEN_ENV)
+        self.base_url = (base_url or os.environ.get(BASE_URL_ENV) or NOTION_API_URL).rstrip("/")
+        self.timeout = tuple(timeout) if isinstance(timeout, (list, tuple)) else timeout
+        self.max_attempts = max(1, int(max_attempts))
+        self.limiter = AdaptiveRateLimiter(rate_limit)
+        self.telemetry = telemetry or TELEMETRY
+        self.mirror = None  # NotionMirror (notion_mirror.py): registra as páginas das respostas
+
+        # Estatísticas e falhas (method, path, status, detalhe)
+        self.stats = {"requests": 0, "throttled": 0, "retries": 0, "server_errors": 0}
+        self.failures = []
+        self._stats_lock = threading.Lock()
+        self._init_phases()
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+            "Notion-Version": NOTION_VERSION,
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, int(pool_size)))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @classmethod
+    def from_config(cls, config, token=None):
+        """
+        Cria o cliente a partir do pbi_config.json
+        (notion_pool_size / notion_timeout / notion_max_attempts / notion_rate_limit).
+        """
+        return cls(
+            token,
+            pool_size=config.get("notion_pool_size", DEFAULT_POOL_SIZE),
+            timeout=config.get("notion_timeout", DEFAULT_TIMEOUT),
+            max_attempts=config.get("notion_max_attempts", DEFAULT_MAX_ATTEMPTS),
+            rate_limit=config.get("notion_rate_limit", DEFAULT_RATE_LIMIT),
+        )
+
+    def close(self):
+        self.session.close()
+
+    # ==========================================================================
+    # ETAPAS
+    # ==========================================================================
+
+    def _init_phases(self):
+        self.phase_stats = {}  # etapa -> {"requests", "throttled", "retries", "server_errors", "seconds"}
+        self._spans = {}       # etapa -> [início da 1ª requisição, fim da última]
+
+    @property
+    def phase(self):
+        """Etapa atual (ex: título do DB em construção) no contexto de quem chama."""
+        return _PHASE.get()
+
+    @phase.setter
+    def phase(self, name):
+        _PHASE.set(name)
+
+    def _phase_entry(self, name):
+        return self.phase_stats.setdefault(name, {
+            "requests": 0, "throttled": 0, "retries": 0, "server_errors": 0, "seconds": 0.0,
+        })
+
+    def _mark_span(self, name, started, ended):
+        with self._stats_lock:
+            span = self._spans.setdefault(name, [started, ended])
+            span[0], span[1] = min(span[0], started), max(span[1], ended)
+            self._phase_entry(name)["seconds"] = span[1] - span[0]
+
+    # ==========================================================================
+    # NÚCLEO
+    # ==========================================================================
+
+    def request(self, method, path, json=None, params=None, expected=(200,), recover=None):
+        """
+        Executa a chamada respeitando o limitador, com retry:
+        - 429: espera o Retry-After (ou backoff) e reduz a taxa global;
+        - 5xx / erro de rede: backoff exponencial com jitter;
+        - qualquer outra resposta (200, 400, 404, ...) é devolvida na hora.
+        Criações (UNSAFE_WRITES) só repetem sozinhas 429 e falhas ao conectar: depois
+        de 5xx / timeout de leitura o Notion pode ter criado o objeto. Nesse caso
+        recover() é consultado: objeto -> é devolvido como 200; None -> não existe,
+        tenta de novo; sem recover (ou se ele falhar) a chamada termina sem retry.
+        Respostas fora de `expected` no fim das tentativas são registradas em self.failures.
+        Se a última tentativa falhar por erro de rede, a exceção sobe (e também é registrada).
+        """
+        url = path if path.startswith("http") else f"{self.base_url}/{path.lstrip('/')}"
+        phase = self.phase or "Geral"
+        # Serializa uma vez só (reaproveitado nos retries e medido para a telemetria)
+        body = dumps(json).encode("utf-8") if json is not None else None
+        call = {"retries": 0, "throttled": 0, "throttle_wait": 0.0, "rate_wait": 0.0}
+        resp = None
+        started = time.perf_counter()
+        try:
+            resp = self._request(method, path, url, body, params, expected, call, recover)
+            if self.mirror is not None and resp.status_code == 200:
+                try:
+                    self.mirror.observe(resp.json())
+                except ValueError:
+                    pass
+            return resp
+        finally:
+            ended = time.perf_counter()
+            self._mark_span(phase, started, ended)
+            status = resp.status_code if resp is not None else "erro"
+            self.telemetry.record(
+                "notion", endpoint_of(method, path), phase, status, ended - started,
+                bytes_out=len(body or b""), bytes_in=len(resp.content) if resp is not None else 0,
+                error=resp is None or status not in expected, **call,
+            )
+
+    def _request(self, method, path, url, body, params, expected, call, recover=None):
+        unsafe = (method, path) in UNSAFE_WRITES
+        resp = None
+        for attempt in range(self.max_attempts):
+            last = attempt == self.max_attempts - 1
+            if attempt:
+                self._count("retries")
+                call["retries"] += 1
+            waited = time.perf_counter()
+            self.limiter.acquire()
+            call["rate_wait"] += time.perf_counter() - waited
+            self._count("requests")
+            try:
+                resp = self.session.request(method, url, data=body, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                resp = None
+                retry = not last
+                if unsafe and reached_server(e):
+                    found, retry = self._recover(method, path, url, str(e), recover)
+                    if found is not None:
+                        return found
+                    retry = retry and not last
+                if retry:
+                    time.sleep(backoff_delay(attempt))
+                    continue
+                self._fail(method, path, None, str(e))
+                raise
+
+            if resp.status_code == 429:
+                self._count("throttled")
+                call["throttled"] += 1
+                retry_after = parse_retry_after(resp)
+                self.limiter.on_throttled(retry_after)
+                if retry_after is not None:
+                    # A pausa acontece no próximo acquire() (vale para todas as threads)
+                    call["throttle_wait"] += retry_after
+                elif not last:
+                    delay = backoff_delay(attempt)
+                    call["throttle_wait"] += delay
+                    time.sleep(delay)
+                continue
+            if resp.status_code >= 500:
+                self._count("server_errors")
+                if unsafe:
+                    found, retry = self._recover(method, path, url, f"HTTP {resp.status_code}", recover)
+                    if found is not None:
+                        return found
+                    if not retry:
+                        self._fail(method, path, resp.status_code, resp.text)
+                        return resp
+                if not last:
+                    time.sleep(backoff_delay(attempt))
+                continue
+
+            if resp.status_code == 200:
+                self.limiter.on_success()
+            if resp.status_code not in expected:
+                self._fail(method, path, resp.status_code, resp.text)
+            return resp
+
+        self._fail(method, path, resp.status_code, f"desistiu após {self.max_attempts} tentativas")
+        return resp
+
+    def _recover(self, method, path, url, detail, recover):
+        """
+        Criação com resultado incerto (5xx / erro depois do envio).
+        Retorna (Response do objeto já criado | None, pode_repetir).
+        """
+        if recover is None:
+            print(f"[AVISO] {method} {path} sem resposta confiável ({detail}); não repetido para não duplicar.")
+            return None, False
+        try:
+            data = recover()
+        except Exception as e:
+            print(f"[AVISO] {method} {path}: não foi possível conferir se a criação aconteceu ({e}).")
+            return None, False
+        if data is None:
+            return None, True  # confirmado: nada foi criado
+        print(f"[INFO] {method} {path}: a criação tinha acontecido ({detail}); objeto reaproveitado.")
+        return found_response(url, data), False
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+            self._phase_entry(self.phase or "Geral")[key] += 1
+
+    def _fail(self, method, path, status, detail):
+        with self._stats_lock:
+            self.failures.append((method, path, status, (detail or "")[:300]))
+
+    def print_summary(self, max_failures=20):
+        """Resumo das chamadas: total, 429 recebidos, retries e falhas (listadas)."""
+        st = self.stats
+        print(f"--- Notion: {st['requests']} requisições, {st['throttled']} x 429, {st['server_errors']} x 5xx, "
+              f"{st['retries']} retries, {len(self.failures)} falhas "
+              + (f"(taxa final {self.limiter.rate:.2f} req/s) ---" if self.limiter.max_rate > 0 else "(sem limite de taxa) ---"))
+        for method, path, status, detail in self.failures[:max_failures]:
+            print(f"  ❌ {method} {path} -> {status if status is not None else 'erro de rede'}: {detail}")
+        if len(self.failures) > max_failures:
+            print(f"  ... e mais {len(self.failures) - max_failures} falhas.")
+
+    # ==========================================================================
+    # PÁGINAS
+    # ==========================================================================
+
+    def create_page(self, parent, properties, children=None, recover=None):
+        """
+        parent: {"database_id": ...} ou {"page_id": ...}.
+        recover() -> página já criada | None: sem ele, 5xx / timeout de leitura não são repetidos.
+        """
+        payload = {"parent": parent, "properties": properties}
+        if children:
+            payload["children"] = children
+        return self.request("POST", "pages", json=payload, recover=recover)
+
+    def get_page(self, page_id):
+        """404 (página apagada / sem acesso) não conta como falha."""
+        return self.request("GET", f"pages/{page_id}", expected=(200, 404))
+
+    def update_page(self, page_id, properties=None, archived=None, expected=(200,)):
+        payload = {}
+        if properties is not None:
+            payload["properties"] = properties
+        if archived is not None:
+            payload["archived"] = archived
+        return self.request("PATCH", f"pages/{page_id}", json=payload, expected=expected)
+
+    def archive_page(self, page_id):
+        return self.update_page(page_id, archived=True)
+
+    # ==========================================================================
+    # DATABASES
+    # ==========================================================================
+
+    def create_database(self, parent_page_id, title, properties, is_inline=True, recover=None):
+        """recover() -> database já criado | None (ver create_page)."""
+        payload = {
+            "parent": {"page_id": parent_page_id},
+            "title": [{"type": "text", "text": {"content": title}}],
+            "properties": properties,
+            "is_inline": is_inline,
+        }
+        return self.request("POST", "databases", json=payload, recover=recover)
+
+    def update_database(self, db_id, properties=None, title=None, expected=(200,)):
+        payload = {}
+        if properties is not None:
+            payload["properties"] = properties
+        if title is not None:
+            payload["title"] = [{"type": "text", "text": {"content": title}}]
+        return self.request("PATCH", f"databases/{db_id}", json=payload, expected=expected)
+
+    def query_database(self, db_id, filter=None, start_cursor=None, page_size=None, sorts=None):
+        """Uma página de resultados do /databases/{id}/query."""
+        payload = {}
+        if filter:
+            payload["filter"] = filter
+        if sorts:
+            payload["sorts"] = sorts
+        if start_cursor:
+            payload["start_cursor"] = start_cursor
+        if page_size:
+            payload["page_size"] = page_size
+        return self.request("POST", f"databases/{db_id}/query", json=payload)
+
+    def query_all(self, db_id, filter=None, page_size=100, sorts=None):
+        """
+        Todas as páginas do query (segue next_cursor até o fim).
+        Retorna (resultados, completo); completo=False se alguma página falhou
+        (a falha fica em self.failures).
+        """
+        results, cursor = [], None
+        while True:
+            resp = self.query_database(db_id, filter=filter, start_cursor=cursor, page_size=page_size, sorts=sorts)
+            if resp.status_code != 200:
+                return results, False
+            data = resp.json()
+            results.extend(data.get("results", []))
+            cursor = data.get("next_cursor")
+            if not data.get("has_more") or not cursor:
+                return results, True
+
+    # ==========================================================================
+    # BLOCOS
+    # ==========================================================================
+
+    def append_block_children(self, block_id, children):
+        return self.request("PATCH", f"blocks/{block_id}/children", json={"children": children})
+
+    def list_block_children(self, block_id, start_cursor=None, page_size=100):
+        params = {"page_size": page_size}
+        if start_cursor:
+            params["start_cursor"] = start_cursor
+        return self.request("GET", f"blocks/{block_id}/children", params=params)
+
+    def update_block(self, block_id, payload):
+        return self.request("PATCH", f"blocks/{block_id}", json=payload)
+
+    def delete_block(self, block_id):
+        """404 (bloco já removido no Notion) não conta como falha."""
+        return self.request("DELETE", f"blocks/{block_id}", expected=(200, 404))
+
+    # ==========================================================================
+    # SEARCH
+    # ==========================================================================
+
+    def search(self, query, object_type=None):
+        """object_type: "page" ou "database" (opcional)."""
+        payload = {"query": query}
+        if object_type:
+            payload["filter"] = {"property": "object", "value": object_type}
+        return self.request("POST", "search", json=payload)
@@ -0,0 +1,161 @@
+import argparse
+import contextlib
+import json
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import time
+
+from notion_api import BASE_URL_ENV, TOKEN_ENV
+from notion_mock_server import add_fault_arguments, fault_options, start_server
+from telemetry import TELEMETRY
+
+# ==============================================================================
+# BENCHMARK CONTRA O MOCK DO NOTION
+# ==============================================================================
+# Copia o projeto para uma pasta temporária, sobe o notion_mock_server.py e roda o
+# constructor contra ele (IA desligada). Uso:
+#     python notion_benchmark.py --project PASTA --latency 0.2 --rate 3 --set notion_concurrency=8
+#     python notion_benchmark.py --project PASTA --p429 0.05 --p5xx 0.02 --output bench.json
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+HUB_ENV = "NOTION_DATABASE_ID_PBI_HUB_INVENTORY"
+PROJECT_FILES = ("pbi_config.json", "model_structure.json", "measures_enriched.csv")
+STEPS = (
+    ("constructor", "constructor_notion.py"),
+)
+
+
+def parse_overrides(items):
+    """["notion_concurrency=8", ...] -> {"notion_concurrency": 8, ...}."""
+    out = {}
+    for item in items or []:
+        key, sep, raw = item.partition("=")
+        if not sep:
+            sys.exit(f"[ERRO] --set espera CHAVE=VALOR (recebido: {item})")
+        try:
+            out[key.strip()] = json.loads(raw)
+        except ValueError:
+            out[key.strip()] = raw
+    return out
+
+
+def prepare_workdir(project_dir, overrides):
+    """Copia o projeto para uma pasta temporária e aplica os overrides no pbi_config.json."""
+    for name in PROJECT_FILES[:2]:
+        if not os.path.exists(os.path.join(project_dir, name)):
+            sys.exit(f"[ERRO] {name} ausente em {project_dir}.")
+    workdir = tempfile.mkdtemp(prefix="notion_bench_")
+    for name in PROJECT_FILES:
+        src = os.path.join(project_dir, name)
+        if os.path.exists(src):
+            shutil.copy(src, workdir)
+
+    cfg_path = os.path.join(workdir, "pbi_config.json")
+    with open(cfg_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    config["use_ai_enrichment"] = False
+    config.update(overrides)
+    with open(cfg_path, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
+    return workdir
+
+
+def run_step(script, log):
+    """Roda o script como __main__ (na pasta atual). Retorna (cliente Notion, segundos, código de saída)."""
+    argv = sys.argv
+    sys.argv = [script]
+    t0 = time.perf_counter()
+    code, client = 0, None
+    TELEMETRY.reset()
+    try:
+        with contextlib.redirect_stdout(log):
+            env = runpy.run_path(os.path.join(SCRIPT_DIR, script), run_name="__main__")
+        client = env.get("NOTION")
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 1
+    finally:
+        sys.argv = argv
+    return client, time.perf_counter() - t0, code
+
+
+def print_report(results, faults, state):
+    header = f"  {'Etapa':<30}{'Req.':>7}{'Retries':>9}{'429':>6}{'5xx':>6}{'Tempo (s)':>11}"
+    print("\n--- Benchmark da publicação (mock do Notion) ---")
+    print(header)
+    print("  " + "-" * (len(header) - 2))
+    for step in results:
+        for name, ph in step["phases"].items():
+            print(f"  {name[:29]:<30}{ph['requests']:>7}{ph['retries']:>9}{ph['throttled']:>6}"
+                  f"{ph['server_errors']:>6}{ph['seconds']:>11.2f}")
+        st = step["stats"]
+        status = "" if step["exit_code"] == 0 else f"  (❌ saída {step['exit_code']})"
+        print(f"  {'= ' + step['script']:<30}{st.get('requests', 0):>7}{st.get('retries', 0):>9}"
+              f"{st.get('throttled', 0):>6}{st.get('server_errors', 0):>6}{step['seconds']:>11.2f}{status}")
+        print("  " + "-" * (len(header) - 2))
+
+    live_pages = sum(1 for p in state.pages.values() if not p["archived"])
+    live_blocks = sum(1 for b in state.blocks.values() if not b["archived"])
+    print(f"> Servidor: {faults.counts['requests']} requisições, {faults.counts['429']} x 429, "
+          f"{faults.counts['5xx']} x 5xx; {live_pages} páginas e {live_blocks} blocos no mock.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do constructor + pós-processamento contra o mock do Notion.")
+    parser.add_argument("--project", required=True, help="pasta com pbi_config.json e model_structure.json")
+    parser.add_argument("--set", action="append", metavar="CHAVE=VALOR", help="sobrescreve o pbi_config.json copiado")
+    parser.add_argument("--output", help="grava o resultado em JSON (ex: para o CI)")
+    parser.add_argument("--keep", action="store_true", help="mantém a pasta temporária (logs, diário, estado)")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    project_dir = os.path.abspath(args.project)
+    workdir = prepare_workdir(project_dir, parse_overrides(args.set))
+    server, state, faults = start_server(**fault_options(args))
+
+    os.environ[BASE_URL_ENV] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ[TOKEN_ENV] = "mock-token"
+    os.environ[HUB_ENV] = state.hub_id
+    sys.path.insert(0, SCRIPT_DIR)
+
+    results = []
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for key, script in STEPS:
+            print(f"> Rodando {script} ...")
+            with open(f"{key}.log", "w", encoding="utf-8") as log:
+                client, seconds, code = run_step(script, log)
+            results.append({
+                "script": script,
+                "seconds": round(seconds, 3),
+                "exit_code": code,
+                "stats": dict(client.stats) if client else {},
+                "phases": client.phase_stats if client else {},
+                "telemetry": TELEMETRY.to_dict(),
+            })
+            if code != 0:
+                print(f"[ERRO] {script} terminou com código {code} (ver {os.path.join(workdir, key + '.log')}).")
+                break
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+
+    print_report(results, faults, state)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "project": project_dir,
+                "faults": fault_options(args),
+                "steps": results,
+                "server": dict(faults.counts),
+            }, f, indent=2, ensure_ascii=False)
+        print(f"> Resultado gravado em {args.output}")
+    if args.keep:
+        print(f"> Pasta de trabalho mantida em {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if any(step["exit_code"] != 0 for step in results):
+        sys.exit(1)
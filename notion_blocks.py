@@ -0,0 +1,93 @@
+import copy
+import json
+
+# ==============================================================================
+# LOTES DE BLOCOS POR TAMANHO REAL
+# ==============================================================================
+# Lotes gulosos até o primeiro limite da API: 100 children por array, 1000
+# blocos por payload, ~500 KB por requisição, 100 rich_text por bloco. Bloco
+# grande demais sozinho (DAX gigante) é quebrado em vários do mesmo tipo.
+
+MAX_CHILDREN = 100
+MAX_BLOCKS_PER_REQUEST = 1000
+MAX_PAYLOAD_BYTES = 500_000
+PAYLOAD_MARGIN = 20_000      # envelope da requisição / folga
+MAX_RICH_TEXT = 100
+
+PAYLOAD_BUDGET = MAX_PAYLOAD_BYTES - PAYLOAD_MARGIN
+
+
+def payload_size(obj):
+    """Bytes do JSON exatamente como o requests serializa (json.dumps padrão, ASCII escapado)."""
+    return len(json.dumps(obj).encode("utf-8"))
+
+
+def block_count(block):
+    """1 + blocos aninhados (ex: table -> table_row)."""
+    body = block.get(block.get("type"), {})
+    nested = body.get("children", []) if isinstance(body, dict) else []
+    return 1 + sum(block_count(child) for child in nested)
+
+
+def split_oversized(blocks, budget=PAYLOAD_BUDGET):
+    """
+    Divide blocos cujo rich_text passa de MAX_RICH_TEXT itens ou cujo JSON
+    passa do orçamento de bytes em vários blocos consecutivos do mesmo tipo.
+    Blocos normais passam intactos (mesmo objeto).
+    """
+    out = []
+    for block in blocks:
+        b_type = block.get("type")
+        body = block.get(b_type)
+        rich = body.get("rich_text") if isinstance(body, dict) else None
+        if not rich or (len(rich) <= MAX_RICH_TEXT and payload_size(block) <= budget):
+            out.append(block)
+            continue
+
+        shell = copy.deepcopy(block)
+        shell[b_type]["rich_text"] = []
+        base = payload_size(shell)
+        part, part_size = [], base
+        for item in rich:
+            item_size = payload_size(item) + 2
+            if part and (len(part) >= MAX_RICH_TEXT or part_size + item_size > budget):
+                out.append(_with_rich_text(shell, b_type, part))
+                part, part_size = [], base
+            part.append(item)
+            part_size += item_size
+        if part:
+            out.append(_with_rich_text(shell, b_type, part))
+    return out
+
+
+def _with_rich_text(shell, b_type, rich):
+    block = copy.deepcopy(shell)
+    block[b_type]["rich_text"] = rich
+    return block
+
+
+def pack_blocks(blocks, first_reserve=0, budget=PAYLOAD_BUDGET,
+                max_children=MAX_CHILDREN, max_blocks=MAX_BLOCKS_PER_REQUEST):
+    """
+    Agrupa os blocos em lotes (listas) que respeitam os limites da API, na ordem.
+    first_reserve: bytes já ocupados no 1º lote (ex: propriedades da página
+    quando o corpo vai junto na criação).
+    """
+    batches = []
+    batch, size, count = [], first_reserve, 0
+    for block in split_oversized(blocks, budget):
+        b_size = payload_size(block) + 2
+        b_count = block_count(block)
+        if batch and (
+            len(batch) >= max_children
+            or count + b_count > max_blocks
+            or size + b_size > budget
+        ):
+            batches.append(batch)
+            batch, size, count = [], 0, 0
+        batch.append(block)
+        size += b_size
+        count += b_count
+    if batch:
+        batches.append(batch)
+    return batches
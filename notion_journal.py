@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+from notion_sync import content_hash
+
+# ==============================================================================
+# DIÁRIO DA PUBLICAÇÃO (--resume)
+# ==============================================================================
+# Cada passo concluído (capa, DB, linha, lote de blocos) vira uma linha JSON em
+# notion_publish_journal.jsonl, com fsync. No --resume os IDs gravados são
+# reaproveitados e só o resto é enviado; linha com conteúdo novo é refeita.
+# Antes de cada POST /pages vai uma "intent": se a queda veio antes do "row",
+# a retomada procura a página no DB em vez de criar outra.
+
+JOURNAL_FILE = "notion_publish_journal.jsonl"
+
+
+def row_hash(props, body):
+    return content_hash([props, body])
+
+
+class PublishJournal:
+    """Diário append-only das operações concluídas (thread-safe)."""
+
+    def __init__(self, project_name, path=JOURNAL_FILE):
+        self.project_name = project_name
+        self.path = path
+        self.cover_id = None
+        self.finished = False
+        self._dbs = {}
+        self._rows = {}    # (db, key) -> {"page_id", "hash", "batches": {n: ids}}
+        self._intents = {}  # (db, key) -> {"hash", "props"} das criações sem "row" (resultado incerto)
+        self._pages = {}   # db -> page_ids já registrados
+        self._synced = {}  # (db, key) -> entrada do estado de sincronização
+        self._lock = threading.Lock()
+        self._fh = None
+
+    @classmethod
+    def start(cls, project_name, path=JOURNAL_FILE):
+        """Começa um diário novo (descarta o anterior)."""
+        journal = cls(project_name, path)
+        journal._fh = open(path, "w", encoding="utf-8")
+        journal._write({"op": "start", "project": project_name, "at": datetime.now().isoformat(timespec="seconds")})
+        return journal
+
+    @classmethod
+    def resume(cls, project_name, path=JOURNAL_FILE):
+        """
+        Relê o diário para retomar. Retorna None se não houver o que retomar
+        (arquivo ausente ou de outro projeto).
+        """
+        if not os.path.exists(path):
+            return None
+        journal = cls(project_name, path)
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    # Última linha pode ter ficado pela metade na queda
+                    continue
+                journal._apply(rec)
+        if journal.project_name != project_name:
+            return None
+        journal._fh = open(path, "a", encoding="utf-8")
+        return journal
+
+    def _apply(self, rec):
+        op = rec.get("op")
+        if op == "start":
+            self.project_name = rec.get("project")
+        elif op == "cover":
+            self.cover_id = rec["id"]
+        elif op == "db":
+            self._dbs[rec["key"]] = rec["id"]
+        elif op == "intent":
+            self._intents[(rec["db"], rec["key"])] = {"hash": rec["hash"], "props": rec["props"]}
+        elif op == "row":
+            self._rows[(rec["db"], rec["key"])] = {
+                "page_id": rec["page_id"], "hash": rec["hash"], "inline": rec.get("inline", 0), "batches": {},
+            }
+            self._intents.pop((rec["db"], rec["key"]), None)
+            self._pages.setdefault(rec["db"], set()).add(rec["page_id"])
+        elif op == "batch":
+            row = self._rows.get((rec["db"], rec["key"]))
+            if row is not None:
+                row["batches"][rec["n"]] = rec["ids"]
+        elif op == "synced":
+            self._synced[(rec["db"], rec["key"])] = rec["entry"]
+        elif op == "done":
+            self.finished = True
+
+    def _write(self, rec):
+        with self._lock:
+            self._apply(rec)
+            self._fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+
+    def close(self):
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+
+    # Registro -------------------------------------------------------------
+
+    def record_cover(self, page_id):
+        self._write({"op": "cover", "id": page_id})
+
+    def record_database(self, key, db_id):
+        self._write({"op": "db", "key": key, "id": db_id})
+
+    def record_intent(self, db, key, content, props):
+        self._write({"op": "intent", "db": db, "key": key, "hash": content, "props": props})
+
+    def record_row(self, db, key, page_id, content, inline=0):
+        self._write({"op": "row", "db": db, "key": key, "page_id": page_id, "hash": content, "inline": inline})
+
+    def record_batch(self, db, key, n, ids):
+        self._write({"op": "batch", "db": db, "key": key, "n": n, "ids": ids})
+
+    def record_synced(self, db, key, entry):
+        self._write({"op": "synced", "db": db, "key": key, "entry": entry})
+
+    def finish(self):
+        self._write({"op": "done"})
+
+    # Consulta -------------------------------------------------------------
+
+    def database(self, key):
+        return self._dbs.get(key)
+
+    def row(self, db, key):
+        return self._rows.get((db, key))
+
+    def intent(self, db, key):
+        """Criação iniciada sem "row" registrado: a página pode existir no Notion."""
+        return self._intents.get((db, key))
+
+    def page_ids(self, db):
+        with self._lock:
+            return set(self._pages.get(db, ()))
+
+    def synced(self, db, key):
+        return self._synced.get((db, key))
@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+
+# ==============================================================================
+# ESPELHO LOCAL DO NOTION (notion_mirror.json)
+# ==============================================================================
+# Páginas vistas nas respostas da API, com last_edited_time. Serve só para achar
+# edições manuais (drift): na sincronização cada DB faz um query incremental a
+# partir da sua marca d'água. Custa 1 query por DB e não evita nenhuma leitura
+# (capa e blocos seguem vindo da API). O Notion arredonda o horário ao minuto.
+
+MIRROR_FILE = "notion_mirror.json"
+MIRROR_VERSION = 1
+
+
+def parent_id(parent):
+    """{"type": "page_id", "page_id": "..."} -> "..." (None se não houver)."""
+    if not isinstance(parent, dict):
+        return None
+    value = parent.get(parent.get("type"))
+    return value if isinstance(value, str) else None
+
+
+def rich_text_content(items):
+    return "".join(
+        (t.get("plain_text") if "plain_text" in t else (t.get("text") or {}).get("content", "")) or ""
+        for t in items or []
+    )
+
+
+def property_value(prop):
+    """Valor comparável de uma propriedade, no formato enviado ou no devolvido pelo Notion (None = não comparar)."""
+    if "title" in prop:
+        return rich_text_content(prop["title"])
+    if "rich_text" in prop:
+        return rich_text_content(prop["rich_text"])
+    if "number" in prop:
+        return prop["number"]
+    if "select" in prop:
+        return (prop["select"] or {}).get("name")
+    if "date" in prop:
+        return (prop["date"] or {}).get("start")
+    if "url" in prop:
+        return prop["url"]
+    if "relation" in prop:
+        if prop.get("has_more"):
+            return None  # o Notion só devolve as primeiras relações da página
+        return sorted(r.get("id", "").replace("-", "") for r in prop["relation"] or [])
+    return None
+
+
+def properties_differ(remote, local):
+    """As propriedades publicadas (local) foram alteradas no Notion (remote)? Colunas extras do Notion não contam."""
+    for name, prop in local.items():
+        expected = property_value(prop)
+        if expected is None:
+            continue
+        current = property_value(remote.get(name) or {})
+        if current is not None and current != expected:
+            return True
+    return False
+
+
+class NotionMirror:
+    """page_id -> {"parent", "last_edited_time"} das páginas vistas nas respostas da API."""
+
+    def __init__(self, path=MIRROR_FILE, objects=None):
+        self.path = path
+        self.objects = objects or {}
+        self.read_only = False  # --plan: não grava
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=MIRROR_FILE):
+        """Arquivo ausente, corrompido ou de outra versão = espelho vazio (sem detecção de edições nesta execução)."""
+        if not os.path.exists(path):
+            return cls(path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[AVISO] {path} ilegível ({e}). O espelho do Notion vai recomeçar do zero.")
+            return cls(path)
+        if data.get("version") != MIRROR_VERSION:
+            return cls(path)
+        # Arquivos antigos também guardavam blocos e databases: só as páginas interessam
+        return cls(path, {k: v for k, v in (data.get("objects") or {}).items() if v.get("object", "page") == "page"})
+
+    def save(self):
+        """Grava de forma atômica, sem os objetos arquivados."""
+        if self.read_only:
+            return
+        with self._lock:
+            objects = {k: v for k, v in self.objects.items() if not v.get("archived")}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": MIRROR_VERSION, "objects": objects}, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    def observe(self, data):
+        """Registra as páginas de uma resposta (page ou list com results); blocos e DBs não interessam."""
+        if not isinstance(data, dict):
+            return
+        items = data.get("results") if data.get("object") == "list" else [data]
+        with self._lock:
+            for obj in items or []:
+                if not isinstance(obj, dict) or obj.get("object") != "page" or "id" not in obj:
+                    continue
+                entry = {
+                    "parent": parent_id(obj.get("parent")),
+                    "last_edited_time": obj.get("last_edited_time"),
+                }
+                if obj.get("archived") or obj.get("in_trash"):
+                    entry["archived"] = True
+                self.objects[obj["id"]] = entry
+
+    def pages_of(self, db_id):
+        """page_id -> last_edited_time das páginas (não arquivadas) do DB conhecidas pelo espelho."""
+        with self._lock:
+            return {k: v["last_edited_time"] for k, v in self.objects.items()
+                    if v["parent"] == db_id and not v.get("archived")}
+
+    def edited_pages(self, client, db_id):
+        """
+        Páginas do DB editadas no Notion desde a última vez que o pipeline as viu:
+        query ordenado por last_edited_time a partir da marca d'água do DB.
+        Retorna a lista de páginas (objetos da API) ou None se o espelho não
+        conhece o DB / o query falhou (quem chama segue sem essa informação).
+        """
+        seen = self.pages_of(db_id)
+        stamps = [t for t in seen.values() if t]
+        if not stamps:
+            return None
+        flt = {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": max(stamps)}}
+        sorts = [{"timestamp": "last_edited_time", "direction": "ascending"}]
+        try:
+            pages, complete = client.query_all(db_id, filter=flt, sorts=sorts)
+        except Exception as e:
+            print(f"[AVISO] Falha ao consultar edições recentes no Notion: {e}")
+            return None
+        if not complete:
+            return None
+        # A própria última escrita do pipeline volta no "on_or_after": só conta quem mudou depois dela
+        return [p for p in pages if p.get("last_edited_time") != seen.get(p["id"])]
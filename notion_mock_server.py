@@ -0,0 +1,508 @@
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# ==============================================================================
+# MOCK LOCAL DA API DO NOTION
+# ==============================================================================
+# Só os endpoints que o pipeline usa, com os mesmos limites de payload (400) e
+# falhas injetáveis (--latency, --rate, --p429, --p5xx, --p5xx-late). Uso:
+#     python notion_mock_server.py --port 8765 --latency 0.05 --rate 3
+#     set NOTION_API_BASE_URL=http://127.0.0.1:8765/v1  (e o ID do HUB impresso)
+
+MAX_CHILDREN = 100
+MAX_BLOCKS = 1000
+MAX_PAYLOAD_BYTES = 500_000
+MAX_RICH_TEXT = 100
+MAX_TEXT_CHARS = 2000
+MAX_PAGE_SIZE = 100
+
+
+class ApiError(Exception):
+    def __init__(self, status, code, message):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+def _now():
+    return time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime())
+
+
+def _plain(rich):
+    return "".join(rt.get("plain_text", "") for rt in rich or [])
+
+
+def _normalize_rich(rich):
+    """Completa os itens de rich_text como o Notion devolve (type, plain_text, href, annotations)."""
+    if not isinstance(rich, list):
+        raise ApiError(400, "validation_error", "rich_text deve ser uma lista.")
+    if len(rich) > MAX_RICH_TEXT:
+        raise ApiError(400, "validation_error", f"rich_text.length should be ≤ {MAX_RICH_TEXT}, instead was {len(rich)}.")
+    out = []
+    for rt in rich:
+        text = rt.get("text") or {}
+        content = text.get("content", rt.get("plain_text", ""))
+        if len(content) > MAX_TEXT_CHARS:
+            raise ApiError(400, "validation_error",
+                           f"text.content.length should be ≤ {MAX_TEXT_CHARS}, instead was {len(content)}.")
+        link = text.get("link")
+        out.append({
+            "type": "text",
+            "text": {"content": content, "link": link},
+            "annotations": rt.get("annotations", {}),
+            "plain_text": content,
+            "href": link.get("url") if link else None,
+        })
+    return out
+
+
+def _normalize_properties(props):
+    out = {}
+    for name, value in (props or {}).items():
+        value = dict(value)
+        for kind in ("title", "rich_text"):
+            if kind in value:
+                value[kind] = _normalize_rich(value[kind])
+                value["type"] = kind
+        out[name] = value
+    return out
+
+
+def _count_blocks(blocks):
+    total = 0
+    for b in blocks:
+        body = b.get(b.get("type"), {})
+        total += 1 + _count_blocks(body.get("children", []) if isinstance(body, dict) else [])
+    return total
+
+
+class MockNotion:
+    """Estado em memória (thread-safe) de páginas, databases e blocos."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pages = {}
+        self.databases = {}
+        self.blocks = {}
+        self.children = {}  # id do pai (página/bloco) -> [ids dos blocos filhos, em ordem]
+        self.hub_id = self._create_database(None, [{"text": {"content": "HUB"}}], {
+            "Project Name": {"title": {}},
+            "Last Update": {"date": {}},
+            "Project Link": {"url": {}},
+        })
+
+    # Criação ----------------------------------------------------------------
+
+    def _create_database(self, parent_page_id, title, properties):
+        db_id = str(uuid.uuid4())
+        self.databases[db_id] = {
+            "object": "database", "id": db_id, "created_time": _now(), "last_edited_time": _now(),
+            "title": _normalize_rich(title), "properties": properties or {},
+            "parent": {"type": "page_id", "page_id": parent_page_id} if parent_page_id else {"type": "workspace"},
+            "archived": False, "is_inline": True,
+        }
+        if parent_page_id:
+            self.blocks[db_id] = {
+                "object": "block", "id": db_id, "type": "child_database",
+                "child_database": {"title": _plain(self.databases[db_id]["title"])},
+                "has_children": False, "archived": False,
+            }
+            self.children.setdefault(parent_page_id, []).append(db_id)
+        return db_id
+
+    def _check_blocks(self, blocks):
+        """Valida tudo antes de gravar: a requisição é atômica, como no Notion."""
+        if len(blocks) > MAX_CHILDREN:
+            raise ApiError(400, "validation_error", f"body.children.length should be ≤ {MAX_CHILDREN}, instead was {len(blocks)}.")
+        for b in blocks:
+            b_type = b.get("type")
+            if not b_type or not isinstance(b.get(b_type), dict):
+                raise ApiError(400, "validation_error", "bloco sem type/conteúdo.")
+            body = b[b_type]
+            if "rich_text" in body:
+                _normalize_rich(body["rich_text"])
+            for cell in body.get("cells", []):
+                _normalize_rich(cell)
+            self._check_blocks(body.get("children", []))
+
+    def _add_blocks(self, parent_id, blocks):
+        created = []
+        for b in blocks:
+            b_type = b["type"]
+            body = dict(b[b_type])
+            nested = body.pop("children", [])
+            if "rich_text" in body:
+                body["rich_text"] = _normalize_rich(body["rich_text"])
+            if "cells" in body:
+                body["cells"] = [_normalize_rich(cell) for cell in body["cells"]]
+            block_id = str(uuid.uuid4())
+            block = {
+                "object": "block", "id": block_id, "type": b_type, b_type: body,
+                "has_children": bool(nested), "archived": False,
+                "created_time": _now(), "last_edited_time": _now(),
+            }
+            self.blocks[block_id] = block
+            self.children.setdefault(parent_id, []).append(block_id)
+            if nested:
+                self._add_blocks(block_id, nested)
+            created.append(block)
+        return created
+
+    # Endpoints --------------------------------------------------------------
+
+    def create_page(self, payload):
+        parent = payload.get("parent") or {}
+        db_id = parent.get("database_id")
+        page_parent = parent.get("page_id")
+        if db_id and db_id not in self.databases:
+            raise ApiError(404, "object_not_found", f"Could not find database with ID: {db_id}.")
+        if page_parent and page_parent not in self.pages:
+            raise ApiError(404, "object_not_found", f"Could not find page with ID: {page_parent}.")
+        properties = _normalize_properties(payload.get("properties"))
+        self._check_blocks(payload.get("children") or [])
+        page_id = str(uuid.uuid4())
+        self.pages[page_id] = {
+            "object": "page", "id": page_id, "created_time": _now(), "last_edited_time": _now(),
+            "parent": {"type": "database_id", "database_id": db_id} if db_id else {"type": "page_id", "page_id": page_parent},
+            "archived": False, "in_trash": False,
+            "properties": properties,
+            "url": f"https://www.notion.so/{page_id.replace('-', '')}",
+        }
+        self._add_blocks(page_id, payload.get("children") or [])
+        return self.pages[page_id]
+
+    def get_page(self, page_id):
+        page = self.pages.get(page_id)
+        if not page:
+            raise ApiError(404, "object_not_found", f"Could not find page with ID: {page_id}.")
+        return page
+
+    def update_page(self, page_id, payload):
+        page = self.get_page(page_id)
+        if page["archived"] and payload.get("archived") is not False and "properties" in payload:
+            raise ApiError(400, "validation_error", "Can't edit block that is archived.")
+        if "properties" in payload:
+            page["properties"].update(_normalize_properties(payload["properties"]))
+        if "archived" in payload:
+            page["archived"] = bool(payload["archived"])
+        page["last_edited_time"] = _now()
+        return page
+
+    def create_database(self, payload):
+        parent_id = (payload.get("parent") or {}).get("page_id")
+        if parent_id not in self.pages:
+            raise ApiError(404, "object_not_found", f"Could not find page with ID: {parent_id}.")
+        db_id = self._create_database(parent_id, payload.get("title") or [], payload.get("properties"))
+        return self.databases[db_id]
+
+    def update_database(self, db_id, payload):
+        db = self.databases.get(db_id)
+        if not db:
+            raise ApiError(404, "object_not_found", f"Could not find database with ID: {db_id}.")
+        if "properties" in payload:
+            db["properties"].update(payload["properties"])
+        if "title" in payload:
+            db["title"] = _normalize_rich(payload["title"])
+        db["last_edited_time"] = _now()
+        return db
+
+    def query_database(self, db_id, payload):
+        if db_id not in self.databases:
+            raise ApiError(404, "object_not_found", f"Could not find database with ID: {db_id}.")
+        flt = payload.get("filter")
+        rows = [p for p in self.pages.values()
+                if p["parent"].get("database_id") == db_id and not p["archived"] and self._matches(p, flt)]
+        for sort in reversed(payload.get("sorts") or []):
+            # Só ordenação por timestamp (created_time / last_edited_time)
+            if sort.get("timestamp"):
+                rows.sort(key=lambda p: p[sort["timestamp"]], reverse=sort.get("direction") == "descending")
+        return self._paginate(rows, payload.get("start_cursor"), payload.get("page_size"))
+
+    @staticmethod
+    def _matches(page, flt):
+        if not flt:
+            return True
+        if flt.get("timestamp"):
+            # {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": "..."}}
+            cond = flt.get(flt["timestamp"], {})
+            value = page[flt["timestamp"]]
+            if "on_or_after" in cond:
+                return value >= cond["on_or_after"]
+            if "after" in cond:
+                return value > cond["after"]
+            return True
+        prop = page["properties"].get(flt.get("property"), {})
+        for kind in ("title", "rich_text"):
+            if kind in flt and "equals" in flt[kind]:
+                return _plain(prop.get(kind)) == flt[kind]["equals"]
+        return True
+
+    def list_children(self, block_id, query):
+        if block_id not in self.pages and block_id not in self.blocks:
+            raise ApiError(404, "object_not_found", f"Could not find block with ID: {block_id}.")
+        ids = [i for i in self.children.get(block_id, []) if not self.blocks[i]["archived"]]
+        cursor = (query.get("start_cursor") or [None])[0]
+        size = (query.get("page_size") or [None])[0]
+        return self._paginate([self.blocks[i] for i in ids], cursor, size)
+
+    def append_children(self, block_id, payload):
+        if block_id not in self.pages and block_id not in self.blocks:
+            raise ApiError(404, "object_not_found", f"Could not find block with ID: {block_id}.")
+        children = payload.get("children") or []
+        self._check_blocks(children)
+        created = self._add_blocks(block_id, children)
+        if block_id in self.blocks:
+            self.blocks[block_id]["has_children"] = True
+        return {"object": "list", "results": created, "next_cursor": None, "has_more": False}
+
+    def update_block(self, block_id, payload):
+        block = self.blocks.get(block_id)
+        if not block or block["archived"]:
+            raise ApiError(404, "object_not_found", f"Could not find block with ID: {block_id}.")
+        body = payload.get(block["type"])
+        if body:
+            body = dict(body)
+            if "rich_text" in body:
+                body["rich_text"] = _normalize_rich(body["rich_text"])
+            if "cells" in body:
+                body["cells"] = [_normalize_rich(cell) for cell in body["cells"]]
+            block[block["type"]].update(body)
+        block["last_edited_time"] = _now()
+        return block
+
+    def delete_block(self, block_id):
+        block = self.blocks.get(block_id)
+        if not block or block["archived"]:
+            raise ApiError(404, "object_not_found", f"Could not find block with ID: {block_id}.")
+        block["archived"] = True
+        return block
+
+    def search(self, payload):
+        query = (payload.get("query") or "").lower()
+        kind = (payload.get("filter") or {}).get("value")
+        results = []
+        if kind in (None, "database"):
+            results += [d for d in self.databases.values() if query in _plain(d["title"]).lower()]
+        if kind in (None, "page"):
+            results += [p for p in self.pages.values()
+                        if not p["archived"] and any(query in _plain(v.get("title")).lower()
+                                                     for v in p["properties"].values() if "title" in v)]
+        return self._paginate(results, payload.get("start_cursor"), payload.get("page_size"))
+
+    @staticmethod
+    def _paginate(items, cursor, page_size):
+        try:
+            size = min(MAX_PAGE_SIZE, int(page_size or MAX_PAGE_SIZE))
+            start = int(cursor or 0)
+        except ValueError:
+            raise ApiError(400, "validation_error", "start_cursor/page_size inválido.")
+        chunk = items[start:start + size]
+        more = start + size < len(items)
+        return {"object": "list", "results": chunk, "has_more": more,
+                "next_cursor": str(start + size) if more else None}
+
+    def dispatch(self, method, path, payload, query):
+        """Roteia (método, caminho) para o endpoint. Caminho sem o prefixo /v1."""
+        parts = [p for p in path.strip("/").split("/") if p]
+        with self.lock:
+            if parts == ["pages"] and method == "POST":
+                return self.create_page(payload)
+            if len(parts) == 2 and parts[0] == "pages":
+                if method == "GET":
+                    return self.get_page(parts[1])
+                if method == "PATCH":
+                    return self.update_page(parts[1], payload)
+            if parts == ["databases"] and method == "POST":
+                return self.create_database(payload)
+            if len(parts) == 2 and parts[0] == "databases" and method == "PATCH":
+                return self.update_database(parts[1], payload)
+            if len(parts) == 3 and parts[0] == "databases" and parts[2] == "query" and method == "POST":
+                return self.query_database(parts[1], payload)
+            if len(parts) == 3 and parts[0] == "blocks" and parts[2] == "children":
+                if method == "GET":
+                    return self.list_children(parts[1], query)
+                if method == "PATCH":
+                    return self.append_children(parts[1], payload)
+            if len(parts) == 2 and parts[0] == "blocks":
+                if method == "PATCH":
+                    return self.update_block(parts[1], payload)
+                if method == "DELETE":
+                    return self.delete_block(parts[1])
+            if parts == ["search"] and method == "POST":
+                return self.search(payload)
+        raise ApiError(400, "invalid_request_url", f"Invalid request URL: {method} /v1/{path.strip('/')}")
+
+
+class FaultInjector:
+    """Latência, limite de taxa (token bucket) e erros aleatórios, como num dia ruim do Notion."""
+
+    def __init__(self, latency=0.0, jitter=0.0, rate=0.0, p429=0.0, p5xx=0.0, retry_after=1.0, seed=None,
+                 p5xx_late=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate = rate
+        self.p429 = p429
+        self.p5xx = p5xx
+        self.p5xx_late = p5xx_late
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.tokens = max(1.0, rate)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "429": 0, "5xx": 0}
+
+    def delay(self):
+        with self.lock:
+            extra = self.random.uniform(0, self.jitter) if self.jitter else 0.0
+        if self.latency or extra:
+            time.sleep(self.latency + extra)
+
+    def verdict(self):
+        """None = atende normalmente; senão (status, Retry-After | None)."""
+        with self.lock:
+            self.counts["requests"] += 1
+            if self.rate > 0:
+                now = time.monotonic()
+                self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens < 1:
+                    self.counts["429"] += 1
+                    return 429, max(self.retry_after, (1 - self.tokens) / self.rate)
+                self.tokens -= 1
+            roll = self.random.random()
+            if roll < self.p429:
+                self.counts["429"] += 1
+                return 429, self.retry_after
+            if roll < self.p429 + self.p5xx:
+                self.counts["5xx"] += 1
+                return 503, None
+        return None
+
+    def lost_response(self):
+        """Escrita já aplicada, mas o cliente recebe 504 (ex: gateway caiu no meio)?"""
+        if not self.p5xx_late:
+            return False
+        with self.lock:
+            if self.random.random() < self.p5xx_late:
+                self.counts["5xx"] += 1
+                return True
+        return False
+
+
+def make_handler(state, faults):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, como a API real
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status, body, headers=None):
+            raw = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def _error(self, status, code, message, headers=None):
+            self._send(status, {"object": "error", "status": status, "code": code, "message": message}, headers)
+
+        def _handle(self):
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            faults.delay()
+
+            if not url.path.startswith("/v1/"):
+                return self._error(404, "invalid_request_url", "Invalid request URL.")
+            if not (self.headers.get("Authorization") or "").startswith("Bearer "):
+                return self._error(401, "unauthorized", "API token is invalid.")
+            verdict = faults.verdict()
+            if verdict:
+                status, retry_after = verdict
+                if status == 429:
+                    return self._error(429, "rate_limited", "You have been rate limited. Please try again in a few minutes.",
+                                       {"Retry-After": f"{math.ceil(retry_after * 100) / 100:g}"})
+                return self._error(status, "service_unavailable", "Notion is unavailable, please try again later.")
+            if len(raw) > MAX_PAYLOAD_BYTES:
+                return self._error(413, "payload_too_large", f"Request body too large ({len(raw)} bytes).")
+
+            try:
+                payload = json.loads(raw) if raw else {}
+            except ValueError:
+                return self._error(400, "invalid_json", "Error parsing JSON body.")
+            if isinstance(payload.get("children"), list) and _count_blocks(payload["children"]) > MAX_BLOCKS:
+                return self._error(400, "validation_error", f"Request exceeds {MAX_BLOCKS} blocks.")
+            try:
+                body = state.dispatch(self.command, url.path[len("/v1"):], payload, parse_qs(url.query))
+            except ApiError as e:
+                return self._error(e.status, e.code, e.message)
+            if self.command != "GET" and faults.lost_response():
+                return self._error(504, "gateway_timeout", "Notion took too long to respond.")
+            self._send(200, body)
+
+        do_GET = do_POST = do_PATCH = do_DELETE = _handle
+
+    return Handler
+
+
+def start_server(port=0, host="127.0.0.1", **fault_options):
+    """
+    Sobe o servidor numa thread. Retorna (server, state, faults);
+    a URL base é f"http://{host}:{server.server_port}/v1". Pare com server.shutdown().
+    """
+    state = MockNotion()
+    faults = FaultInjector(**fault_options)
+    server = ThreadingHTTPServer((host, port), make_handler(state, faults))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, faults
+
+
+def add_fault_arguments(parser):
+    """Opções de falha compartilhadas com o notion_benchmark.py."""
+    parser.add_argument("--latency", type=float, default=0.0, help="atraso fixo por resposta (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="atraso extra aleatório até N segundos")
+    parser.add_argument("--rate", type=float, default=0.0, help="limite de taxa do servidor em req/s (0 = sem limite)")
+    parser.add_argument("--p429", type=float, default=0.0, help="probabilidade de 429 aleatório")
+    parser.add_argument("--p5xx", type=float, default=0.0, help="probabilidade de 503 aleatório")
+    parser.add_argument("--p5xx-late", type=float, default=0.0,
+                        help="probabilidade de 504 depois de aplicar a escrita (resposta perdida)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After dos 429 (s)")
+    parser.add_argument("--seed", type=int, default=None, help="semente das falhas aleatórias")
+
+
+def fault_options(args):
+    return {"latency": args.latency, "jitter": args.jitter, "rate": args.rate, "p429": args.p429,
+            "p5xx": args.p5xx, "retry_after": args.retry_after, "seed": args.seed,
+            "p5xx_late": args.p5xx_late}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local que imita a API do Notion.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--host", default="127.0.0.1")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    server, state, faults = start_server(args.port, args.host, **fault_options(args))
+    print(f"--- Mock do Notion em http://{args.host}:{server.server_port}/v1 ---")
+    print(f"> NOTION_API_BASE_URL=http://{args.host}:{server.server_port}/v1")
+    print(f"> NOTION_DATABASE_ID_PBI_HUB_INVENTORY={state.hub_id}")
+    print("> Ctrl+C para parar.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"\n> {faults.counts['requests']} requisições, {faults.counts['429']} x 429, {faults.counts['5xx']} x 5xx.")
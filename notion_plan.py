@@ -0,0 +1,136 @@
+import itertools
+import threading
+
+from notion_api import DEFAULT_RATE_LIMIT, NotionClient
+from notion_blocks import payload_size
+from notion_publisher import DEFAULT_CONCURRENCY
+
+# ==============================================================================
+# PLANO DA PUBLICAÇÃO (--plan)
+# ==============================================================================
+# PlanClient imita o NotionClient sem rede: conta requisições, linhas, lotes e
+# bytes por etapa e estima o tempo pela vazão min(rate_limit, concorrência /
+# LATENCIA_MEDIA). Nas etapas em série (capa, DBs ordered, que criam uma linha
+# por vez) o mínimo é linhas x LATENCIA_MEDIA; DBs sem ordem (parallel_phases)
+# só dependem da vazão. 429 e retries não entram na conta.
+
+LATENCIA_MEDIA = 0.35  # segundos por ida e volta ao Notion (média observada)
+
+
+class _PlanResponse:
+    """Resposta 200 mínima (status_code, text, json()) que o constructor consome."""
+
+    status_code = 200
+    text = ""
+
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class PlanClient(NotionClient):
+    """NotionClient offline: conta requisições, lotes e bytes por etapa (client.phase)."""
+
+    def __init__(self, rate_limit=DEFAULT_RATE_LIMIT, concurrency=DEFAULT_CONCURRENCY,
+                 latency=LATENCIA_MEDIA):
+        # Sem super().__init__: nada de sessão HTTP nem limitador
+        self.rate_limit = float(rate_limit or 0)
+        self.concurrency = max(1, int(concurrency or 1))
+        self.latency = latency
+        self.stats = {"requests": 0, "throttled": 0, "retries": 0, "server_errors": 0}
+        self.failures = []
+        self.mirror = None
+        self.phases = {}  # etapa -> contadores (na ordem em que aparecem)
+        self.parallel_phases = set()  # etapas de DBs com ordered=False (linhas criadas em paralelo)
+        self._ids = itertools.count(1)
+        self._stats_lock = threading.Lock()
+        self._init_phases()
+
+    @classmethod
+    def from_config(cls, config, token=None):
+        """Mesmas chaves do pbi_config.json usadas na publicação real."""
+        return cls(
+            rate_limit=config.get("notion_rate_limit", DEFAULT_RATE_LIMIT),
+            concurrency=config.get("notion_concurrency", DEFAULT_CONCURRENCY),
+        )
+
+    def close(self):
+        pass
+
+    def _fake_id(self):
+        return f"plan-{next(self._ids):08d}"
+
+    def request(self, method, path, json=None, params=None, expected=(200,), recover=None):
+        size = payload_size(json) if json is not None else 0
+        is_row = method == "POST" and path == "pages"
+        is_batch = method == "PATCH" and path.endswith("/children")
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            ph = self.phases.setdefault(self.phase or "Geral", {
+                "requests": 0, "rows": 0, "batches": 0, "blocks": 0, "bytes": 0, "max_bytes": 0,
+            })
+            ph["requests"] += 1
+            ph["bytes"] += size
+            ph["max_bytes"] = max(ph["max_bytes"], size)
+            if is_row:
+                ph["rows"] += 1
+                ph["blocks"] += len(json.get("children", []))
+            elif is_batch:
+                ph["batches"] += 1
+                ph["blocks"] += len(json["children"])
+
+        if is_batch:
+            return _PlanResponse({"results": [{"id": self._fake_id()} for _ in json["children"]]})
+        if method == "GET" and path.endswith("/children"):
+            # Blocos já publicados (sincronização): uma página cheia de IDs fictícios
+            page_size = (params or {}).get("page_size", 100)
+            return _PlanResponse({"results": [{"id": self._fake_id()} for _ in range(page_size)],
+                                  "has_more": False, "next_cursor": None})
+        if path.endswith("/query") or path == "search":
+            return _PlanResponse({"results": [], "has_more": False, "next_cursor": None})
+        return _PlanResponse({"id": self._fake_id()})
+
+    def throughput(self):
+        """Requisições/segundo sustentáveis (taxa configurada x concorrência / latência)."""
+        rate = self.concurrency / self.latency
+        return min(rate, self.rate_limit) if self.rate_limit > 0 else rate
+
+    def estimate_seconds(self, requests, rows, serial=True):
+        """Tempo estimado de uma etapa sozinha: pela vazão e, se as linhas saem em série, no mínimo linhas x latência."""
+        secs = requests / self.throughput()
+        return max(secs, rows * self.latency) if serial else secs
+
+    def print_summary(self, max_failures=20):
+        """Tabela do plano por etapa + total."""
+        print("\n--- Plano de publicação (nenhuma chamada foi feita ao Notion) ---")
+        header = f"  {'Etapa':<28}{'Req.':>7}{'Linhas':>8}{'Lotes':>7}{'Blocos':>8}{'KB':>10}{'Maior KB':>10}{'Tempo':>10}"
+        print(header)
+        print("  " + "-" * (len(header) - 2))
+        total = {"requests": 0, "rows": 0, "batches": 0, "blocks": 0, "bytes": 0, "max_bytes": 0}
+        longest = 0.0
+        for name, ph in self.phases.items():
+            secs = self.estimate_seconds(ph["requests"], ph["rows"], name not in self.parallel_phases)
+            longest = max(longest, secs)
+            for k in total:
+                total[k] = max(total[k], ph[k]) if k == "max_bytes" else total[k] + ph[k]
+            print(self._plan_line(name, ph, secs))
+        print("  " + "-" * (len(header) - 2))
+        total_s = max(total["requests"] / self.throughput(), longest)
+        print(self._plan_line("TOTAL", total, total_s))
+
+        rate = f"{self.rate_limit:g} req/s" if self.rate_limit > 0 else "sem limite de taxa"
+        print(f"\n> Premissas: {rate}, concorrência {self.concurrency}, latência média {self.latency:g}s por chamada.")
+        print("> Não inclui o arquivamento das versões antigas nem 429/retries (dependem do Notion no momento).")
+
+    @staticmethod
+    def _plan_line(name, ph, secs):
+        return (f"  {name[:27]:<28}{ph['requests']:>7}{ph['rows']:>8}{ph['batches']:>7}{ph['blocks']:>8}"
+                f"{ph['bytes'] / 1024:>10.1f}{ph['max_bytes'] / 1024:>10.1f}{format_duration(secs):>10}")
+
+
+def format_duration(seconds):
+    """Segundos -> 'H:MM:SS'."""
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
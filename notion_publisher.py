@@ -0,0 +1,230 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+from notion_blocks import pack_blocks, payload_size
+from notion_journal import row_hash
+
+# ==============================================================================
+# PUBLICAÇÃO ASSÍNCRONA DE LINHAS
+# ==============================================================================
+# Linha = 1 POST /pages (com o primeiro lote do corpo) + PATCH só do que sobrou.
+# Até `concurrency` requisições em voo numa fila por prioridade (asyncio + threads
+# de requests); ordered=True cria as linhas na ordem. gather() enche vários DBs
+# na mesma fila; com PublishJournal o que já foi feito é pulado na retomada e a
+# linha criada sem registro (queda durante o POST) é achada com find_row.
+
+DEFAULT_CONCURRENCY = 4
+
+
+def estimate_requests(rows):
+    """Requisições para publicar as linhas do zero: 1 POST por linha + 1 PATCH por lote extra de blocos."""
+    return sum(max(1, len(pack_blocks(body, first_reserve=payload_size(props)))) for _, props, body, _ in rows)
+
+
+class PrioritySemaphore:
+    """Semáforo asyncio: havendo fila, a vaga liberada vai para a menor prioridade (empate: quem chegou antes)."""
+
+    def __init__(self, value):
+        self._value = value
+        self._waiters = []  # heap de (prioridade, ordem de chegada, future)
+        self._seq = itertools.count()
+
+    async def acquire(self, priority=0):
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            # Cancelado depois de já ter recebido a vaga: devolve para o próximo
+            if fut.done() and not fut.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)  # a vaga passa direto para quem esperava
+                return
+        self._value += 1
+
+
+class RowPublisher:
+    """
+    Publica linhas (propriedades + blocos do corpo) em um inline DB.
+
+    create_row(db_id, props, name, children, exclude) -> page_id | None
+    append_children(page_id, blocks, name) -> [block_id, ...] | None
+    discard_row(page_id, name) -> bool   (só usado na retomada)
+    find_row(db_id, props, exclude) -> [page, ...] | None   (só usado na retomada)
+    são as funções síncronas que fazem as chamadas ao Notion (com retry).
+    exclude: page_ids que o diário já atribuiu a outras linhas do DB.
+    """
+
+    def __init__(self, create_row, append_children, concurrency=DEFAULT_CONCURRENCY,
+                 journal=None, discard_row=None, verbose=True, find_row=None):
+        self.create_row = create_row
+        self.append_children = append_children
+        self.concurrency = max(1, int(concurrency or 1))
+        self.journal = journal
+        self.discard_row = discard_row
+        self.find_row = find_row
+        self._claimed = set()  # páginas órfãs já atribuídas nesta retomada
+        self.verbose = verbose  # False: sem o contador a cada 50 linhas (ex: linha de progresso ao vivo)
+        self._sem = None  # fila compartilhada do laço em execução (ver _run_loop)
+
+    def _run_loop(self, coro):
+        async def main():
+            self._sem = PrioritySemaphore(self.concurrency)
+            try:
+                return await coro
+            finally:
+                self._sem = None
+        return asyncio.run(main())
+
+    async def _call(self, fn, *args, priority=0):
+        await self._sem.acquire(priority)
+        try:
+            return await asyncio.to_thread(fn, *args)
+        finally:
+            self._sem.release()
+
+    async def _publish_row(self, db_key, db_id, row, prev_created, my_created, progress, priority):
+        key, props, children, name = row
+        journal = self.journal
+        content = row_hash(props, children) if journal else None
+        done = journal.row(db_key, key) if journal else None
+        try:
+            if done and done["hash"] != content:
+                # Conteúdo mudou desde a execução interrompida: descarta a linha parcial
+                if self.discard_row:
+                    await self._call(self.discard_row, done["page_id"], name, priority=priority)
+                done = None
+            if prev_created is not None:
+                await prev_created.wait()
+            # O primeiro lote do corpo vai junto na criação da página (dividindo espaço com as propriedades)
+            batches = pack_blocks(children, first_reserve=payload_size(props))
+            inline, batches = (batches[0], batches[1:]) if batches else ([], [])
+            if done:
+                page_id = done["page_id"]
+            else:
+                page_id = None
+                pending = journal.intent(db_key, key) if journal else None
+                if pending and self.find_row:
+                    page_id = await self._adopt(db_key, db_id, row, pending, content, len(inline), priority)
+                if not page_id:
+                    exclude = ()
+                    if journal:
+                        journal.record_intent(db_key, key, content, props)
+                        exclude = journal.page_ids(db_key)
+                    page_id = await self._call(self.create_row, db_id, props, name, inline, exclude,
+                                               priority=priority)
+                    if page_id and journal:
+                        journal.record_row(db_key, key, page_id, content, len(inline))
+        finally:
+            my_created.set()
+
+        block_ids = []
+        if page_id and batches:
+            # Lotes da mesma linha precisam sair em ordem (o Notion anexa no fim)
+            for n, batch in enumerate(batches):
+                if done and n in done["batches"]:
+                    block_ids.extend(done["batches"][n])
+                    continue
+                ids = await self._call(self.append_children, page_id, batch, name, priority=priority)
+                if ids is None:
+                    block_ids = None
+                    break
+                if journal:
+                    journal.record_batch(db_key, key, n, ids)
+                block_ids.extend(ids)
+
+        progress()
+        return page_id, block_ids, len(inline)
+
+    async def _adopt(self, db_key, db_id, row, pending, content, n_inline, priority):
+        """
+        Retomada de uma criação sem "row" no diário: procura a página no DB (pelas
+        propriedades da intent). Mesmo conteúdo -> reaproveita; conteúdo novo ->
+        descarta a órfã. Retorna o page_id reaproveitado ou None (criar de novo).
+        """
+        key, _, _, name = row
+        found = await self._call(self.find_row, db_id, pending["props"], self.journal.page_ids(db_key),
+                                 priority=priority)
+        if found is None:
+            print(f"[AVISO] Não foi possível conferir se '{name}' já existe no Notion. Ela pode ficar duplicada.")
+            return None
+        orphans = [page["id"] for page in found if page["id"] not in self._claimed]
+        self._claimed.update(orphans)
+        adopted = None
+        if orphans and pending["hash"] == content:
+            adopted = orphans.pop(0)
+            self.journal.record_row(db_key, key, adopted, content, n_inline)
+        # Sobras de quedas repetidas (ou linha que mudou): arquiva para não ficar em dobro
+        for page_id in orphans:
+            if self.discard_row:
+                await self._call(self.discard_row, page_id, name, priority=priority)
+        return adopted
+
+    async def publish_async(self, db_id, rows, ordered=True, label="", db_key="", title="", priority=0):
+        """Versão assíncrona de publish(), para rodar dentro de gather()."""
+        if not rows:
+            return []
+        t0 = time.perf_counter()
+        done = [0]
+        total = len(rows)
+
+        def progress():
+            done[0] += 1
+            if self.verbose and label and (done[0] % 50 == 0 or done[0] == total) and total >= 50:
+                print(f"  - {done[0]}/{total} {label} enviadas para o Notion...")
+
+        events = [asyncio.Event() for _ in rows]
+        tasks = [
+            self._publish_row(db_key, db_id, row, events[i - 1] if (ordered and i > 0) else None, events[i],
+                              progress, priority)
+            for i, row in enumerate(rows)
+        ]
+        results = await asyncio.gather(*tasks)
+        failed = sum(1 for page_id, _, _ in results if not page_id)
+        msg = f"  > {title + ': ' if title else ''}{len(rows) - failed}/{len(rows)} linhas em {time.perf_counter() - t0:.1f}s"
+        if failed:
+            msg += f" (❌ {failed} falhas)"
+        print(msg)
+        return results
+
+    def publish(self, db_id, rows, ordered=True, label="", db_key="", title=""):
+        """
+        rows: lista de (chave, props, children_blocks, name); a chave identifica a
+        linha no diário de retomada (db_key identifica o DB).
+        Retorna [(page_id, block_ids, qtd_inline), ...] na mesma ordem de rows:
+        page_id None = linha não criada; block_ids = IDs dos blocos anexados depois
+        da criação (None = corpo incompleto); qtd_inline = blocos enviados na criação.
+        """
+        if not rows:
+            return []
+        return self._run_loop(self.publish_async(db_id, rows, ordered, label, db_key, title))
+
+    async def run_async(self, jobs, priority=0):
+        """Versão assíncrona de run(), para rodar dentro de gather()."""
+        return await asyncio.gather(*(self._call(job, priority=priority) for job in jobs))
+
+    def run(self, jobs):
+        """Executa funções síncronas sem argumentos (ex: updates/arquivamentos) com a mesma concorrência."""
+        if not jobs:
+            return []
+        return self._run_loop(self.run_async(jobs))
+
+    def gather(self, coros):
+        """Roda as corrotinas (ex: uma por inline DB) em paralelo, na mesma fila de `concurrency` vagas."""
+        if not coros:
+            return []
+
+        async def all_of():
+            return await asyncio.gather(*coros)
+        return self._run_loop(all_of())
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+
+# ==============================================================================
+# ESTADO DA SINCRONIZAÇÃO DIFERENCIAL (notion_sync = true)
+# ==============================================================================
+# notion_sync_state.json guarda capa, DBs (id + hash do schema) e, por linha,
+# page_id, hashes de propriedades/corpo e os blocos que o constructor anexou.
+# Só o que mudou é criado/atualizado/arquivado; blocos escritos à mão ficam.
+
+SYNC_STATE_FILE = "notion_sync_state.json"
+STATE_VERSION = 1
+
+
+def content_hash(obj):
+    """Hash estável (sha1) do JSON renderizado de propriedades / blocos."""
+    raw = json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class SyncState:
+    """Mapa entidade -> IDs do Notion + hashes do conteúdo publicado."""
+
+    def __init__(self, project_name, path=SYNC_STATE_FILE, data=None):
+        self.path = path
+        self.project_name = project_name
+        self.data = data or self._empty()
+        self.read_only = False  # --plan: usa o estado para o diff, mas não grava
+
+    def _empty(self):
+        return {"version": STATE_VERSION, "project_name": self.project_name,
+                "main_id": None, "databases": {}, "rows": {}}
+
+    @classmethod
+    def load(cls, project_name, path=SYNC_STATE_FILE):
+        """Carrega o estado; arquivo ausente, corrompido ou de outro projeto = estado vazio."""
+        if not os.path.exists(path):
+            return cls(project_name, path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[AVISO] {path} ilegível ({e}). A sincronização vai recomeçar do zero.")
+            return cls(project_name, path)
+        if data.get("version") != STATE_VERSION or data.get("project_name") != project_name:
+            print(f"[INFO] {path} pertence a outro projeto/versão. A sincronização vai recomeçar do zero.")
+            return cls(project_name, path)
+        return cls(project_name, path, data)
+
+    def save(self):
+        """Grava de forma atômica (arquivo temporário + replace)."""
+        if self.read_only:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=1, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def reset(self):
+        self.data = self._empty()
+
+    @property
+    def main_id(self):
+        return self.data.get("main_id")
+
+    @main_id.setter
+    def main_id(self, value):
+        self.data["main_id"] = value
+
+    def database(self, key):
+        return self.data["databases"].get(key)
+
+    def set_database(self, key, db_id, schema_hash):
+        self.data["databases"][key] = {"id": db_id, "schema_hash": schema_hash}
+
+    def drop_database(self, key):
+        self.data["databases"].pop(key, None)
+        self.data["rows"].pop(key, None)
+
+    def rows(self, key):
+        return self.data["rows"].setdefault(key, {})
+
+
+def diff_rows(previous, rows):
+    """
+    previous: {chave: entrada do estado}; rows: [(chave, props, body, nome), ...].
+    Retorna (novas, alteradas, inalteradas, removidas):
+      novas / alteradas: listas de (row, props_hash, body_hash)
+      removidas: lista de (chave, entrada)
+    """
+    new, changed, unchanged = [], [], 0
+    seen = set()
+    for row in rows:
+        key, props, body, _ = row
+        seen.add(key)
+        ph, bh = content_hash(props), content_hash(body)
+        old = previous.get(key)
+        if not old:
+            new.append((row, ph, bh))
+        elif old.get("props_hash") != ph or old.get("body_hash") != bh:
+            changed.append((row, ph, bh))
+        else:
+            unchanged += 1
+    removed = [(k, v) for k, v in previous.items() if k not in seen]
+    return new, changed, unchanged, removed
@@ -0,0 +1,286 @@
+import sys
+
+# ==============================================================================
+# MODELO TIPADO DO INVENTÁRIO (minerador_pbi.py <-> constructor_notion.py)
+# ==============================================================================
+# Registros com __slots__ e nomes internados (sys.intern): milhares de visuais
+# repetindo a mesma página/tabela/tipo dividem uma única string. O inventário
+# segue sendo o dict de sempre e o model_structure.json não muda de shape.
+
+
+def _i(value):
+    """Interna identificadores (nomes, tipos, IDs). Valores vazios viram ''."""
+    return sys.intern(str(value)) if value else ""
+
+
+# ==============================================================================
+# REGISTROS
+# ==============================================================================
+
+class Column:
+    __slots__ = ("name", "type", "origin", "expression_dax", "sort_by")
+
+    def __init__(self, name, type="string", origin="Física", expression_dax=None, sort_by=None):
+        self.name = _i(name)
+        self.type = _i(type)
+        self.origin = _i(origin)
+        self.expression_dax = expression_dax
+        self.sort_by = _i(sort_by) or None
+
+    @property
+    def is_calculated(self):
+        return self.origin == "Calculada (DAX)"
+
+    def to_dict(self):
+        d = {"name": self.name, "type": self.type, "origin": self.origin}
+        if self.sort_by:
+            d["sort_by"] = self.sort_by
+        if self.expression_dax:
+            d["expression_dax"] = self.expression_dax
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            d.get("name", ""),
+            d.get("type", "string"),
+            d.get("origin", "Física"),
+            d.get("expression_dax"),
+            d.get("sort_by"),
+        )
+
+
+class Connection:
+    __slots__ = ("table", "source_type", "project", "dataset", "object", "m_expression",
+                 "partition", "mode", "sources")
+
+    def __init__(self, table, source_type="", project="", dataset="", object="", m_expression="",
+                 partition="", mode="", sources=None):
+        self.table = _i(table)
+        self.source_type = _i(source_type)
+        self.project = _i(project)
+        self.dataset = _i(dataset)
+        self.object = _i(object)
+        self.m_expression = m_expression or ""
+        self.partition = _i(partition)
+        self.mode = _i(mode)
+        # Chaves das fontes lidas por esta partição (ver "source_graph" do inventário)
+        self.sources = [_i(k) for k in (sources or [])]
+
+    def to_dict(self):
+        d = {
+            "table": self.table,
+            "source_type": self.source_type,
+            "project": self.project,
+            "dataset": self.dataset,
+            "object": self.object,
+            "m_expression": self.m_expression,
+        }
+        if self.partition:
+            d["partition"] = self.partition
+        if self.mode:
+            d["mode"] = self.mode
+        if self.sources:
+            d["sources"] = list(self.sources)
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            d.get("table", ""),
+            d.get("source_type", ""),
+            d.get("project", ""),
+            d.get("dataset", ""),
+            d.get("object", ""),
+            d.get("m_expression", ""),
+            d.get("partition", ""),
+            d.get("mode", ""),
+            d.get("sources"),
+        )
+
+
+class Table:
+    __slots__ = ("name", "columns", "connection", "hierarchy_columns")
+
+    def __init__(self, name, columns=None, connection=None, hierarchy_columns=None):
+        self.name = _i(name)
+        self.columns = columns if columns is not None else []
+        self.connection = connection
+        self.hierarchy_columns = hierarchy_columns if hierarchy_columns is not None else []
+
+    def to_dict(self):
+        d = {"columns": [c.to_dict() for c in self.columns]}
+        if self.hierarchy_columns:
+            d["hierarchy_columns"] = list(self.hierarchy_columns)
+        if self.connection is not None:
+            d["connection"] = self.connection.to_dict()
+        return d
+
+    @classmethod
+    def from_dict(cls, name, d):
+        conn = d.get("connection")
+        return cls(
+            name,
+            [Column.from_dict(c) for c in d.get("columns", [])],
+            Connection.from_dict(conn) if conn else None,
+            [_i(c) for c in d.get("hierarchy_columns", [])],
+        )
+
+
+class Relationship:
+    __slots__ = ("from_column", "to_column", "cardinality", "filter", "active")
+
+    def __init__(self, from_column, to_column, cardinality="OneToMany", filter="Single", active="True"):
+        self.from_column = _i(from_column)
+        self.to_column = _i(to_column)
+        self.cardinality = _i(cardinality)
+        self.filter = _i(filter)
+        self.active = _i(active)
+
+    def key(self):
+        return (self.from_column, self.to_column, self.cardinality, self.filter, self.active)
+
+    def __eq__(self, other):
+        return isinstance(other, Relationship) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def to_dict(self):
+        return {
+            "from": self.from_column,
+            "to": self.to_column,
+            "cardinality": self.cardinality,
+            "filter": self.filter,
+            "active": self.active,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            d.get("from", "?"),
+            d.get("to", "?"),
+            d.get("cardinality", "-"),
+            d.get("filter", "-"),
+            d.get("active", "-"),
+        )
+
+
+class Visual:
+    __slots__ = ("id", "type", "measures", "label")
+
+    def __init__(self, id, type="Visual Desconhecido", measures=None, label=""):
+        self.id = _i(id)
+        self.type = _i(type)
+        self.measures = [_i(m) for m in (measures or [])]
+        self.label = _i(label)
+
+    def to_dict(self):
+        return {"id": self.id, "type": self.type, "measures": list(self.measures), "label": self.label}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d.get("id"), d.get("type", "Visual Desconhecido"), d.get("measures", []), d.get("label", ""))
+
+
+class Page:
+    __slots__ = ("id", "name", "visuals")
+
+    def __init__(self, id, name, visuals=None):
+        self.id = _i(id)
+        self.name = _i(name)
+        self.visuals = visuals if visuals is not None else []
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "visuals": [v.to_dict() for v in self.visuals]}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d.get("id", "unk"), d.get("name", "Geral"), [Visual.from_dict(v) for v in d.get("visuals", [])])
+
+
+class Measure:
+    __slots__ = (
+        "name", "table", "dax", "global_id",
+        "parent_names", "child_names", "visual_details", "in_visual", "status",
+        "desc", "visual_text",
+    )
+
+    def __init__(self, name, table, dax, global_id=""):
+        self.name = _i(name)
+        self.table = _i(table)
+        self.dax = dax or ""
+        self.global_id = _i(global_id)
+        self.parent_names = []
+        self.child_names = []
+        # Lista de (página, tipo, id_visual) — tuplas de strings internadas
+        self.visual_details = []
+        self.in_visual = False
+        self.status = ""
+        self.desc = ""
+        self.visual_text = ""
+
+    def to_dict(self):
+        d = {"name": self.name, "table": self.table, "dax": self.dax}
+        if self.global_id:
+            d["global_id"] = self.global_id
+            d["parent_names"] = list(self.parent_names)
+            d["visual_details"] = [{"page": p, "type": t, "id": v} for p, t, v in self.visual_details]
+            d["in_visual"] = self.in_visual
+            d["child_names"] = list(self.child_names)
+            d["status"] = self.status
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        m = cls(d.get("name", ""), d.get("table", ""), d.get("dax", ""), d.get("global_id", ""))
+        m.parent_names = [_i(x) for x in d.get("parent_names", [])]
+        m.child_names = [_i(x) for x in d.get("child_names", [])]
+        m.visual_details = [
+            (_i(v.get("page", "Geral")), _i(v.get("type", "Visual Desconhecido")), _i(v.get("id")))
+            for v in d.get("visual_details", [])
+        ]
+        m.in_visual = bool(d.get("in_visual", False))
+        m.status = _i(d.get("status", ""))
+        return m
+
+
+# ==============================================================================
+# CONVERSÃO DO INVENTÁRIO (JSON <-> REGISTROS)
+# ==============================================================================
+
+def inventory_to_dict(inv):
+    """Converte o inventário com registros para o shape JSON do model_structure.json."""
+    out = {}
+    for key, value in inv.items():
+        if key == "tables":
+            out[key] = {name: t.to_dict() for name, t in value.items()}
+        elif key in ("relationships", "measures", "connections", "report_structure"):
+            out[key] = [x.to_dict() for x in value]
+        elif key == "unified_pages":
+            out[key] = {p: [v.to_dict() for v in vis] for p, vis in value.items()}
+        else:
+            out[key] = value
+    return out
+
+
+def inventory_from_dict(data):
+    """Reconstrói o inventário tipado a partir do JSON do model_structure.json."""
+    inv = dict(data)
+    tables = {_i(name): Table.from_dict(name, t) for name, t in data.get("tables", {}).items()}
+    inv["tables"] = tables
+    inv["relationships"] = [Relationship.from_dict(r) for r in data.get("relationships", [])]
+    inv["measures"] = [Measure.from_dict(m) for m in data.get("measures", [])]
+
+    # Conexões compartilham a mesma instância da tabela quando possível
+    connections = []
+    for c in data.get("connections", []):
+        t = tables.get(c.get("table", ""))
+        if t is not None and t.connection is not None and t.connection.m_expression == c.get("m_expression", ""):
+            connections.append(t.connection)
+        else:
+            connections.append(Connection.from_dict(c))
+    inv["connections"] = connections
+    inv["report_structure"] = [Page.from_dict(p) for p in data.get("report_structure", [])]
+    inv.setdefault("roles", [])
+    return inv
@@ -0,0 +1,414 @@
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+import unicodedata
+
+# ==============================================================================
+# SITE ESTÁTICO (--site)
+# ==============================================================================
+# Mesmo conteúdo dos 8 inline DBs em HTML ou Markdown (site_format), com links
+# cruzados entre medidas, páginas e tabelas e busca offline (search_index.json).
+
+DEFAULT_SITE_DIR = "inventory_site"
+SITE_FORMATS = ("html", "markdown")
+SNIPPET_CHARS = 220
+
+# Tabela[Coluna] / 'Tabela'[Coluna] / [Medida] dentro do DAX (mesma ideia do minerador)
+RE_DAX_REF = re.compile(r"(?:'((?:[^']|'')+)'|([A-Za-z_][\w\.]*))?\[((?:[^\]]|\]\])+)\]")
+RE_MEASURE_IDS = re.compile(r"^M\d+(?:\s*,\s*M\d+)*$")
+RE_PAGE_ITEM = re.compile(r"^Pág: (.+?) \| ")
+
+CSS = """
+body{font-family:system-ui,-apple-system,Segoe UI,Roboto,sans-serif;margin:0;color:#222;background:#fafafa}
+header{background:#1f2937;color:#fff;padding:.6rem 1.2rem;display:flex;gap:1rem;align-items:center;flex-wrap:wrap}
+header a{color:#fff;text-decoration:none;font-weight:600}
+#q{flex:1;min-width:14rem;max-width:32rem;padding:.35rem .6rem;border-radius:4px;border:0}
+#results{position:absolute;top:2.8rem;right:1.2rem;left:1.2rem;max-width:48rem;margin:auto;background:#fff;
+ box-shadow:0 4px 16px rgba(0,0,0,.2);border-radius:4px;z-index:9;max-height:70vh;overflow:auto}
+#results a{display:block;padding:.4rem .8rem;color:#222;text-decoration:none;border-bottom:1px solid #eee}
+#results a:hover{background:#eef2ff}#results small{color:#666;display:block}
+main{max-width:72rem;margin:1.2rem auto;padding:0 1.2rem}
+table{border-collapse:collapse;margin:.6rem 0;background:#fff;font-size:.92rem}
+th,td{border:1px solid #ddd;padding:.3rem .55rem;text-align:left;vertical-align:top}
+th{background:#f0f0f0}pre{background:#1e1e1e;color:#ddd;padding:.8rem;overflow:auto;border-radius:4px}
+pre a{color:#9cdcfe}dl.props{display:grid;grid-template-columns:max-content 1fr;gap:.25rem 1rem}
+dl.props dt{font-weight:600;color:#555}.crumbs{color:#666;font-size:.9rem}
+""".strip()
+
+SEARCH_JS = """
+(function () {
+  var q = document.getElementById("q"), box = document.getElementById("results");
+  var root = document.body.getAttribute("data-root") || "";
+  function esc(s) { return s.replace(/[&<>"]/g, function (c) { return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"}[c]; }); }
+  q.addEventListener("input", function () {
+    var terms = q.value.toLowerCase().split(/\\s+/).filter(Boolean);
+    if (!terms.length) { box.hidden = true; return; }
+    var out = [];
+    for (var i = 0; i < SEARCH_INDEX.length && out.length < 50; i++) {
+      var e = SEARCH_INDEX[i], hay = e.h;
+      if (terms.every(function (t) { return hay.indexOf(t) >= 0; })) out.push(e);
+    }
+    box.innerHTML = out.length ? out.map(function (e) {
+      return '<a href="' + root + e.u + '">' + esc(e.t) + "<small>" + esc(e.s) + (e.x ? " — " + esc(e.x) : "") + "</small></a>";
+    }).join("") : "<a>Nada encontrado.</a>";
+    box.hidden = false;
+  });
+  document.addEventListener("keydown", function (ev) { if (ev.key === "Escape") { box.hidden = true; } });
+})();
+""".strip()
+
+
+def slugify(text, used):
+    """Nome de arquivo estável, só ASCII; colisões ganham um sufixo do hash."""
+    ascii_text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", ascii_text).strip("-").lower()[:60] or "item"
+    if slug in used:
+        slug = f"{slug}-{hashlib.sha1(text.encode('utf-8')).hexdigest()[:8]}"
+    used.add(slug)
+    return slug
+
+
+def plain_text(rich):
+    return "".join((r.get("text") or {}).get("content", "") for r in rich or [])
+
+
+def property_text(prop):
+    """Valor de uma propriedade do Notion (title, rich_text, number, select, date, url) como texto."""
+    if "title" in prop:
+        return plain_text(prop["title"])
+    if "rich_text" in prop:
+        return plain_text(prop["rich_text"])
+    if "number" in prop:
+        return "" if prop["number"] is None else str(prop["number"])
+    if "select" in prop:
+        return (prop["select"] or {}).get("name", "")
+    if "date" in prop:
+        return (prop["date"] or {}).get("start", "")
+    if "url" in prop:
+        return prop["url"] or ""
+    return ""
+
+
+def title_property(schema):
+    return next(name for name, spec in schema.items() if "title" in spec)
+
+
+# ==============================================================================
+# LINKS CRUZADOS
+# ==============================================================================
+
+class Linker:
+    """Resolve textos do corpo (IDs, nomes de medidas/páginas/tabelas) para URLs do site."""
+
+    def __init__(self, structure, sections, ext):
+        self.ext = ext
+        self.urls = {}   # (seção, chave da linha) -> "secao/slug.ext"
+        for key, _title, _schema, rows in sections:
+            used = set()
+            for row_key, _props, _children, _name in rows:
+                self.urls[(key, row_key)] = f"{key}/{slugify(row_key, used)}.{ext}"
+        self.measure_by_id = {m.global_id: m.name for m in structure.get("measures", []) if m.global_id}
+        self.measures = {k: u for (s, k), u in self.urls.items() if s == "measures"}
+        self.tables = {k: u for (s, k), u in self.urls.items() if s == "tables"}
+        self.pages = {k: u for (s, k), u in self.urls.items() if s == "pages"}
+
+    def url(self, section, row_key):
+        return self.urls.get((section, row_key))
+
+    def entity(self, text):
+        """Texto que é exatamente o nome de uma medida, tabela ou página."""
+        return self.measures.get(text) or self.tables.get(text) or self.pages.get(text)
+
+    def segments(self, text):
+        """Texto corrido -> [(trecho, url ou None)]."""
+        stripped = text.strip()
+        url = self.entity(stripped)
+        if url:
+            return [(text, url)]
+        if RE_MEASURE_IDS.match(stripped):
+            out = []
+            for i, mid in enumerate(re.split(r"\s*,\s*", stripped)):
+                if i:
+                    out.append((", ", None))
+                out.append((mid, self.measures.get(self.measure_by_id.get(mid))))
+            return out
+        page = RE_PAGE_ITEM.match(text)
+        if page and page.group(1) in self.pages:
+            return [(text[:page.start(1)], None), (page.group(1), self.pages[page.group(1)]),
+                    (text[page.end(1):], None)]
+        # Descrições citam [Medida] / Tabela[Coluna] como no DAX
+        return self.code_segments(text) if "[" in text else [(text, None)]
+
+    def code_segments(self, code):
+        """DAX -> trechos, com [Medida] e Tabela[...] linkados."""
+        out, pos = [], 0
+        for mt in RE_DAX_REF.finditer(code):
+            table = (mt.group(1) or "").replace("''", "'") or mt.group(2)
+            column = mt.group(3).replace("]]", "]")
+            if table and table in self.tables:
+                t_start = mt.start(1) - 1 if mt.group(1) else mt.start(2)
+                t_end = mt.end(1) + 1 if mt.group(1) else mt.end(2)
+                out += [(code[pos:t_start], None), (code[t_start:t_end], self.tables[table])]
+                pos = t_end
+            elif not table and column in self.measures:
+                out += [(code[pos:mt.start()], None), (mt.group(0), self.measures[column])]
+                pos = mt.end()
+        out.append((code[pos:], None))
+        return [s for s in out if s[0]]
+
+
+# ==============================================================================
+# RENDERIZADORES (HTML / MARKDOWN)
+# ==============================================================================
+
+class HtmlRenderer:
+    ext = "html"
+
+    def __init__(self, project_name):
+        self.project_name = project_name
+
+    def links(self, segments, root):
+        return "".join(
+            f'<a href="{html.escape(root + url)}">{html.escape(text)}</a>' if url else html.escape(text)
+            for text, url in segments
+        )
+
+    def blocks(self, blocks, linker, root):
+        out, in_list = [], False
+        for b in blocks:
+            b_type = b.get("type")
+            body = b.get(b_type) or {}
+            if b_type == "bulleted_list_item":
+                if not in_list:
+                    out.append("<ul>")
+                    in_list = True
+                out.append(f"<li>{self.links(linker.segments(plain_text(body.get('rich_text'))), root)}</li>")
+                continue
+            if in_list:
+                out.append("</ul>")
+                in_list = False
+            if b_type.startswith("heading_"):
+                lvl = int(b_type[-1]) + 1
+                out.append(f"<h{lvl}>{html.escape(plain_text(body.get('rich_text')))}</h{lvl}>")
+            elif b_type == "paragraph":
+                out.append(f"<p>{self.links(linker.segments(plain_text(body.get('rich_text'))), root)}</p>")
+            elif b_type == "code":
+                code = plain_text(body.get("rich_text"))
+                out.append(f"<pre><code>{self.links(linker.code_segments(code), root)}</code></pre>")
+            elif b_type == "divider":
+                out.append("<hr>")
+            elif b_type == "table":
+                out.append(self.table_block(body, linker, root))
+        if in_list:
+            out.append("</ul>")
+        return "\n".join(out)
+
+    def table_block(self, body, linker, root):
+        rows = [[plain_text(cell) for cell in r["table_row"]["cells"]] for r in body.get("children", [])]
+        if not rows:
+            return ""
+        head, rest = (rows[0], rows[1:]) if body.get("has_column_header") else (None, rows)
+        out = ["<table>"]
+        if head:
+            out.append("<tr>" + "".join(f"<th>{html.escape(c)}</th>" for c in head) + "</tr>")
+        for r in rest:
+            out.append("<tr>" + "".join(f"<td>{self.links(linker.segments(c), root)}</td>" for c in r) + "</tr>")
+        out.append("</table>")
+        return "\n".join(out)
+
+    def props(self, values, linker, root):
+        items = "".join(
+            f"<dt>{html.escape(name)}</dt><dd>{self.links(linker.segments(value), root) or '-'}</dd>"
+            for name, value in values
+        )
+        return f'<dl class="props">{items}</dl>'
+
+    def listing(self, columns, rows, root):
+        """rows: [(url, [valores])]; a 1ª coluna vira link para a página da linha."""
+        out = ["<table>", "<tr>" + "".join(f"<th>{html.escape(c)}</th>" for c in columns) + "</tr>"]
+        for url, values in rows:
+            cells = [f'<a href="{html.escape(root + url)}">{html.escape(values[0] or "-")}</a>']
+            cells += [html.escape(v) for v in values[1:]]
+            out.append("<tr>" + "".join(f"<td>{c}</td>" for c in cells) + "</tr>")
+        out.append("</table>")
+        return "\n".join(out)
+
+    def page(self, title, crumbs, content, root):
+        crumb = " › ".join(
+            f'<a href="{html.escape(root + url)}">{html.escape(text)}</a>' if url else html.escape(text)
+            for text, url in crumbs
+        )
+        return (
+            "<!DOCTYPE html>\n<html lang=\"pt-BR\"><head><meta charset=\"utf-8\">"
+            f"<title>{html.escape(title)} · {html.escape(self.project_name)}</title>"
+            f"<link rel=\"stylesheet\" href=\"{root}assets/style.css\"></head>\n"
+            f"<body data-root=\"{root}\"><header><a href=\"{root}index.html\">{html.escape(self.project_name)}</a>"
+            "<input id=\"q\" type=\"search\" placeholder=\"Buscar medidas, tabelas, páginas...\" autocomplete=\"off\">"
+            "<div id=\"results\" hidden></div></header>\n"
+            f"<main><div class=\"crumbs\">{crumb}</div><h1>{html.escape(title)}</h1>\n{content}\n</main>\n"
+            f"<script src=\"{root}assets/search_index.js\"></script><script src=\"{root}assets/search.js\"></script>"
+            "</body></html>\n"
+        )
+
+    def assets(self, out_dir, index):
+        assets = os.path.join(out_dir, "assets")
+        os.makedirs(assets, exist_ok=True)
+        with open(os.path.join(assets, "style.css"), "w", encoding="utf-8") as f:
+            f.write(CSS + "\n")
+        with open(os.path.join(assets, "search.js"), "w", encoding="utf-8") as f:
+            f.write(SEARCH_JS + "\n")
+        # Script (e não fetch do JSON): funciona abrindo o arquivo direto do disco (file://)
+        with open(os.path.join(assets, "search_index.js"), "w", encoding="utf-8") as f:
+            f.write("var SEARCH_INDEX = " + json.dumps(index, ensure_ascii=False, separators=(",", ":")) + ";\n")
+
+
+class MarkdownRenderer:
+    ext = "md"
+
+    def __init__(self, project_name):
+        self.project_name = project_name
+
+    @staticmethod
+    def _escape(text):
+        return text.replace("|", "\\|").replace("\n", " ")
+
+    def links(self, segments, root, cell=False):
+        out = []
+        for text, url in segments:
+            text = self._escape(text) if cell else text
+            if url:
+                text = text.replace("[", "\\[").replace("]", "\\]")
+            out.append(f"[{text}](<{root}{url}>)" if url else text)
+        text = "".join(out)
+        # Parágrafo "-" (ex: sem pais/filhos) não pode virar item de lista
+        return "\\" + text if text[:1] in ("-", "#", ">", "*", "+") else text
+
+    def blocks(self, blocks, linker, root):
+        out = []
+        for b in blocks:
+            b_type = b.get("type")
+            body = b.get(b_type) or {}
+            if b_type == "bulleted_list_item":
+                out.append(f"- {self.links(linker.segments(plain_text(body.get('rich_text'))), root)}")
+                continue
+            if out and out[-1].startswith("- "):
+                out.append("")
+            if b_type.startswith("heading_"):
+                out += ["#" * (int(b_type[-1]) + 1) + " " + plain_text(body.get("rich_text")), ""]
+            elif b_type == "paragraph":
+                out += [self.links(linker.segments(plain_text(body.get("rich_text"))), root), ""]
+            elif b_type == "code":
+                # Sem links dentro do bloco de código (Markdown não renderiza)
+                out += ["```", plain_text(body.get("rich_text")), "```", ""]
+            elif b_type == "divider":
+                out += ["---", ""]
+            elif b_type == "table":
+                out += [self.table_block(body, linker, root), ""]
+        return "\n".join(out)
+
+    def table_block(self, body, linker, root):
+        rows = [[plain_text(cell) for cell in r["table_row"]["cells"]] for r in body.get("children", [])]
+        if not rows:
+            return ""
+        head, rest = (rows[0], rows[1:]) if body.get("has_column_header") else ([""] * len(rows[0]), rows)
+        out = ["| " + " | ".join(self._escape(c) for c in head) + " |", "|" + "---|" * len(head)]
+        for r in rest:
+            out.append("| " + " | ".join(self.links(linker.segments(c), root, cell=True) for c in r) + " |")
+        return "\n".join(out)
+
+    def props(self, values, linker, root):
+        return "\n".join(f"- **{name}:** {self.links(linker.segments(value), root) or '-'}" for name, value in values) + "\n"
+
+    def listing(self, columns, rows, root):
+        out = ["| " + " | ".join(columns) + " |", "|" + "---|" * len(columns)]
+        for url, values in rows:
+            cells = [f"[{self._escape(values[0] or '-')}](<{root}{url}>)"] + [self._escape(v) for v in values[1:]]
+            out.append("| " + " | ".join(cells) + " |")
+        return "\n".join(out)
+
+    def page(self, title, crumbs, content, root):
+        crumb = " › ".join(f"[{text}](<{root}{url}>)" if url else text for text, url in crumbs)
+        return f"{crumb}\n\n# {title}\n\n{content}\n"
+
+    def assets(self, out_dir, index):
+        pass
+
+
+# ==============================================================================
+# SITE
+# ==============================================================================
+
+def write_site(config, structure, sections, out_dir=DEFAULT_SITE_DIR, fmt="html", updated=""):
+    """
+    sections: [(chave, título, schema, linhas)] na ordem da capa, com as linhas
+    no formato dos render_* do constructor: (chave, propriedades, corpo, nome).
+    Retorna o número de arquivos gravados.
+    """
+    if fmt not in SITE_FORMATS:
+        raise ValueError(f"site_format inválido: {fmt} (use {' ou '.join(SITE_FORMATS)})")
+    project = config.get("project_name", "")
+    r = HtmlRenderer(project) if fmt == "html" else MarkdownRenderer(project)
+    ext = r.ext
+    linker = Linker(structure, sections, ext)
+
+    # Pasta recriada do zero: linhas que sumiram do modelo não ficam órfãs
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir)
+    home = f"index.{ext}"
+    index, written = [], 0
+
+    def write(rel_path, text):
+        nonlocal written
+        path = os.path.join(out_dir, rel_path)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        written += 1
+
+    for key, title, schema, rows in sections:
+        os.makedirs(os.path.join(out_dir, key), exist_ok=True)
+        title_prop = title_property(schema)
+        columns = list(schema)
+        listing = []
+        for row_key, props, children, _name in rows:
+            url = linker.url(key, row_key)
+            values = [property_text(props.get(c, {})) for c in columns]
+            listing.append((url, values))
+            row_title = property_text(props.get(title_prop, {})) or row_key
+            content = r.props([(c, v) for c, v in zip(columns, values) if c != title_prop], linker, "../")
+            content += "\n" + r.blocks(children, linker, "../")
+            crumbs = [(project, home), (title, f"{key}/index.{ext}")]
+            write(url, r.page(row_title, crumbs, content, "../"))
+
+            text = " ".join(v for c, v in zip(columns, values) if c != title_prop)
+            body_text = " ".join(
+                plain_text((b.get(b.get("type")) or {}).get("rich_text"))
+                for b in children if b.get("type") in ("paragraph", "bulleted_list_item")
+            )
+            snippet = next((plain_text(b["paragraph"]["rich_text"]) for b in children
+                            if b.get("type") == "paragraph" and plain_text(b["paragraph"]["rich_text"]).strip()), "")
+            index.append({
+                "t": row_title,
+                "s": title,
+                "u": url,
+                "x": snippet[:SNIPPET_CHARS],
+                "h": f"{row_title} {text} {body_text}".lower(),
+            })
+        content = r.listing(columns, listing, "../") if listing else "Nenhum item."
+        write(f"{key}/index.{ext}", r.page(f"{title} ({len(rows)})", [(project, home)], content, "../"))
+
+    cover = [("Última atualização", updated)]
+    if config.get("project_link"):
+        cover.append(("Link do projeto", config["project_link"]))
+    content = r.props([c for c in cover if c[1]], linker, "")
+    content += "\n" + r.listing(
+        ["Seção", "Itens"], [(f"{key}/index.{ext}", [title, str(len(rows))]) for key, title, _, rows in sections], "")
+    write(home, r.page(project, [], content, ""))
+
+    with open(os.path.join(out_dir, "search_index.json"), "w", encoding="utf-8") as f:
+        json.dump([{k: e[k] for k in ("t", "s", "u", "x")} for e in index], f, ensure_ascii=False)
+    r.assets(out_dir, index)
+    return written
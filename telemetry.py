@@ -0,0 +1,369 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+# ==============================================================================
+# TELEMETRIA DA EXECUÇÃO (Notion e IA)
+# ==============================================================================
+# Contadores e histogramas de latência por (tipo, etapa, endpoint): retries, 429,
+# esperas e bytes. write_report() grava run_telemetry.json (ou .prom para o
+# node_exporter); progress_line mostra o andamento ao vivo no stderr.
+
+DEFAULT_REPORT = "run_telemetry.json"
+METRIC_PREFIX = "pbi_hub"
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)  # segundos
+PROGRESS_INTERVAL = 0.5   # segundos entre redesenhos da linha de progresso (terminal)
+PROGRESS_LOG_EVERY = 10.0  # idem quando a saída não é um terminal (uma linha por vez)
+
+# IDs do Notion (com ou sem hífens) e páginas fictícias do --plan
+RE_ID = re.compile(r"(?<![0-9a-f])[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}(?![0-9a-f])"
+                   r"|plan-\d+", re.I)
+
+
+def endpoint_of(method, path):
+    """ "PATCH", ".../v1/blocks/<id>/children" -> "PATCH blocks/{id}/children" (agrupável)."""
+    if path.startswith("http"):
+        path = path.split("/v1/", 1)[-1]
+    return f"{method} {RE_ID.sub('{id}', path.strip('/'))}"
+
+
+class Histogram:
+    """Histograma cumulativo de latências (mesmos limites do Prometheus: le = "menor ou igual")."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def cumulative(self):
+        total, out = 0, []
+        for c in self.counts:
+            total += c
+            out.append(total)
+        return out
+
+    def quantile(self, q):
+        """Estimativa pelo limite superior do bucket (acima do último: o máximo observado)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        for bound, acc in zip(self.buckets, self.cumulative()):
+            if acc >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "max": round(self.max, 3),
+            "p50": round(self.quantile(0.5), 3),
+            "p95": round(self.quantile(0.95), 3),
+            "buckets": {str(b): acc for b, acc in zip(self.buckets, self.cumulative())},
+        }
+
+
+class Series:
+    """Contadores + histograma de uma combinação (tipo, etapa, endpoint)."""
+
+    COUNTERS = ("calls", "errors", "retries", "throttled", "throttle_wait", "rate_wait", "bytes_out", "bytes_in")
+
+    def __init__(self):
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self.statuses = {}
+        self.latency = Histogram()
+
+    def merge(self, other):
+        for name in self.COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for status, n in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + n
+        self.latency.merge(other.latency)
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in self.COUNTERS}
+        data["throttle_wait"] = round(self.throttle_wait, 3)
+        data["rate_wait"] = round(self.rate_wait, 3)
+        data["statuses"] = dict(sorted(self.statuses.items()))
+        data["latency"] = self.latency.to_dict()
+        return data
+
+
+class ProgressLine:
+    """
+    Linha de progresso ao vivo: concluídos/total, vazão, 429 e ETA.
+    kind="notion" avança sozinho a cada chamada registrada desse tipo;
+    kind=None avança só por advance().
+    """
+
+    def __init__(self, label, total, unit="req", kind=None, stream=None):
+        self.label = label
+        self.total = max(0, int(total or 0))
+        self.unit = unit
+        self.kind = kind
+        self.stream = stream or sys.stderr
+        self.live = hasattr(self.stream, "isatty") and self.stream.isatty()
+        self.done = 0
+        self.throttled = 0
+        self.started = time.perf_counter()
+        self._drawn = 0.0
+
+    def advance(self, n=1, throttled=0):
+        self.done += n
+        self.throttled += throttled
+        now = time.perf_counter()
+        if now - self._drawn >= (PROGRESS_INTERVAL if self.live else PROGRESS_LOG_EVERY):
+            self._drawn = now
+            self._draw(now)
+
+    def _draw(self, now, final=False):
+        elapsed = max(now - self.started, 1e-9)
+        rate = self.done / elapsed
+        line = f"  ⏳ {self.label}: {self.done}"
+        if self.total:
+            line += f"/{self.total} {self.unit} ({min(100.0, 100.0 * self.done / self.total):.0f}%)"
+        else:
+            line += f" {self.unit}"
+        line += f" | {rate:.1f} {self.unit}/s"
+        if self.throttled:
+            line += f" | {self.throttled} x 429"
+        if final:
+            line += f" | {elapsed:.0f}s"
+        elif self.total and rate > 0:
+            line += f" | ETA {format_seconds(max(0, self.total - self.done) / rate)}"
+        if self.live:
+            self.stream.write("\r" + line.ljust(78) + ("\n" if final else ""))
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+    def close(self):
+        self._draw(time.perf_counter(), final=True)
+
+
+def format_seconds(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+class Telemetry:
+    """Agregador thread-safe das chamadas da execução (ver record())."""
+
+    def __init__(self, report_path=DEFAULT_REPORT, progress=False):
+        self.report_path = report_path
+        self.progress_enabled = progress
+        self.series = {}  # (tipo, etapa, endpoint) -> Series
+        self.started = time.time()
+        self._progress = None
+        self._lock = threading.Lock()
+
+    def configure(self, config):
+        """telemetry_report: caminho do relatório (.json ou .prom; false desliga); progress_line: bool."""
+        report = config.get("telemetry_report", DEFAULT_REPORT)
+        if report is True:
+            report = DEFAULT_REPORT
+        self.report_path = report or None
+        self.progress_enabled = bool(config.get("progress_line", False))
+
+    def reset(self):
+        """Zera os agregados (ex: vários scripts no mesmo processo, como no notion_benchmark.py)."""
+        self.end_progress()
+        with self._lock:
+            self.series = {}
+            self.started = time.time()
+
+    # ==========================================================================
+    # REGISTRO
+    # ==========================================================================
+
+    def record(self, kind, endpoint, phase, status, seconds, retries=0, throttled=0,
+               throttle_wait=0.0, rate_wait=0.0, bytes_out=0, bytes_in=0, error=False):
+        """Uma chamada lógica concluída (status final: código HTTP, "ok" ou "erro")."""
+        key = (kind, phase or "Geral", endpoint)
+        status = str(status)
+        with self._lock:
+            s = self.series.get(key)
+            if s is None:
+                s = self.series[key] = Series()
+            s.calls += 1
+            s.errors += 1 if error else 0
+            s.retries += retries
+            s.throttled += throttled
+            s.throttle_wait += throttle_wait
+            s.rate_wait += rate_wait
+            s.bytes_out += bytes_out
+            s.bytes_in += bytes_in
+            s.statuses[status] = s.statuses.get(status, 0) + 1
+            s.latency.observe(seconds)
+            progress = self._progress
+            if progress is not None and progress.kind == kind:
+                progress.advance(1, throttled)
+
+    # ==========================================================================
+    # PROGRESSO AO VIVO
+    # ==========================================================================
+
+    def start_progress(self, label, total, unit="req", kind=None):
+        """Abre a linha de progresso (se progress_line estiver ligado); devolve-a ou None."""
+        self.end_progress()
+        if not self.progress_enabled:
+            return None
+        with self._lock:
+            self._progress = ProgressLine(label, total, unit, kind)
+        return self._progress
+
+    def advance(self, n=1):
+        """Avança a linha de progresso manual (kind=None)."""
+        with self._lock:
+            if self._progress is not None and self._progress.kind is None:
+                self._progress.advance(n)
+
+    def end_progress(self):
+        with self._lock:
+            progress, self._progress = self._progress, None
+            if progress is not None:
+                progress.close()
+
+    # ==========================================================================
+    # AGREGAÇÃO E RELATÓRIO
+    # ==========================================================================
+
+    def by_phase(self):
+        """(tipo, etapa) -> Series somando todos os endpoints, na ordem em que apareceram."""
+        with self._lock:
+            items = list(self.series.items())
+        phases = {}
+        for (kind, phase, _), s in items:
+            phases.setdefault((kind, phase), Series()).merge(s)
+        return phases
+
+    def to_dict(self):
+        with self._lock:
+            items = list(self.series.items())
+        finished = time.time()
+        return {
+            "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "finished": datetime.fromtimestamp(finished).isoformat(timespec="seconds"),
+            "elapsed_seconds": round(finished - self.started, 3),
+            "latency_buckets": list(LATENCY_BUCKETS),
+            "phases": [
+                {"kind": kind, "phase": phase, **s.to_dict()}
+                for (kind, phase), s in self.by_phase().items()
+            ],
+            "endpoints": [
+                {"kind": kind, "phase": phase, "endpoint": endpoint, **s.to_dict()}
+                for (kind, phase, endpoint), s in items
+            ],
+        }
+
+    def to_prometheus(self):
+        """Textfile no formato de exposição do Prometheus (um valor por série/rótulos)."""
+        with self._lock:
+            items = list(self.series.items())
+        p = METRIC_PREFIX
+        lines = []
+
+        def metric(name, mtype, help_text):
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} {mtype}")
+
+        def labels(kind, phase, endpoint, **extra):
+            pairs = {"kind": kind, "phase": phase, "endpoint": endpoint, **extra}
+            return "{" + ",".join(f'{k}="{escape_label(v)}"' for k, v in pairs.items()) + "}"
+
+        metric("requests_total", "counter", "Chamadas lógicas por status final.")
+        for (kind, phase, endpoint), s in items:
+            for status, n in sorted(s.statuses.items()):
+                lines.append(f"{p}_requests_total{labels(kind, phase, endpoint, status=status)} {n}")
+        for name, attr, help_text in (
+            ("request_errors_total", "errors", "Chamadas que terminaram sem sucesso."),
+            ("request_retries_total", "retries", "Tentativas extras (retry)."),
+            ("throttled_total", "throttled", "Respostas 429 recebidas."),
+            ("throttle_wait_seconds_total", "throttle_wait", "Espera atribuída a 429 (Retry-After / backoff)."),
+            ("rate_limiter_wait_seconds_total", "rate_wait", "Espera no limitador de taxa local."),
+        ):
+            metric(name, "counter", help_text)
+            for (kind, phase, endpoint), s in items:
+                lines.append(f"{p}_{name}{labels(kind, phase, endpoint)} {round(getattr(s, attr), 3)}")
+        metric("payload_bytes_total", "counter", "Bytes enviados (out) e recebidos (in).")
+        for (kind, phase, endpoint), s in items:
+            lines.append(f"{p}_payload_bytes_total{labels(kind, phase, endpoint, direction='out')} {s.bytes_out}")
+            lines.append(f"{p}_payload_bytes_total{labels(kind, phase, endpoint, direction='in')} {s.bytes_in}")
+        metric("request_duration_seconds", "histogram", "Latência por chamada lógica (todas as tentativas).")
+        for (kind, phase, endpoint), s in items:
+            h = s.latency
+            for bound, acc in zip(h.buckets, h.cumulative()):
+                lines.append(f"{p}_request_duration_seconds_bucket{labels(kind, phase, endpoint, le=bound)} {acc}")
+            lines.append(f"{p}_request_duration_seconds_bucket{labels(kind, phase, endpoint, le='+Inf')} {h.count}")
+            lines.append(f"{p}_request_duration_seconds_sum{labels(kind, phase, endpoint)} {round(h.sum, 6)}")
+            lines.append(f"{p}_request_duration_seconds_count{labels(kind, phase, endpoint)} {h.count}")
+        metric("run_duration_seconds", "gauge", "Duração da execução até o relatório.")
+        lines.append(f"{p}_run_duration_seconds {round(time.time() - self.started, 3)}")
+        metric("run_finished_timestamp_seconds", "gauge", "Quando o relatório foi gravado (epoch).")
+        lines.append(f"{p}_run_finished_timestamp_seconds {int(time.time())}")
+        return "\n".join(lines) + "\n"
+
+    def print_summary(self):
+        """Tabela por etapa: chamadas, latência p50/p95, 429, espera e bytes."""
+        phases = self.by_phase()
+        if not phases:
+            return
+        print("--- Telemetria por etapa (chamadas | p50 / p95 | 429 | espera 429 | enviado) ---")
+        for (kind, phase), s in phases.items():
+            h = s.latency
+            print(f"  {kind:<6} {phase[:34]:<34} {s.calls:>6} | {h.quantile(0.5):>5.2f}s / {h.quantile(0.95):>5.2f}s "
+                  f"| {s.throttled:>4} | {s.throttle_wait:>6.1f}s | {s.bytes_out / 1024:>8.0f} KB")
+
+    def write_report(self, path=None):
+        """Grava o relatório (JSON ou .prom) de forma atômica; devolve o caminho ou None."""
+        self.end_progress()
+        path = path or self.report_path
+        if not path:
+            return None
+        self.print_summary()
+        try:
+            if path.endswith(".prom"):
+                content = self.to_prometheus()
+            else:
+                content = json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[AVISO] Não foi possível gravar a telemetria em {path}: {e}")
+            return None
+        print(f"--- Telemetria gravada em {path} ---")
+        return path
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Instância da execução (NotionClient e motor de IA registram aqui)
+TELEMETRY = Telemetry()
@@ -0,0 +1,51 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "tests", "fixtures")
+sys.path.insert(0, ROOT)
+
+from notion_mock_server import start_server  # noqa: E402
+
+
+def run_script(script, cwd, env=None, args=(), seed="0"):
+    """Roda um script da raiz (minerador / constructor) na pasta do projeto, como o usuário faria."""
+    env = dict(os.environ, **(env or {}), PYTHONHASHSEED=seed)
+    return subprocess.run([sys.executable, os.path.join(ROOT, script), *args], cwd=cwd, env=env,
+                          capture_output=True, text=True, timeout=300)
+
+
+@pytest.fixture
+def project(tmp_path):
+    """Cópia do projeto PBIP de exemplo (tests/fixtures/demo) numa pasta temporária."""
+    path = tmp_path / "demo"
+    shutil.copytree(os.path.join(FIXTURES, "demo"), path)
+    return path
+
+
+@pytest.fixture
+def notion():
+    """Mock da API do Notion numa porta livre: (state, env com NOTION_API_BASE_URL / token / HUB)."""
+    server, state, _ = start_server()
+    env = {
+        "NOTION_API_BASE_URL": f"http://127.0.0.1:{server.server_port}/v1",
+        "NOTION_TOKEN": "test",
+        "NOTION_DATABASE_ID_PBI_HUB_INVENTORY": state.hub_id,
+    }
+    yield state, env
+    server.shutdown()
+
+
+def live_rows(state):
+    """Título do DB -> quantidade de páginas não arquivadas no mock."""
+    counts = {}
+    for page in state.pages.values():
+        db_id = page["parent"].get("database_id")
+        if db_id and not page["archived"]:
+            title = "".join(t["plain_text"] for t in state.databases[db_id]["title"])
+            counts[title] = counts.get(title, 0) + 1
+    return counts
@@ -0,0 +1,61 @@
+import pytest
+
+from dax_describer import MAX_PHRASE, DaxDescriber, measure_expression, tokenize
+
+DESCRIBER = DaxDescriber(["Total Sales", "Cost"])
+
+
+@pytest.mark.parametrize("dax, phrase", [
+    ("SUM(Sales[Amount])", "a soma de Sales[Amount]"),
+    ("DISTINCTCOUNT(Sales[CustomerKey])", "a quantidade de valores distintos de Sales[CustomerKey]"),
+    ("[Total Sales]", "o valor da medida [Total Sales]"),
+    ("DIVIDE([Total Sales] - [Cost], [Total Sales])",
+     "a razão entre ([Total Sales] menos [Cost]) e [Total Sales]"),
+    ("SUMX(Sales, Sales[Qty] * Sales[Price])",
+     "a soma, linha a linha de Sales, de Sales[Qty] multiplicado por Sales[Price]"),
+    ("VAR x = [Total Sales] RETURN x * 2", "[Total Sales] multiplicado por 2"),
+    ("IF([Total Sales] > 100, 1, 0)", "1 quando [Total Sales] é maior que 100; caso contrário, 0"),
+    ("COUNTROWS(FILTER(Sales, Sales[Amount] > 0))", "o número de linhas de Sales onde Sales[Amount] é maior que 0"),
+])
+def test_describes_expressions(dax, phrase):
+    assert DESCRIBER.describe(dax) == f"Retorna {phrase}."
+
+
+@pytest.mark.parametrize("dax, phrase", [
+    ("CALCULATE([Total Sales], SAMEPERIODLASTYEAR('Dim Date'[Date]))", "[Total Sales] no mesmo período do ano anterior"),
+    ("TOTALYTD([Total Sales], 'Dim Date'[Date])", "[Total Sales] no acumulado do ano"),
+    ("CALCULATE([Total Sales], DATEADD('Dim Date'[Date], -1, MONTH))", "[Total Sales] no período 1 mês antes"),
+    ("CALCULATE([Total Sales], ALL('Dim Date'))", "[Total Sales], ignorando os filtros de Dim Date"),
+    ('CALCULATE([Total Sales], Sales[Region] = "South")',
+     '[Total Sales], considerando que Sales[Region] é igual a "South"'),
+])
+def test_describes_filters_and_time_intelligence(dax, phrase):
+    assert DESCRIBER.describe(dax) == f"Retorna {phrase}."
+
+
+@pytest.mark.parametrize("dax", [
+    "FOO(Sales[Amount])",                       # função desconhecida
+    "SUM(Sales[Amount]",                        # parêntese sem fechar
+    "SWITCH(TRUE(), [Total Sales] > 1, 1, 0)",  # fora das regras: fica para a IA
+    "",
+])
+def test_unknown_dax_is_left_for_ai(dax):
+    assert DESCRIBER.describe(dax) == ""
+
+
+def test_accepts_tmdl_block_and_comments():
+    block = "measure 'Total Sales' = // total\n\t\tSUM(Sales[Amount]) /* bruto */\n\t\tformatString: 0\n\t\tlineageTag: x"
+    assert measure_expression(block) == "// total\n\t\tSUM(Sales[Amount]) /* bruto */"
+    assert DESCRIBER.describe(block) == "Retorna a soma de Sales[Amount]."
+
+
+def test_tokenize_keeps_quoted_names():
+    assert [text for _, text in tokenize("'Dim ''Date'''[Mês]]x] & \"a\"\"b\"")] == [
+        "'Dim ''Date'''", "[Mês]]x]", "&", '"a""b"',
+    ]
+
+
+def test_long_phrases_are_dropped():
+    dax = " + ".join(f"SUM(Sales[Coluna {i}])" for i in range(20))
+    assert len(DaxDescriber().describe(dax.split(" + ")[0])) < MAX_PHRASE
+    assert DESCRIBER.describe(dax) == ""
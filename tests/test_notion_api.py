@@ -0,0 +1,120 @@
+import time
+
+import pytest
+import requests
+from urllib3.exceptions import NewConnectionError
+
+import notion_api
+from conftest import live_rows, run_script
+from notion_api import NotionClient, reached_server
+from notion_mock_server import ApiError, start_server
+
+PROPS = {"Project Name": {"title": [{"text": {"content": "Demo"}}]}}
+
+
+@pytest.fixture
+def client(notion, monkeypatch):
+    monkeypatch.setattr(notion_api, "backoff_delay", lambda attempt: 0)
+    state, env = notion
+    c = NotionClient(env["NOTION_TOKEN"], base_url=env["NOTION_API_BASE_URL"], rate_limit=0, max_attempts=3)
+    yield c
+    c.close()
+
+
+def _fail_create(state, status, after_write=True, delay=0.0):
+    """A primeira criação devolve `status` (antes ou depois de gravar a página); as seguintes passam."""
+    create_page = state.create_page
+    calls = [0]
+
+    def wrapper(payload):
+        calls[0] += 1
+        if calls[0] > 1:
+            return create_page(payload)
+        if not after_write:
+            raise ApiError(status, "service_unavailable", "Notion is unavailable.")
+        page = create_page(payload)
+        time.sleep(delay)
+        if status:
+            raise ApiError(status, "gateway_timeout", "Notion took too long to respond.")
+        return page
+    state.create_page = wrapper
+
+
+def _recover(client, db_id):
+    def recover():
+        pages, complete = client.query_all(db_id, filter={"property": "Project Name", "title": {"equals": "Demo"}})
+        assert complete
+        return pages[0] if pages else None
+    return recover
+
+
+def _pages(state):
+    return [p for p in state.pages.values() if p["parent"].get("database_id") == state.hub_id]
+
+
+def test_reached_server():
+    refused = requests.ConnectionError(type("E", (), {"reason": NewConnectionError(None, "refused")})())
+    assert not reached_server(refused)
+    assert not reached_server(requests.ConnectTimeout())
+    assert reached_server(requests.ReadTimeout())
+    assert reached_server(requests.ConnectionError("Connection aborted."))
+
+
+def test_create_lost_after_write_is_found_not_repeated(client, notion):
+    state, _ = notion
+    _fail_create(state, 504)
+    r = client.create_page({"database_id": state.hub_id}, PROPS, recover=_recover(client, state.hub_id))
+    assert r.status_code == 200
+    assert [p["id"] for p in _pages(state)] == [r.json()["id"]]
+    assert client.failures == []
+
+
+def test_create_lost_without_recover_is_not_repeated(client, notion):
+    state, _ = notion
+    _fail_create(state, 504)
+    r = client.create_page({"database_id": state.hub_id}, PROPS)
+    assert r.status_code == 504
+    assert len(_pages(state)) == 1
+    assert client.stats["requests"] == 1
+    assert len(client.failures) == 1
+
+
+def test_create_read_timeout_is_found_not_repeated(notion, monkeypatch):
+    monkeypatch.setattr(notion_api, "backoff_delay", lambda attempt: 0)
+    state, env = notion
+    client = NotionClient(env["NOTION_TOKEN"], base_url=env["NOTION_API_BASE_URL"], rate_limit=0,
+                          timeout=(5, 0.3))
+    _fail_create(state, None, delay=1.0)  # grava e demora a responder
+    r = client.create_page({"database_id": state.hub_id}, PROPS, recover=_recover(client, state.hub_id))
+    client.close()
+    assert r.status_code == 200
+    assert len(_pages(state)) == 1
+
+
+def test_create_rejected_before_write_is_retried(client, notion):
+    state, _ = notion
+    _fail_create(state, 503, after_write=False)
+    r = client.create_page({"database_id": state.hub_id}, PROPS, recover=_recover(client, state.hub_id))
+    assert r.status_code == 200
+    assert len(_pages(state)) == 1
+    assert client.stats["retries"] == 1
+
+
+def test_constructor_with_lost_responses_creates_each_object_once(project, notion):
+    state, env = notion
+    assert run_script("minerador_pbi.py", project).returncode == 0
+    clean = run_script("constructor_notion.py", project, env)
+    assert clean.returncode == 0, clean.stdout + clean.stderr
+
+    server, faulty, faults = start_server(p5xx_late=0.25, seed=3)
+    try:
+        for name in ("notion_sync_state.json", "notion_mirror.json", "notion_publish_journal.jsonl"):
+            (project / name).unlink()
+        env = dict(env, NOTION_API_BASE_URL=f"http://127.0.0.1:{server.server_port}/v1",
+                   NOTION_DATABASE_ID_PBI_HUB_INVENTORY=faulty.hub_id)
+        result = run_script("constructor_notion.py", project, env)
+    finally:
+        server.shutdown()
+    assert faults.counts["5xx"] > 0
+    assert live_rows(faulty) == live_rows(state), result.stdout
+    assert len(faulty.databases) == len(state.databases)
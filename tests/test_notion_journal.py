@@ -0,0 +1,160 @@
+import os
+import signal
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from conftest import ROOT, live_rows, run_script
+from notion_journal import PublishJournal, row_hash
+from notion_publisher import RowPublisher
+
+
+class Crash(Exception):
+    """Queda do processo logo depois de o Notion aplicar o POST (a resposta nunca chega)."""
+
+
+class FakeNotion:
+    """Inline DB em memória: create_row / find_row / discard_row no formato do RowPublisher."""
+
+    def __init__(self, crash_on=()):
+        self.pages = {}  # page_id -> props (None = arquivada)
+        self.crash_on = set(crash_on)
+        self.lock = threading.Lock()
+
+    def create_row(self, db_id, props, name, children, exclude=()):
+        with self.lock:
+            page_id = f"page-{len(self.pages) + 1}"
+            self.pages[page_id] = props
+        if name in self.crash_on:
+            self.crash_on.discard(name)
+            raise Crash(name)
+        return page_id
+
+    def find_row(self, db_id, props, exclude=()):
+        with self.lock:
+            return [{"id": page_id} for page_id, p in self.pages.items() if p == props and page_id not in exclude]
+
+    def discard_row(self, page_id, name):
+        with self.lock:
+            self.pages[page_id] = None
+        return True
+
+    def append_children(self, page_id, blocks, name):
+        return [f"{page_id}-b{i}" for i in range(len(blocks))]
+
+    def live(self):
+        return sorted(p["Nome"] for p in self.pages.values() if p is not None)
+
+
+def _rows(n=6, suffix=""):
+    return [(f"k{i}", {"Nome": f"Linha {i}{suffix}"}, [], f"Linha {i}") for i in range(n)]
+
+
+def _publisher(fake, journal, concurrency=1):
+    return RowPublisher(fake.create_row, fake.append_children, concurrency=concurrency, journal=journal,
+                        discard_row=fake.discard_row, verbose=False, find_row=fake.find_row)
+
+
+def test_resume_rereads_journal_and_skips_half_written_line(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = PublishJournal.start("Demo", path)
+    journal.record_cover("cover")
+    journal.record_database("measures", "db-1")
+    journal.record_intent("measures", "a", "h1", {"Nome": "A"})
+    journal.record_row("measures", "a", "page-a", "h1", 2)
+    journal.record_batch("measures", "a", 0, ["b1", "b2"])
+    journal.record_intent("measures", "b", "h2", {"Nome": "B"})
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op": "row", "db": "meas')
+
+    resumed = PublishJournal.resume("Demo", path)
+    assert resumed.cover_id == "cover"
+    assert resumed.database("measures") == "db-1"
+    assert resumed.row("measures", "a") == {"page_id": "page-a", "hash": "h1", "inline": 2, "batches": {0: ["b1", "b2"]}}
+    assert resumed.intent("measures", "a") is None
+    assert resumed.intent("measures", "b") == {"hash": "h2", "props": {"Nome": "B"}}
+    assert resumed.page_ids("measures") == {"page-a"}
+    assert PublishJournal.resume("Outro", path) is None
+    resumed.close()
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_resume_adopts_row_created_before_crash(tmp_path, concurrency):
+    path = str(tmp_path / "journal.jsonl")
+    fake = FakeNotion(crash_on=["Linha 3"])
+    journal = PublishJournal.start("Demo", path)
+    with pytest.raises(Crash):
+        _publisher(fake, journal, concurrency).publish("db-1", _rows(), db_key="measures")
+    journal.close()
+    assert "Linha 3" in fake.live()
+
+    journal = PublishJournal.resume("Demo", path)
+    results = _publisher(fake, journal, concurrency).publish("db-1", _rows(), db_key="measures")
+    journal.close()
+
+    assert fake.live() == [f"Linha {i}" for i in range(6)]
+    assert sorted(page_id for page_id, _, _ in results) == sorted(
+        page_id for page_id, p in fake.pages.items() if p is not None)
+
+
+def test_resume_replaces_orphan_whose_content_changed(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    fake = FakeNotion(crash_on=["Linha 1"])
+    journal = PublishJournal.start("Demo", path)
+    with pytest.raises(Crash):
+        _publisher(fake, journal).publish("db-1", _rows(3), db_key="measures")
+    journal.close()
+
+    rows = _rows(3, suffix=" v2")
+    journal = PublishJournal.resume("Demo", path)
+    _publisher(fake, journal).publish("db-1", rows, db_key="measures")
+    journal.close()
+
+    # Linha 0 (registrada) e linha 1 (órfã) mudaram: as antigas são arquivadas, nada fica em dobro
+    assert fake.live() == ["Linha 0 v2", "Linha 1 v2", "Linha 2 v2"]
+    assert PublishJournal.resume("Demo", path).row("measures", "k1")["hash"] == row_hash(rows[1][1], [])
+
+
+def _kill_after_row(state, proc, k):
+    """O mock mata o constructor logo depois de criar a k-ésima linha, antes de responder."""
+    create_page = state.create_page
+    created = [0]
+
+    def wrapper(payload):
+        page = create_page(payload)
+        if payload["parent"].get("database_id") != state.hub_id:
+            created[0] += 1
+            if created[0] == k:
+                os.kill(proc[0].pid, signal.SIGKILL)
+        return page
+    state.create_page = wrapper
+    return create_page
+
+
+@pytest.mark.parametrize("k", [1, 9, 20])
+def test_constructor_killed_mid_create_resumes_without_duplicates(project, notion, k):
+    state, env = notion
+    assert run_script("minerador_pbi.py", project).returncode == 0
+    clean = run_script("constructor_notion.py", project, env)
+    assert clean.returncode == 0, clean.stdout + clean.stderr
+    expected = live_rows(state)
+    for page in state.pages.values():
+        page["archived"] = True
+    for name in ("notion_sync_state.json", "notion_mirror.json", "notion_publish_journal.jsonl"):
+        if (project / name).exists():
+            (project / name).unlink()
+
+    proc = [None]
+    create_page = _kill_after_row(state, proc, k)
+    proc[0] = subprocess.Popen([sys.executable, os.path.join(ROOT, "constructor_notion.py")], cwd=project,
+                               env=dict(os.environ, **env, PYTHONHASHSEED="0"),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    assert proc[0].wait(timeout=300) == -signal.SIGKILL
+    state.create_page = create_page
+
+    resumed = run_script("constructor_notion.py", project, env, args=["--resume"])
+    assert resumed.returncode == 0, resumed.stdout + resumed.stderr
+    assert live_rows(state) == expected
@@ -0,0 +1,60 @@
+import json
+import re
+
+from conftest import run_script
+from notion_mirror import NotionMirror, properties_differ
+
+
+def test_observe_keeps_only_pages(tmp_path):
+    mirror = NotionMirror(str(tmp_path / "mirror.json"))
+    mirror.observe({"object": "list", "results": [
+        {"object": "page", "id": "p1", "parent": {"type": "database_id", "database_id": "db"},
+         "last_edited_time": "2026-01-01T10:00:00.000Z"},
+        {"object": "page", "id": "p2", "parent": {"type": "database_id", "database_id": "db"}, "archived": True},
+        {"object": "block", "id": "b1", "parent": {"type": "page_id", "page_id": "p1"}},
+        {"object": "database", "id": "db", "parent": {"type": "page_id", "page_id": "cover"}},
+    ]})
+    assert mirror.pages_of("db") == {"p1": "2026-01-01T10:00:00.000Z"}
+
+    mirror.save()
+    assert NotionMirror.load(mirror.path).objects == {
+        "p1": {"parent": "db", "last_edited_time": "2026-01-01T10:00:00.000Z"},
+    }
+
+
+def test_old_files_keep_page_watermarks(tmp_path):
+    path = tmp_path / "mirror.json"
+    path.write_text(json.dumps({"version": 1, "objects": {
+        "p1": {"object": "page", "parent": "db", "last_edited_time": "t1"},
+        "b1": {"object": "block", "parent": "p1", "last_edited_time": "t1"},
+    }}), encoding="utf-8")
+    assert NotionMirror.load(str(path)).pages_of("db") == {"p1": "t1"}
+
+
+def test_properties_differ_ignores_extra_columns():
+    local = {"Nome": {"title": [{"text": {"content": "A"}}]}, "Qtd": {"number": 1}}
+    remote = {"Nome": {"title": [{"plain_text": "A"}]}, "Qtd": {"number": 1}, "Dono": {"rich_text": []}}
+    assert not properties_differ(remote, local)
+    remote["Qtd"] = {"number": 2}
+    assert properties_differ(remote, local)
+
+
+def test_resync_restores_properties_edited_in_notion(project, notion):
+    state, env = notion
+    assert run_script("minerador_pbi.py", project).returncode == 0
+    assert run_script("constructor_notion.py", project, env).returncode == 0
+
+    db_id = next(k for k, db in state.databases.items() if db["title"][0]["plain_text"] == "2. Tabelas")
+    page = next(p for p in state.pages.values() if p["parent"].get("database_id") == db_id)
+    title = next(v["title"][0] for v in page["properties"].values() if "title" in v)
+    original = title["plain_text"]
+    title["plain_text"] = title["text"]["content"] = original + " (editado)"
+    page["last_edited_time"] = "2999-01-01T00:00:00.000Z"
+
+    result = run_script("constructor_notion.py", project, env)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "2. Tabelas: 1 linhas editadas no Notion" in result.stdout
+    restored = state.pages[page["id"]]["properties"]
+    assert [v["title"][0]["plain_text"] for v in restored.values() if "title" in v] == [original]
+    # Nenhum outro DB é tocado: só a linha editada volta a ser publicada
+    assert sorted(re.findall(r"sync \d+ novas, (\d+) alteradas", result.stdout)) == ["0"] * 7 + ["1"]
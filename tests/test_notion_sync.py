@@ -0,0 +1,83 @@
+import re
+
+from conftest import live_rows, run_script
+from notion_sync import SyncState, content_hash, diff_rows
+
+
+def _rows():
+    return [
+        ("Sales.Total Sales", {"Nome": {"title": [{"text": {"content": "Total Sales"}}]}}, [{"p": "SUM"}], "Total Sales"),
+        ("Sales.Margin", {"Nome": {"title": [{"text": {"content": "Margin"}}]}}, [], "Margin"),
+    ]
+
+
+def _publish(state, rows):
+    known = state.rows("measures")
+    for key, props, body, _ in rows:
+        known[key] = {"page_id": f"page-{key}", "props_hash": content_hash(props), "body_hash": content_hash(body),
+                      "block_ids": [], "inline_blocks": len(body)}
+
+
+def test_content_hash_ignores_key_order():
+    assert content_hash({"a": 1, "b": [1, 2]}) == content_hash({"b": [1, 2], "a": 1})
+
+
+def test_diff_rows_after_publish_is_noop(tmp_path):
+    path = str(tmp_path / "state.json")
+    state = SyncState("Demo", path)
+    _publish(state, _rows())
+    state.save()
+
+    new, changed, unchanged, removed = diff_rows(SyncState.load("Demo", path).rows("measures"), _rows())
+    assert (new, changed, unchanged, removed) == ([], [], 2, [])
+
+
+def test_diff_rows_classifies_changes():
+    state = SyncState("Demo", "unused.json")
+    _publish(state, _rows())
+    rows = _rows()
+    rows[0] = (rows[0][0], rows[0][1], [{"p": "SUM v2"}], rows[0][3])
+    rows[1] = ("Sales.Cost", rows[1][1], [], "Cost")
+
+    new, changed, unchanged, removed = diff_rows(state.rows("measures"), rows)
+    assert [row[0] for row, _, _ in new] == ["Sales.Cost"]
+    assert [row[0] for row, _, _ in changed] == ["Sales.Total Sales"]
+    assert unchanged == 0
+    assert [key for key, _ in removed] == ["Sales.Margin"]
+
+
+def test_state_of_other_project_starts_empty(tmp_path):
+    path = str(tmp_path / "state.json")
+    state = SyncState("Demo", path)
+    state.main_id = "cover"
+    state.save()
+    assert SyncState.load("Outro", path).main_id is None
+
+
+def test_remine_does_not_depend_on_hash_seed(project):
+    outputs = []
+    for seed in ("1", "2", "3"):
+        result = run_script("minerador_pbi.py", project, seed=seed)
+        assert result.returncode == 0, result.stdout + result.stderr
+        outputs.append((project / "model_structure.json").read_text(encoding="utf-8"))
+    assert outputs[0] == outputs[1] == outputs[2]
+
+
+def test_resync_after_remine_changes_nothing(project, notion):
+    state, env = notion
+    assert run_script("minerador_pbi.py", project, seed="1").returncode == 0
+    first = run_script("constructor_notion.py", project, env)
+    assert first.returncode == 0, first.stdout + first.stderr
+    published = live_rows(state)
+    pages = len(state.pages)
+
+    # Outra semente de hash: a ordem de sets/dicts muda, o inventário não pode mudar
+    assert run_script("minerador_pbi.py", project, seed="2").returncode == 0
+    second = run_script("constructor_notion.py", project, env, seed="2")
+    assert second.returncode == 0, second.stdout + second.stderr
+
+    syncs = re.findall(r"sync (\d+) novas, (\d+) alteradas, \d+ iguais, (\d+) removidas", second.stdout)
+    assert len(syncs) == 8
+    assert all(counts == ("0", "0", "0") for counts in syncs), second.stdout
+    assert live_rows(state) == published
+    assert len(state.pages) == pages